@@ -1,16 +1,66 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, g, has_request_context
+from flask import abort, before_render_template, template_rendered, stream_template, get_flashed_messages
+from flask import session as flask_session
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+import abc
+import click
+import contextvars
 import csv
+import glob
+import gzip
+import hashlib
+import heapq
 import io
-from sqlalchemy import inspect, text
+import json
+import logging
+import math
+import mimetypes
+import sys
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from sqlalchemy import create_engine, inspect, text, event, select, func, insert, update, column, or_, and_
+from sqlalchemy import cast, literal, null, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.sql import util as sql_util
+from sqlalchemy.sql.dml import Insert, Update, Delete
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+class RoutingSession(FlaskSession):
+    """Session yang memilih engine per statement
+
+    Tabel ledger user tenant -> database tenant (TenantRouter); SELECT di dalam
+    read_replica -> database replica (ReplicaRouter); sisanya database utama.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if tenant_router.enabled:
+                bind_key = tenant_router.bind_key_for(mapper, clause)
+                if bind_key is not None:
+                    return self._db.engines[bind_key]
+            if replica_router.enabled and replica_router.use_replica(self, clause):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
 
 # Inisialisasi ekstensi di luar factory function
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
 def create_app():
@@ -28,11 +78,35 @@ def create_app():
 
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(database_url)
+    
+    # Database terpisah per tenant: satu bind Flask-SQLAlchemy per user
+    tenant_databases = load_tenant_databases()
+    app.config['TENANT_BINDS'] = {user_id: tenant_bind_key(user_id) for user_id in tenant_databases}
+    app.config['SQLALCHEMY_BINDS'] = {
+        tenant_bind_key(user_id): {'url': url, **build_engine_options(url)}
+        for user_id, url in tenant_databases.items()
+    }
+    
+    # Replica baca untuk laporan (opsional)
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        if replica_url.startswith('postgres://'):
+            replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+        app.config['SQLALCHEMY_BINDS'][REPLICA_BIND] = {'url': replica_url, **build_engine_options(replica_url)}
     # ==========================================================================
 
     # Inisialisasi ekstensi dengan aplikasi
     db.init_app(app)
+    tenant_router.init_app(app)
+    replica_router.init_app(app)
     login_manager.init_app(app)
+    job_queue.init_app(app)
+    sql_instrumentation.init_app(app, collect=metrics.init_app(app))
+    profiler.init_app(app)
+    static_assets.init_app(app)
+    response_compression.init_app(app)
+    fragment_cache.init_app(app)
 
     # Setup login manager
     login_manager.login_view = 'login'
@@ -41,6 +115,45 @@ def create_app():
 
     return app
 
+def _env_flag(name, default=False, environ=None):
+    environ = os.environ if environ is None else environ
+    value = environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def build_engine_options(database_url, environ=None):
+    """Opsi engine SQLAlchemy (pool koneksi) dari environment variable"""
+    environ = os.environ if environ is None else environ
+
+    options = {
+        # Daur ulang koneksi sebelum diputus oleh server / load balancer
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+
+    if not database_url.startswith('sqlite'):
+        # Cek koneksi sebelum dipakai agar koneksi basi tidak membuat request gagal
+        # (file SQLite tidak punya koneksi jaringan yang bisa basi)
+        options['pool_pre_ping'] = _env_flag('DB_POOL_PRE_PING', True, environ)
+        options['pool_size'] = int(environ.get('DB_POOL_SIZE', 5))
+        options['max_overflow'] = int(environ.get('DB_MAX_OVERFLOW', 10))
+        options['pool_timeout'] = int(environ.get('DB_POOL_TIMEOUT', 30))
+
+    return options
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL + busy_timeout untuk SQLite agar penulis bersamaan antre, bukan gagal"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_sqlite_pragmas(dbapi_connection)
+
+def apply_sqlite_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
 def init_database(app):
     """Inisialisasi database dengan recovery mechanism"""
     with app.app_context():
@@ -59,6 +172,10 @@ def init_database(app):
             
             # Buat tabel jika belum ada (menggunakan create_all yang aman)
             db.create_all()
+            upgrade_schema()
+            setup_search_index()
+            for bind_key in app.config['TENANT_BINDS'].values():
+                prepare_tenant_database(db.engines[bind_key])
             print("Tables created/verified")
             
             # Cek jika tabel users sudah ada dan memiliki data
@@ -77,6 +194,7 @@ def init_database(app):
                 
             # Cek dan buat default accounts jika belum ada
             create_default_accounts_if_needed()
+            create_default_statement_mappings_if_needed()
             
             print("Database initialization complete")
             
@@ -87,12 +205,35 @@ def init_database(app):
                 print("Trying SQLite fallback...")
                 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
                 db.create_all()
+                upgrade_schema()
+                setup_search_index()
                 create_default_admin()
                 create_default_accounts_if_needed()
+                create_default_statement_mappings_if_needed()
                 print("Fallback to SQLite database successful")
             except Exception as e2:
                 print(f"Fallback also failed: {e2}")
 
+def upgrade_schema(engine=None, tables=None):
+    """Tambahkan kolom & index baru ke tabel lama (create_all tidak mengubah tabel yang sudah ada)"""
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    
+    for table in tables or db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        with engine.begin() as connection:
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    print(f"Added column {table.name}.{column.name}")
+        
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
 def create_default_admin():
     """Buat user admin default jika belum ada"""
     try:
@@ -148,6 +289,7 @@ def create_default_accounts_if_needed():
                 db.session.add(account)
             
             db.session.commit()
+            account_cache.invalidate()
             print(f"Created {len(default_accounts)} default accounts")
             return True
         else:
@@ -158,6 +300,51 @@ def create_default_accounts_if_needed():
         db.session.rollback()
         return False
 
+# (statement, section, line, cocokkan-dengan, nilai, saldo normal)
+DEFAULT_STATEMENT_MAPPINGS = [
+    ('laba_rugi', 'pendapatan', None, 'account_type', 'Pendapatan', 'Kredit'),
+    ('laba_rugi', 'hpp', None, 'category', 'Harga Pokok', 'Debit'),
+    ('laba_rugi', 'beban_operasional', 'beban_transportasi', 'account_code', '5201', 'Debit'),
+    ('laba_rugi', 'beban_operasional', 'beban_tenaga_kerja', 'account_code', '5202', 'Debit'),
+    ('laba_rugi', 'beban_operasional', 'beban_sewa', 'account_code', '5203', 'Debit'),
+    ('laba_rugi', 'beban_operasional', 'beban_perbaikan', 'account_code', '5204', 'Debit'),
+    ('laba_rugi', 'beban_operasional', 'beban_penyusutan', 'account_code', '5301', 'Debit'),
+    ('laba_rugi', 'beban_operasional', 'beban_lain_lain', 'account_type', 'Beban', 'Debit'),
+    ('neraca', 'aset', 'kas_bank', 'account_code', '1101', 'Debit'),
+    ('neraca', 'aset', 'persediaan', 'account_code', '1201', 'Debit'),
+    ('neraca', 'aset', 'peralatan', 'account_code', '1301', 'Debit'),
+    ('neraca', 'aset', None, 'account_type', 'Aset', 'Debit'),
+    ('neraca', 'aset_kontra', 'akumulasi_penyusutan', 'account_type', 'Aset Kontra', 'Kredit'),
+    ('neraca', 'liabilitas', 'utang_usaha', 'category', 'Utang Usaha', 'Kredit'),
+    ('neraca', 'liabilitas', 'utang_lainnya', 'account_type', 'Liabilitas', 'Kredit'),
+    ('neraca', 'ekuitas', 'modal_awal', 'account_code', '3101', 'Kredit'),
+    ('neraca', 'ekuitas', 'prive', 'account_code', '3102', 'Debit'),
+]
+
+def create_default_statement_mappings_if_needed():
+    """Isi tabel pemetaan laporan dengan layout default jika masih kosong"""
+    try:
+        if StatementMapping.query.count():
+            return False
+
+        for statement, section, line, match_field, match_value, normal_balance in DEFAULT_STATEMENT_MAPPINGS:
+            db.session.add(StatementMapping(
+                statement=statement,
+                section=section,
+                line=line,
+                normal_balance=normal_balance,
+                **{match_field: match_value}
+            ))
+
+        db.session.commit()
+        account_cache.invalidate()
+        print(f"Created {len(DEFAULT_STATEMENT_MAPPINGS)} default statement mappings")
+        return True
+    except Exception as e:
+        print(f"Error creating default statement mappings: {e}")
+        db.session.rollback()
+        return False
+
 # ==================== MODELS ====================
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -183,6 +370,7 @@ class Account(db.Model):
     account_type = db.Column(db.String(50), nullable=False)
     category = db.Column(db.String(100), nullable=False)
     normal_balance = db.Column(db.String(10), nullable=False)
+    parent_code = db.Column(db.String(20))  # akun induk (opsional) untuk roll-up
     is_active = db.Column(db.Boolean, default=True)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -196,20 +384,29 @@ class Account(db.Model):
             'account_type': self.account_type,
             'category': self.category,
             'normal_balance': self.normal_balance,
+            'parent_code': self.parent_code,
             'description': self.description,
             'is_active': self.is_active
         }
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_user_idempotency', 'created_by', 'idempotency_key', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     description = db.Column(db.String(500), nullable=False)
     account_debit = db.Column(db.String(20), nullable=False)
     account_credit = db.Column(db.String(20), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(db.Float, nullable=False)  # jurnal majemuk: total debit
     reference = db.Column(db.String(100))
+    line_count = db.Column(db.Integer, default=2)  # >2 untuk jurnal majemuk
+    idempotency_key = db.Column(db.String(100))  # kunci dari klien (header Idempotency-Key / form)
+    idempotency_hash = db.Column(db.String(64))  # sha256 isi request, untuk deteksi kunci dipakai ulang
+    voided_at = db.Column(db.DateTime)  # diisi saat dibatalkan; baris jurnalnya tetap ada
+    reverses_id = db.Column(db.Integer, db.ForeignKey('transactions.id'))  # transaksi pembalik -> transaksi asal
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -217,6 +414,13 @@ class Transaction(db.Model):
 
 class JournalEntry(db.Model):
     __tablename__ = 'journal_entries'
+    __table_args__ = (
+        db.Index('ix_journal_entries_user_date', 'created_by', 'date'),
+        # Join transaksi -> baris jurnal (general journal, hapus transaksi)
+        db.Index('ix_journal_entries_transaction', 'transaction_id'),
+        # Baris baru setelah cursor ledger consumer (id > last_entry_id)
+        db.Index('ix_journal_entries_user_id', 'created_by', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -228,11 +432,10 @@ class JournalEntry(db.Model):
     reference = db.Column(db.String(100))
     transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'))
     adjusting_entry_id = db.Column(db.Integer, db.ForeignKey('adjusting_entries.id'))
+    reverses_entry_id = db.Column(db.Integer)  # penanda void: baris pembalik -> baris yang dibatalkan
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     entry_type = db.Column(db.String(20), default='regular')
-    ledger_processed = db.Column(db.Boolean, default=True)
-    ledger_date = db.Column(db.DateTime, default=datetime.utcnow)
     
     transaction = db.relationship('Transaction', backref=db.backref('journal_entries', lazy=True))
     adjusting_entry = db.relationship('AdjustingEntry', backref=db.backref('journal_entries', lazy=True))
@@ -251,6 +454,7 @@ class AdjustingEntry(db.Model):
     account_credit_name = db.Column(db.String(200), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     adjustment_type = db.Column(db.String(100))
+    voided_at = db.Column(db.DateTime)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -276,20 +480,1012 @@ class ClosingEntry(db.Model):
 
 class IncomeStatement(db.Model):
     __tablename__ = 'income_statements'
+    __table_args__ = (
+        db.Index('ix_income_statements_user_period', 'created_by', 'period', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    period = db.Column(db.String(50), nullable=False)
+    period = db.Column(db.String(50), nullable=False)  # format YYYY-MM
     revenue = db.Column(db.Float, default=0)
     hpp = db.Column(db.Float, default=0)
     gross_profit = db.Column(db.Float, default=0)
     operating_expenses = db.Column(db.Float, default=0)
     net_income = db.Column(db.Float, default=0)
+    details = db.Column(db.JSON)  # income_statement + balance_sheet lengkap
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref=db.backref('income_statements', lazy=True))
+
+class LedgerCursor(db.Model):
+    """High-water mark ledger consumer: id JournalEntry terakhir yang sudah diproses per user"""
+    __tablename__ = 'ledger_cursors'
+    
+    consumer = db.Column(db.String(50), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    last_entry_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AccountBalance(db.Model):
+    """Total debit/kredit per akun dan entry_type sampai cursor 'account_balances'"""
+    __tablename__ = 'account_balances'
+    
+    user_id = db.Column(db.Integer, primary_key=True)
+    account_code = db.Column(db.String(20), primary_key=True)
+    entry_type = db.Column(db.String(20), primary_key=True)  # '' untuk baris lama tanpa entry_type
+    debit = db.Column(db.Float, nullable=False, default=0)
+    credit = db.Column(db.Float, nullable=False, default=0)
+
+class UserLockLease(db.Model):
+    """Lock per user berbasis lease untuk database tanpa advisory lock (SQLite)"""
+    __tablename__ = 'user_locks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    owner = db.Column(db.String(32), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class BackgroundJob(db.Model):
+    """Status dan hasil job tanpa Redis, dibaca bersama oleh semua worker gunicorn"""
+    __tablename__ = 'background_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON dict job
+    file = db.Column(db.LargeBinary)
+    upload = db.Column(db.LargeBinary)  # input job (mis. CSV import), dihapus setelah job selesai
+    created_at = db.Column(db.Float, nullable=False)
+    finished_at = db.Column(db.Float, index=True)
+    
+    __table_args__ = (db.Index('ix_background_jobs_active', 'name', 'user_id', 'status'),)
+
+class StatementMapping(db.Model):
+    """Pemetaan akun ke baris laporan keuangan
+
+    Satu aturan mencocokkan salah satu dari account_code, category atau account_type
+    (urutan prioritas). line boleh kosong: saldo hanya masuk ke total section.
+    """
+    __tablename__ = 'statement_mappings'
+
+    id = db.Column(db.Integer, primary_key=True)
+    statement = db.Column(db.String(20), nullable=False)  # laba_rugi / neraca
+    section = db.Column(db.String(50), nullable=False)
+    line = db.Column(db.String(50))
+    account_code = db.Column(db.String(10))
+    category = db.Column(db.String(50))
+    account_type = db.Column(db.String(50))
+    normal_balance = db.Column(db.String(10), nullable=False)  # Debit/Kredit: arah saldo positif
+
+    def to_dict(self):
+        return {
+            'statement': self.statement,
+            'section': self.section,
+            'line': self.line,
+            'account_code': self.account_code,
+            'category': self.category,
+            'account_type': self.account_type,
+            'normal_balance': self.normal_balance
+        }
+
+def current_period_key(date=None):
+    """Kunci periode bulanan (YYYY-MM) untuk snapshot laporan"""
+    return (date or datetime.now()).strftime('%Y-%m')
+
+def period_bounds(key):
+    """YYYY-MM -> (awal bulan, awal bulan berikutnya); ValueError jika format salah"""
+    start = datetime.strptime(key, '%Y-%m')
+    end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+def format_period(key):
+    """YYYY-MM -> 'January 2026' (format periode yang dipakai di laporan)"""
+    try:
+        return datetime.strptime(key, '%Y-%m').strftime('%B %Y')
+    except ValueError:
+        return key
+
+def save_income_statement(user_id, period, income_stmt, balance_sheet):
+    """Simpan (upsert) snapshot laporan keuangan user untuk satu periode; caller yang commit"""
+    snapshot = IncomeStatement.query.filter_by(created_by=user_id, period=period).first()
+    if snapshot is None:
+        snapshot = IncomeStatement(created_by=user_id, period=period)
+        db.session.add(snapshot)
+    
+    snapshot.revenue = income_stmt['revenue']
+    snapshot.hpp = income_stmt['hpp']
+    snapshot.gross_profit = income_stmt['gross_profit']
+    snapshot.operating_expenses = income_stmt['operating_expenses']
+    snapshot.net_income = income_stmt['net_income']
+    snapshot.details = {'income_statement': income_stmt, 'balance_sheet': balance_sheet}
+    snapshot.created_at = datetime.utcnow()
+    return snapshot
 
 # Setup user loader untuk Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load(int(user_id))
+
+# ==================== CACHE CHART OF ACCOUNTS ====================
+class CacheVersion(db.Model):
+    """Nomor versi bersama antar worker untuk invalidasi cache in-process"""
+    __tablename__ = 'cache_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+_redis_client = None
+
+def get_redis():
+    """Klien Redis bersama, None jika REDIS_URL tidak di-set"""
+    global _redis_client
+    if _redis_client is None and os.environ.get('REDIS_URL'):
+        import redis
+        _redis_client = redis.Redis.from_url(os.environ['REDIS_URL'])
+    return _redis_client
+
+def read_cache_version(name):
+    redis_client = get_redis()
+    if redis_client is not None:
+        return int(redis_client.get(f'tandur:cache:{name}:version') or 0)
+    return db.session.execute(select(CacheVersion.version).where(CacheVersion.name == name)).scalar() or 0
+
+def bump_cache_version(name):
+    """Naikkan versi cache agar semua worker memuat ulang; dipanggil setelah commit"""
+    redis_client = get_redis()
+    if redis_client is not None:
+        return redis_client.incr(f'tandur:cache:{name}:version')
+    
+    updated = db.session.execute(
+        CacheVersion.__table__.update()
+        .where(CacheVersion.name == name)
+        .values(version=CacheVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.session.add(CacheVersion(name=name, version=1))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Worker lain baru saja membuat baris versi yang sama; ulangi sebagai update
+        db.session.rollback()
+        return bump_cache_version(name)
+    return read_cache_version(name)
+
+def ledger_version(user_id):
+    """Penanda perubahan jurnal user (naik setiap transaksi/penyesuaian ditambah atau dihapus)"""
+    return read_cache_version(f'ledger:{user_id}')
+
+def bump_ledger_version(user_id):
+    """Dipanggil setelah commit yang mengubah jurnal user; membatalkan cache fragment laporannya"""
+    return bump_cache_version(f'ledger:{user_id}')
+
+class StatementLayout:
+    """Pemetaan akun -> baris laporan yang sudah dikompilasi menjadi dict lookup
+
+    Dibangun sekali per versi cache (lihat AccountCache); resolve() cukup tiga lookup
+    dict per akun sehingga laporan disusun dalam satu pass atas saldo.
+    """
+    match_fields = ('account_code', 'category', 'account_type')
+    
+    def __init__(self, mappings):
+        self.rules = {}
+        self.sections = {}
+        for mapping in mappings:
+            rules = self.rules.setdefault(mapping.statement, {field: {} for field in self.match_fields})
+            rule = (mapping.section, mapping.line, mapping.normal_balance == 'Debit')
+            for field in self.match_fields:
+                value = getattr(mapping, field)
+                if value:
+                    rules[field].setdefault(value, rule)
+                    break
+            
+            lines = self.sections.setdefault(mapping.statement, {}).setdefault(mapping.section, [])
+            if mapping.line and mapping.line not in lines:
+                lines.append(mapping.line)
+    
+    def resolve(self, statement, account):
+        """(section, line, saldo_normal_debit) untuk akun, atau None jika tidak dipetakan"""
+        rules = self.rules.get(statement)
+        if not rules:
+            return None
+        for field in self.match_fields:
+            rule = rules[field].get(getattr(account, field))
+            if rule:
+                return rule
+        return None
+    
+    def section_lines(self, statement, section):
+        return self.sections.get(statement, {}).get(section, [])
+    
+    def summarize(self, trial_balance, statement):
+        """Total per section dan per baris dari TrialBalance dalam satu pass"""
+        sections = {}
+        lines = {}
+        for section, section_lines in self.sections.get(statement, {}).items():
+            sections[section] = 0
+            lines.update(dict.fromkeys(section_lines, 0))
+        
+        for item in trial_balance.accounts_data:
+            rule = self.resolve(statement, item['account'])
+            if rule is None:
+                continue
+            section, line, debit_normal = rule
+            amount = item['debit'] - item['credit'] if debit_normal else item['credit'] - item['debit']
+            sections[section] += amount
+            if line:
+                lines[line] += amount
+        return sections, lines
+
+class AccountCache:
+    """Cache chart of accounts per proses
+
+    Objek Account di cache sudah detached (dimuat lewat session terpisah) jadi aman
+    dibaca dari request mana pun, tapi jangan diubah; untuk edit tetap query ke DB.
+    Versi di tabel cache_versions (atau Redis) dicek paling sering tiap
+    ACCOUNT_CACHE_CHECK_SECONDS; add/edit/toggle/inisialisasi akun menaikkan versi.
+    Layout laporan (StatementMapping) ikut dimuat dan dikompilasi bersama akun.
+    """
+    version_name = 'accounts'
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0
+        self.check_seconds = float(os.environ.get('ACCOUNT_CACHE_CHECK_SECONDS', 2))
+        self._data = ({}, {}, [], [], StatementLayout([]))
+    
+    def _ensure(self):
+        now = time.monotonic()
+        if self.version is not None and now - self.checked_at < self.check_seconds:
+            metrics.cache_result('chart_of_accounts', True)
+            return self._data
+        
+        version = read_cache_version(self.version_name)
+        with self.lock:
+            self.checked_at = now
+            if version == self.version:
+                metrics.cache_result('chart_of_accounts', True)
+                return self._data
+            
+            metrics.cache_result('chart_of_accounts', False)
+            with Session(db.engine) as session:
+                accounts = session.scalars(select(Account).order_by(Account.id)).all()
+                mappings = session.scalars(select(StatementMapping).order_by(StatementMapping.id)).all()
+            
+            by_code = {account.account_code: account for account in accounts}
+            by_id = {account.id: account for account in accounts}
+            active = [account for account in accounts if account.is_active]
+            active_by_code = sorted(active, key=lambda account: account.account_code)
+            self._data = (by_code, by_id, active, active_by_code, StatementLayout(mappings))
+            self.version = version
+            return self._data
+    
+    def get(self, account_code):
+        return self._ensure()[0].get(account_code)
+    
+    def get_by_id(self, account_id):
+        try:
+            return self._ensure()[1].get(int(account_id))
+        except (TypeError, ValueError):
+            return None
+    
+    def by_code(self):
+        return self._ensure()[0]
+    
+    def active_accounts(self, order_by_code=False):
+        by_code, by_id, active, active_by_code, layout = self._ensure()
+        return list(active_by_code if order_by_code else active)
+    
+    def layout(self):
+        return self._ensure()[4]
+    
+    def current_version(self):
+        self._ensure()
+        return self.version
+    
+    def invalidate(self):
+        with self.lock:
+            self.version = None
+        bump_cache_version(self.version_name)
+
+account_cache = AccountCache()
+
+# ==================== CACHE USER ====================
+class UserCache:
+    """Cache user untuk user_loader Flask-Login
+
+    Tanpa cache setiap request terautentikasi (termasuk polling dashboard tiap 30 detik
+    dari setiap tab) menjalankan satu query ke tabel users. Entri disimpan per proses
+    selama USER_CACHE_TTL detik, atau di Redis jika REDIS_URL di-set sehingga logout /
+    ganti password langsung berlaku di semua worker. Hanya id, username dan email yang
+    disimpan (tanpa password_hash); objek yang dikembalikan berstatus detached.
+    """
+    fields = ('id', 'username', 'email')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.ttl = float(os.environ.get('USER_CACHE_TTL', 60))
+        self.max_entries = int(os.environ.get('USER_CACHE_SIZE', 10000))
+        self.clock = time.monotonic
+    
+    def _key(self, user_id):
+        return f'tandur:user:{user_id}'
+    
+    def _read(self, user_id):
+        redis_client = get_redis()
+        if redis_client is not None:
+            raw = redis_client.get(self._key(user_id))
+            return json.loads(raw) if raw is not None else None
+        entry = self.entries.get(user_id)
+        if entry is not None and entry[0] > self.clock():
+            return entry[1]
+        return None
+    
+    def _write(self, user_id, data):
+        redis_client = get_redis()
+        if redis_client is not None:
+            redis_client.set(self._key(user_id), json.dumps(data), ex=max(1, int(self.ttl)))
+            return
+        now = self.clock()
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries = {key: entry for key, entry in self.entries.items() if entry[0] > now}
+            self.entries[user_id] = (now + self.ttl, data)
+    
+    def load(self, user_id):
+        if self.ttl <= 0:
+            return db.session.get(User, user_id)
+        
+        data = self._read(user_id)
+        metrics.cache_result('user_loader', data is not None)
+        if data is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self._write(user_id, {field: getattr(user, field) for field in self.fields})
+            return user
+        
+        user = User(**data)
+        # Tandai sebagai baris yang sudah ada agar tidak pernah ter-INSERT ulang
+        make_transient_to_detached(user)
+        return user
+    
+    def invalidate(self, user_id):
+        redis_client = get_redis()
+        if redis_client is not None:
+            redis_client.delete(self._key(user_id))
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+user_cache = UserCache()
+
+# ==================== PENCARIAN ====================
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE journal_entries_fts USING fts5(
+        description, reference, content='journal_entries', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS journal_entries_fts_ai AFTER INSERT ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(rowid, description, reference) VALUES (new.id, new.description, new.reference);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journal_entries_fts_ad AFTER DELETE ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(journal_entries_fts, rowid, description, reference)
+        VALUES ('delete', old.id, old.description, old.reference);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journal_entries_fts_au AFTER UPDATE OF description, reference ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(journal_entries_fts, rowid, description, reference)
+        VALUES ('delete', old.id, old.description, old.reference);
+        INSERT INTO journal_entries_fts(rowid, description, reference) VALUES (new.id, new.description, new.reference);
+    END""",
+    # Isi index dari data yang sudah ada (hanya saat tabel FTS baru dibuat)
+    "INSERT INTO journal_entries_fts(journal_entries_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_SEARCH_DDL = [
+    # Kolom generated: tsvector selalu sinkron dengan description/reference
+    """ALTER TABLE journal_entries ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(reference, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_journal_entries_search ON journal_entries USING GIN (search_vector)",
+]
+
+# Transaksi terpisah: role database tanpa hak CREATE EXTENSION tetap mendapat index tsvector
+POSTGRES_TRIGRAM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_journal_entries_reference_trgm ON journal_entries USING GIN (reference gin_trgm_ops)",
+]
+
+# url engine -> apakah index full-text tersedia (lihat search_index_available)
+_search_index_available = {}
+
+def setup_search_index(engine=None):
+    """Index full-text jurnal: FTS5 + trigger (SQLite) atau tsvector + trigram (PostgreSQL)"""
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+    if dialect == 'sqlite':
+        if inspect(engine).has_table('journal_entries_fts'):
+            return
+        groups = [('full-text', SQLITE_SEARCH_DDL)]
+    elif dialect == 'postgresql':
+        groups = [('full-text', POSTGRES_SEARCH_DDL), ('trigram', POSTGRES_TRIGRAM_DDL)]
+    else:
+        return
+    
+    for label, statements in groups:
+        try:
+            with engine.begin() as connection:
+                for statement in statements:
+                    connection.execute(text(statement))
+            print(f"Search index ready ({dialect}, {label})")
+        except Exception as e:
+            print(f"Search index not available ({dialect}, {label}): {e}")
+    _search_index_available.pop(str(engine.url), None)
+
+def search_index_available(engine):
+    """True jika tabel FTS5 / kolom search_vector ada; dicek sekali per engine"""
+    key = str(engine.url)
+    if key not in _search_index_available:
+        inspector = inspect(engine)
+        if engine.dialect.name == 'sqlite':
+            _search_index_available[key] = inspector.has_table('journal_entries_fts')
+        elif engine.dialect.name == 'postgresql':
+            _search_index_available[key] = 'search_vector' in {
+                column['name'] for column in inspector.get_columns('journal_entries')}
+        else:
+            _search_index_available[key] = False
+    return _search_index_available[key]
+
+def search_terms(query):
+    """Pecah query user menjadi token kata; 'TRX-12 sewa' -> [['trx', '12'], ['sewa']]"""
+    terms = []
+    for word in (query or '').split():
+        tokens = [token for token in ''.join(ch if ch.isalnum() else ' ' for ch in word.lower()).split()]
+        if tokens:
+            terms.append(tokens)
+    return terms
+
+def search_match_clause(terms):
+    """Kondisi WHERE full-text sesuai dialect database untuk daftar term"""
+    # Database jurnal bisa milik tenant (lihat TenantRouter), bukan database utama
+    engine = db.session.get_bind(JournalEntry)
+    # Tanpa index full-text (mis. setup_search_index gagal) jatuh ke ILIKE di bawah
+    dialect = engine.dialect.name if search_index_available(engine) else None
+    if dialect == 'sqlite':
+        # Tiap kata jadi frasa prefix: "trx 12"* cocok dengan TRX-12, TRX-120, ...
+        fts_query = ' '.join('"' + ' '.join(tokens) + '"*' for tokens in terms)
+        matches = text('SELECT rowid FROM journal_entries_fts WHERE journal_entries_fts MATCH :fts_query')
+        return JournalEntry.id.in_(matches.bindparams(fts_query=fts_query).columns(column('rowid')))
+    
+    if dialect == 'postgresql':
+        ts_query = ' & '.join(f'{token}:*' for tokens in terms for token in tokens)
+        reference = ' '.join(' '.join(tokens) for tokens in terms)
+        return or_(
+            text("journal_entries.search_vector @@ to_tsquery('simple', :ts_query)").bindparams(ts_query=ts_query),
+            JournalEntry.reference.ilike(f'%{reference}%')
+        )
+    
+    return and_(*[
+        or_(JournalEntry.description.ilike(f'%{token}%'), JournalEntry.reference.ilike(f'%{token}%'))
+        for tokens in terms for token in tokens
+    ])
+
+def search_journal_entries(user_id, query=None, date_from=None, date_to=None,
+                           amount_min=None, amount_max=None, page=1, per_page=50):
+    """Cari baris jurnal user berdasarkan teks (keterangan/referensi), tanggal dan jumlah
+
+    Hasil diurutkan terbaru dulu. Tanpa COUNT(*) supaya tetap cepat di tabel besar:
+    ambil per_page + 1 baris untuk tahu apakah ada halaman berikutnya.
+    """
+    stmt = select(JournalEntry).where(JournalEntry.created_by == user_id)
+    
+    terms = search_terms(query)
+    if terms:
+        stmt = stmt.where(search_match_clause(terms))
+    if date_from:
+        stmt = stmt.where(JournalEntry.date >= date_from)
+    if date_to:
+        stmt = stmt.where(JournalEntry.date < date_to + timedelta(days=1))
+    
+    amount = JournalEntry.debit + JournalEntry.credit
+    if amount_min is not None:
+        stmt = stmt.where(amount >= amount_min)
+    if amount_max is not None:
+        stmt = stmt.where(amount <= amount_max)
+    
+    stmt = stmt.order_by(JournalEntry.date.desc(), JournalEntry.id.desc())\
+        .offset((page - 1) * per_page).limit(per_page + 1)
+    entries = db.session.scalars(stmt).all()
+    
+    return {
+        'items': entries[:per_page],
+        'page': page,
+        'per_page': per_page,
+        'has_next': len(entries) > per_page
+    }
+
+# ==================== LEDGER CONSUMER ====================
+class LedgerConsumer(abc.ABC):
+    """Turunan jurnal (saldo, baris laporan, index, ekspor) yang diproses secara incremental
+
+    Jurnal bersifat append-only (pembatalan = baris pembalik), jadi setiap consumer cukup
+    menyimpan high-water mark: JournalEntry.id terakhir yang sudah diterapkan per user
+    (tabel ledger_cursors). catch_up() hanya memproses baris dengan id > cursor, sehingga
+    biayanya sebanding dengan aktivitas baru, bukan panjang riwayat.
+
+    Di PostgreSQL id dari sequence bisa ter-commit tidak berurutan; cursor hanya maju
+    melewati baris yang lebih tua dari LEDGER_CONSUMER_LAG_SECONDS agar baris dengan id
+    lebih kecil yang belum ter-commit tidak terlewat. SQLite menulis secara serial,
+    default lag-nya 0.
+    """
+    name = None
+    
+    def __init__(self):
+        # Default mati: laporan tetap read-only, cursor dimajukan `flask ledger-catch-up`
+        self.catch_up_on_read = _env_flag('LEDGER_CATCH_UP_ON_READ', False)
+    
+    def lag_seconds(self, connection):
+        default = 0 if connection.dialect.name == 'sqlite' else 60
+        return float(os.environ.get('LEDGER_CONSUMER_LAG_SECONDS', default))
+    
+    def position(self, user_id, connection=None):
+        """id JournalEntry terakhir yang sudah diproses (None jika belum pernah)"""
+        stmt = select(LedgerCursor.last_entry_id).where(
+            LedgerCursor.consumer == self.name, LedgerCursor.user_id == user_id
+        )
+        if connection is None:
+            return db.session.execute(stmt).scalar()
+        return connection.execute(stmt).scalar()
+    
+    def catch_up(self, user_id):
+        """Terapkan baris jurnal baru milik user; kembalikan jumlah baris yang diproses
+
+        Berjalan di transaksi sendiri (bukan db.session) supaya tidak ikut meng-commit
+        perubahan yang sedang disiapkan request. Dua proses yang catch-up bersamaan
+        dibedakan lewat UPDATE bersyarat pada cursor: yang kalah tidak melakukan apa-apa.
+        """
+        try:
+            with tenant_router.engine_for(user_id).begin() as connection:
+                return self._catch_up(connection, user_id)
+        except IntegrityError:
+            # Proses lain baru saja membuat cursor yang sama dan sudah memproses barisnya
+            return 0
+    
+    def catch_up_for_read(self, user_id):
+        """catch_up() sebelum laporan dibaca, hanya jika LEDGER_CATCH_UP_ON_READ=1"""
+        # Di replica cursor dimajukan oleh `flask ledger-catch-up`, bukan oleh request baca
+        if self.catch_up_on_read and not replica_router.reading():
+            self.catch_up(user_id)
+    
+    def _catch_up(self, connection, user_id):
+        after_id = self.position(user_id, connection)
+        
+        stmt = select(func.max(JournalEntry.id)).where(
+            JournalEntry.created_by == user_id,
+            JournalEntry.id > (after_id or 0)
+        )
+        lag = self.lag_seconds(connection)
+        if lag > 0:
+            stmt = stmt.where(JournalEntry.created_at <= datetime.utcnow() - timedelta(seconds=lag))
+        upto_id = connection.execute(stmt).scalar()
+        if upto_id is None:
+            return 0
+        
+        values = {'last_entry_id': upto_id, 'updated_at': datetime.utcnow()}
+        if after_id is None:
+            connection.execute(LedgerCursor.__table__.insert().values(
+                consumer=self.name, user_id=user_id, **values))
+        else:
+            advanced = connection.execute(
+                LedgerCursor.__table__.update()
+                .where(LedgerCursor.consumer == self.name,
+                       LedgerCursor.user_id == user_id,
+                       LedgerCursor.last_entry_id == after_id)
+                .values(**values)
+            ).rowcount
+            if not advanced:
+                return 0
+        
+        return self.apply(connection, user_id, after_id or 0, upto_id)
+    
+    @abc.abstractmethod
+    def apply(self, connection, user_id, after_id, upto_id):
+        """Proses baris jurnal user dengan after_id < id <= upto_id (di transaksi yang sama dengan cursor)"""
+
+class AccountBalanceConsumer(LedgerConsumer):
+    """Total debit/kredit per akun dan entry_type di tabel account_balances"""
+    name = 'account_balances'
+    
+    def apply(self, connection, user_id, after_id, upto_id):
+        entry_type = func.coalesce(JournalEntry.entry_type, '')
+        deltas = connection.execute(
+            select(
+                JournalEntry.account_code, entry_type,
+                func.coalesce(func.sum(JournalEntry.debit), 0),
+                func.coalesce(func.sum(JournalEntry.credit), 0),
+                func.count()
+            ).where(
+                JournalEntry.created_by == user_id,
+                JournalEntry.id > after_id,
+                JournalEntry.id <= upto_id
+            ).group_by(JournalEntry.account_code, entry_type)
+        ).all()
+        
+        balances = AccountBalance.__table__
+        processed = 0
+        for account_code, entry_type, debit, credit, count in deltas:
+            processed += count
+            updated = connection.execute(
+                balances.update()
+                .where(balances.c.user_id == user_id,
+                       balances.c.account_code == account_code,
+                       balances.c.entry_type == entry_type)
+                .values(debit=balances.c.debit + debit, credit=balances.c.credit + credit)
+            ).rowcount
+            if not updated:
+                connection.execute(balances.insert().values(
+                    user_id=user_id, account_code=account_code, entry_type=entry_type,
+                    debit=debit, credit=credit))
+        return processed
+
+account_balance_consumer = AccountBalanceConsumer()
+
+# Consumer yang dijalankan `flask ledger-catch-up`
+ledger_consumers = [account_balance_consumer]
+
+# ==================== ROUTING TENANT ====================
+# Tabel ledger per user -> kolom pemiliknya. Tabel lain (users, accounts, statement_mappings,
+# cache_versions) selalu berada di database utama.
+TENANT_TABLES = {
+    'transactions': 'created_by',
+    'adjusting_entries': 'created_by',
+    'journal_entries': 'created_by',
+    'closing_entries': 'created_by',
+    'income_statements': 'created_by',
+    'ledger_cursors': 'user_id',
+    'account_balances': 'user_id',
+    'user_locks': 'user_id',
+}
+
+def tenant_bind_key(user_id):
+    return f'tenant_{user_id}'
+
+def load_tenant_databases(environ=None):
+    """Peta user_id -> URL database dari TENANT_DATABASES (JSON atau path file JSON)
+
+    Contoh: TENANT_DATABASES='{"7": "sqlite:////data/tenant_7.db"}'. Untuk PostgreSQL satu
+    schema per tenant: "postgresql://.../tandur?options=-csearch_path%3Dtenant_7,public".
+    """
+    environ = os.environ if environ is None else environ
+    value = (environ.get('TENANT_DATABASES') or '').strip()
+    if not value:
+        return {}
+    if not value.startswith('{'):
+        with open(value, encoding='utf-8') as fh:
+            value = fh.read()
+    
+    databases = {}
+    for user_id, url in json.loads(value).items():
+        if url.startswith('postgres://'):
+            url = url.replace('postgres://', 'postgresql://', 1)
+        databases[int(user_id)] = url
+    return databases
+
+def tenant_tables():
+    """Tabel ledger per user, urut sesuai foreign key (induk dulu)"""
+    return [table for table in db.metadata.sorted_tables if table.name in TENANT_TABLES]
+
+def prepare_tenant_database(engine):
+    """Buat / upgrade tabel ledger dan index pencarian di database tenant"""
+    tables = tenant_tables()
+    db.metadata.create_all(engine, tables=tables)
+    upgrade_schema(engine, tables)
+    setup_search_index(engine)
+
+class TenantRouter:
+    """Memilih database ledger per user di atas bind Flask-SQLAlchemy
+
+    User yang ada di TENANT_DATABASES punya bind sendiri (tenant_<id>); query ke tabel
+    TENANT_TABLES milik user tersebut diarahkan RoutingSession ke bind itu, sisanya tetap ke
+    database utama. Tenant aktif adalah user yang login, atau user yang di-set dengan
+    tenant_router.use(user_id) untuk job background dan perintah CLI.
+    """
+    
+    def __init__(self):
+        self.binds = {}
+        self._current = contextvars.ContextVar('tandur_tenant', default=None)
+    
+    def init_app(self, app):
+        self.binds = dict(app.config.get('TENANT_BINDS', {}))
+    
+    @property
+    def enabled(self):
+        return bool(self.binds)
+    
+    @contextmanager
+    def use(self, user_id):
+        token = self._current.set(user_id)
+        try:
+            yield
+        finally:
+            self._current.reset(token)
+    
+    def current_user_id(self):
+        user_id = self._current.get()
+        if user_id is None and has_request_context() and current_user.is_authenticated:
+            user_id = current_user.id
+        return user_id
+    
+    def bind_key(self, user_id):
+        return self.binds.get(user_id)
+    
+    def engine_for(self, user_id):
+        bind_key = self.bind_key(user_id)
+        return db.engines[bind_key] if bind_key else db.engine
+    
+    def bind_key_for(self, mapper, clause):
+        """Bind tenant untuk query ini, atau None jika memakai database utama"""
+        if mapper is not None:
+            tables = [inspect(mapper).local_table]
+        elif clause is not None:
+            tables = sql_util.find_tables(clause, include_aliases=True, include_crud=True)
+        else:
+            return None
+        
+        if not any(table.name in TENANT_TABLES for table in tables):
+            return None
+        return self.bind_key(self.current_user_id())
+    
+    def ledger_user_ids(self):
+        """User yang punya baris jurnal, di database utama maupun database tenant"""
+        user_ids = {user_id for (user_id,) in db.session.execute(
+            select(JournalEntry.created_by).where(JournalEntry.created_by.isnot(None)).distinct()
+        )}
+        return sorted(user_ids | set(self.binds))
+    
+    def count_rows_by_user(self, model):
+        """Jumlah baris tabel ledger per user dari database utama dan semua database tenant
+
+        Baris user tenant yang masih tertinggal di database utama (belum tenant-purge)
+        tidak dihitung dua kali; yang dipakai adalah isi database tenant.
+        """
+        owner = model.__table__.c[TENANT_TABLES[model.__tablename__]]
+        with db.engine.connect() as connection:
+            counts = {user_id: count for user_id, count in connection.execute(
+                select(owner, func.count()).group_by(owner)) if user_id not in self.binds}
+        for user_id, bind_key in self.binds.items():
+            with db.engines[bind_key].connect() as connection:
+                counts[user_id] = connection.execute(select(func.count()).where(owner == user_id)).scalar()
+        return counts
+
+tenant_router = TenantRouter()
+
+def copy_tenant_rows(user_id, source, target, batch_size=5000):
+    """Salin baris ledger satu user dari engine source ke target dengan id yang sama
+
+    Target harus belum berisi baris user tersebut. Mengembalikan jumlah baris per tabel.
+    """
+    copied = {}
+    with source.connect() as source_connection, target.begin() as target_connection:
+        for table in tenant_tables():
+            owner = table.c[TENANT_TABLES[table.name]]
+            if target_connection.execute(select(func.count()).select_from(table).where(owner == user_id)).scalar():
+                raise ValueError(f'{table.name} di database tujuan sudah berisi data user {user_id}')
+            
+            result = source_connection.execution_options(yield_per=batch_size).execute(
+                select(table).where(owner == user_id).order_by(*table.primary_key.columns)
+            )
+            copied[table.name] = 0
+            for rows in result.partitions():
+                target_connection.execute(table.insert(), [row._asdict() for row in rows])
+                copied[table.name] += len(rows)
+        
+        if target.dialect.name == 'postgresql':
+            # id disalin apa adanya; sequence dimajukan agar insert berikutnya tidak bentrok
+            for table in tenant_tables():
+                if 'id' in table.c:
+                    target_connection.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+                    ))
+    return copied
+
+def count_tenant_rows(user_id, engine):
+    with engine.connect() as connection:
+        return {
+            table.name: connection.execute(
+                select(func.count()).select_from(table).where(table.c[TENANT_TABLES[table.name]] == user_id)
+            ).scalar()
+            for table in tenant_tables()
+        }
+
+# ==================== READ REPLICA ====================
+REPLICA_BIND = 'replica'
+
+class ReplicaRouter:
+    """Pemisahan baca/tulis: SELECT laporan ke replica, tulis dan read-your-writes ke utama
+
+    Aktif jika DATABASE_REPLICA_URL di-set. Hanya SELECT di dalam view ber-@read_replica
+    (atau blok replica_router.reads()) yang dikirim ke replica. Setelah request menulis ke
+    database, waktu tulisnya disimpan di session Flask; selama REPLICA_STICKY_SECONDS
+    berikutnya laporan user itu tetap dibaca dari database utama agar perubahannya sendiri
+    langsung terlihat walaupun replica tertinggal.
+    """
+    session_key = '_db_wrote_at'
+    
+    def __init__(self):
+        self.enabled = False
+        self.sticky_seconds = 5.0
+        self._reading = contextvars.ContextVar('tandur_read_replica', default=False)
+    
+    def init_app(self, app):
+        self.enabled = REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {})
+        self.sticky_seconds = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+        app.after_request(self._remember_write)
+    
+    @contextmanager
+    def reads(self):
+        token = self._reading.set(True)
+        try:
+            yield
+        finally:
+            self._reading.reset(token)
+    
+    def reading(self):
+        return self.enabled and self._reading.get()
+    
+    def wrote_recently(self, session_data):
+        """True jika session (cookie Flask) baru saja menulis ke database utama"""
+        return time.time() - session_data.get(self.session_key, 0) < self.sticky_seconds
+    
+    def mark_write(self):
+        if has_request_context():
+            g.db_wrote = True
+    
+    def use_replica(self, db_session, clause):
+        # Flush ORM ditandai lewat event after_flush; di sini INSERT/UPDATE/DELETE langsung
+        if isinstance(clause, (Insert, Update, Delete)):
+            self.mark_write()
+            return False
+        
+        if not self._reading.get() or not getattr(clause, 'is_select', False):
+            return False
+        if has_request_context() and (g.get('db_wrote') or self.wrote_recently(flask_session)):
+            return False
+        return True
+    
+    def _remember_write(self, response):
+        if self.enabled and g.get('db_wrote'):
+            flask_session[self.session_key] = time.time()
+        return response
+
+replica_router = ReplicaRouter()
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_flush_write(db_session, flush_context):
+    replica_router.mark_write()
+
+def read_replica(view):
+    """Decorator view laporan: query baca boleh dilayani replica"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_router.reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+# ==================== LOCK PER USER ====================
+class UserLockTimeout(Exception):
+    pass
+
+class UserLocks:
+    """Serialisasi operasi batch per user (closing, import, month-end) antar proses
+
+    Redis lock jika REDIS_URL di-set, advisory lock PostgreSQL, atau lease di tabel
+    user_locks (SQLite). Pemanggil kedua menunggu giliran dengan backoff singkat sampai
+    USER_LOCK_WAIT_SECONDS, bukan gagal di tengah jalan lalu diulang. Lock dipegang di
+    koneksi / key tersendiri, jadi commit di dalam blok tidak melepasnya.
+    """
+    
+    def __init__(self):
+        self.wait_seconds = float(os.environ.get('USER_LOCK_WAIT_SECONDS', 30))
+        self.lease_seconds = float(os.environ.get('USER_LOCK_LEASE_SECONDS', 600))
+    
+    @contextmanager
+    def hold(self, user_id, name='ledger', wait=None):
+        wait = self.wait_seconds if wait is None else wait
+        started = time.perf_counter()
+        redis_client = get_redis()
+        engine = tenant_router.engine_for(user_id)
+        
+        if redis_client is not None:
+            lock = redis_client.lock(f'tandur:lock:{name}:{user_id}', timeout=self.lease_seconds,
+                                     blocking_timeout=wait)
+            acquired = lock.acquire()
+            release = lock.release
+        elif engine.dialect.name == 'postgresql':
+            acquired, release = self._advisory_lock(engine, name, user_id, started + wait)
+        else:
+            acquired, release = self._lease(engine, name, user_id, started + wait)
+        
+        metrics.observe_lock_wait(name, acquired, time.perf_counter() - started)
+        if not acquired:
+            raise UserLockTimeout(f'Proses {name} lain untuk user ini masih berjalan, coba lagi nanti')
+        try:
+            yield
+        finally:
+            try:
+                release()
+            except Exception as e:
+                # Lease sudah kedaluwarsa / koneksi putus: lock sudah lepas dengan sendirinya
+                print(f"Release lock {name}:{user_id} gagal: {e}")
+    
+    def _retry(self, attempt, deadline):
+        delay = min(0.05 * 2 ** attempt, 0.5, deadline - time.perf_counter())
+        if delay <= 0:
+            return False
+        time.sleep(delay)
+        return True
+    
+    def _advisory_lock(self, engine, name, user_id, deadline):
+        # Lock level session pada koneksi khusus; ikut lepas jika proses mati
+        key = zlib.crc32(name.encode('utf-8')) & 0x7fffffff
+        connection = engine.connect()
+        attempt = 0
+        while True:
+            acquired = connection.execute(text('SELECT pg_try_advisory_lock(:key, :user_id)'),
+                                          {'key': key, 'user_id': user_id}).scalar()
+            connection.commit()
+            if acquired or not self._retry(attempt, deadline):
+                break
+            attempt += 1
+        
+        if not acquired:
+            connection.close()
+            return False, None
+        
+        def release():
+            try:
+                connection.execute(text('SELECT pg_advisory_unlock(:key, :user_id)'), {'key': key, 'user_id': user_id})
+                connection.commit()
+            finally:
+                connection.close()
+        return True, release
+    
+    def _lease(self, engine, name, user_id, deadline):
+        owner = uuid.uuid4().hex
+        table = UserLockLease.__table__
+        attempt = 0
+        while True:
+            now = datetime.utcnow()
+            values = {'owner': owner, 'expires_at': now + timedelta(seconds=self.lease_seconds)}
+            try:
+                with engine.begin() as connection:
+                    # Ambil alih lease yang kedaluwarsa, atau buat baru
+                    acquired = connection.execute(
+                        table.update()
+                        .where(table.c.name == name, table.c.user_id == user_id, table.c.expires_at < now)
+                        .values(**values)
+                    ).rowcount > 0
+                    if not acquired and connection.execute(
+                            select(table.c.owner).where(table.c.name == name, table.c.user_id == user_id)
+                    ).first() is None:
+                        connection.execute(table.insert().values(name=name, user_id=user_id, **values))
+                        acquired = True
+            except IntegrityError:
+                acquired = False
+            
+            if acquired or not self._retry(attempt, deadline):
+                break
+            attempt += 1
+        
+        if not acquired:
+            return False, None
+        
+        def release():
+            with engine.begin() as connection:
+                connection.execute(table.delete().where(
+                    table.c.name == name, table.c.user_id == user_id, table.c.owner == owner))
+        return True, release
+
+user_locks = UserLocks()
 
 # ==================== HELPER CLASSES ====================
 class LedgerProcessor:
@@ -298,10 +1494,7 @@ class LedgerProcessor:
     
     def get_ledger_entries(self, account_code=None, start_date=None, end_date=None, include_adjusting=True):
         """Get ledger entries with running balance"""
-        query = JournalEntry.query.filter_by(
-            created_by=self.user_id,
-            ledger_processed=True
-        )
+        query = JournalEntry.query.filter_by(created_by=self.user_id)
         
         if account_code:
             query = query.filter_by(account_code=account_code)
@@ -319,9 +1512,10 @@ class LedgerProcessor:
         
         running_balance = 0
         ledger_data = []
+        accounts = account_cache.by_code()
         
         for entry in entries:
-            account = Account.query.filter_by(account_code=entry.account_code).first()
+            account = accounts.get(entry.account_code)
             
             if account and account.normal_balance == 'Debit':
                 running_balance += entry.debit - entry.credit
@@ -337,108 +1531,564 @@ class LedgerProcessor:
 
     def get_account_balance(self, account_code, include_adjusting=True):
         """Get current balance for specific account"""
-        entries = self.get_ledger_entries(account_code, include_adjusting=include_adjusting)
-        if entries:
-            return entries[-1]['running_balance']
-        return 0
+        totals = self.get_balance_totals(include_adjusting=include_adjusting, account_code=account_code)
+        debit, credit = totals.get(account_code, (0, 0))
+        account = account_cache.get(account_code)
+        if account and account.normal_balance == 'Debit':
+            return debit - credit
+        return credit - debit
 
-class TrialBalance:
-    def __init__(self, period=None, include_adjusting=True):
-        self.period = period or datetime.now().strftime('%B %Y')
-        self.accounts_data = []
-        self.total_debit = 0
-        self.total_credit = 0
-        self.include_adjusting = include_adjusting
+    def get_balance_totals(self, include_adjusting=True, account_code=None, start_date=None, end_date=None):
+        """Total debit/kredit per akun dalam satu query agregat
+
+        Dengan start_date/end_date (end eksklusif) saldo dihitung langsung dari baris jurnal
+        pada rentang tanggal itu; account_balances tidak punya dimensi tanggal.
+        """
+        if start_date or end_date:
+            stmt = dated_balance_totals_query(self.user_id, include_adjusting, start_date, end_date)
+            totals = balance_totals_from_rows(db.session.execute(stmt))
+            if account_code:
+                return {account_code: totals[account_code]} if account_code in totals else {}
+            return totals
         
-    def add_account_balance(self, account, debit, credit):
-        self.accounts_data.append({
-            'account': account,
-            'debit': debit,
-            'credit': credit
-        })
-        self.total_debit += debit
-        self.total_credit += credit
+        account_balance_consumer.catch_up_for_read(self.user_id)
+        totals = balance_totals_from_rows(db.session.execute(balance_totals_query(self.user_id, include_adjusting)))
+        if account_code:
+            return {account_code: totals[account_code]} if account_code in totals else {}
+        return totals
+
+    def get_trial_balance(self, include_adjusting=True, start_date=None, end_date=None):
+        """Neraca saldo semua akun aktif dari satu query agregat"""
+        accounts = account_cache.active_accounts()
+        totals = self.get_balance_totals(include_adjusting, start_date=start_date, end_date=end_date)
+        return build_trial_balance(accounts, totals, include_adjusting)
+
+def balance_totals_query(user_id, include_adjusting=True):
+    """SELECT account_code, SUM(debit), SUM(credit) ... GROUP BY account_code
+
+    Saldo yang sudah dimaterialisasi (account_balances, sampai cursor) ditambah baris
+    jurnal setelah cursor, jadi hasilnya selalu terkini tanpa memindai seluruh riwayat.
+    Hanya membaca; memajukan cursor dilakukan account_balance_consumer.catch_up().
+    Dipakai bersama oleh view sinkron (Flask) dan jalur async (asgi.py).
+    """
+    cursor = select(func.coalesce(func.max(LedgerCursor.last_entry_id), 0)).where(
+        LedgerCursor.consumer == account_balance_consumer.name,
+        LedgerCursor.user_id == user_id
+    ).scalar_subquery()
     
-    def is_balanced(self):
-        return abs(self.total_debit - self.total_credit) < 0.01
+    materialized = select(AccountBalance.account_code, AccountBalance.debit, AccountBalance.credit)\
+        .where(AccountBalance.user_id == user_id)
+    tail = select(JournalEntry.account_code, JournalEntry.debit, JournalEntry.credit)\
+        .where(JournalEntry.created_by == user_id, JournalEntry.id > cursor)
     
-    def get_difference(self):
-        return abs(self.total_debit - self.total_credit)
+    if not include_adjusting:
+        materialized = materialized.where(AccountBalance.entry_type == 'regular')
+        tail = tail.where(JournalEntry.entry_type == 'regular')
+    
+    rows = materialized.union_all(tail).subquery()
+    return select(
+        rows.c.account_code,
+        func.coalesce(func.sum(rows.c.debit), 0),
+        func.coalesce(func.sum(rows.c.credit), 0)
+    ).group_by(rows.c.account_code)
+
+def dated_balance_totals_query(user_id, include_adjusting=True, start_date=None, end_date=None):
+    """Seperti balance_totals_query, tetapi hanya baris jurnal start_date <= date < end_date"""
+    stmt = select(
+        JournalEntry.account_code,
+        func.coalesce(func.sum(JournalEntry.debit), 0),
+        func.coalesce(func.sum(JournalEntry.credit), 0)
+    ).where(JournalEntry.created_by == user_id)
     
-    def get_accounts_by_type(self, account_type):
-        return [item for item in self.accounts_data if item['account'].account_type == account_type]
+    if start_date:
+        stmt = stmt.where(JournalEntry.date >= start_date)
+    if end_date:
+        stmt = stmt.where(JournalEntry.date < end_date)
+    if not include_adjusting:
+        stmt = stmt.where(JournalEntry.entry_type == 'regular')
     
-    def get_summary_by_type(self):
-        summary = {}
-        for item in self.accounts_data:
-            acc_type = item['account'].account_type
-            if acc_type not in summary:
-                summary[acc_type] = {'debit': 0, 'credit': 0, 'count': 0}
-            summary[acc_type]['debit'] += item['debit']
-            summary[acc_type]['credit'] += item['credit']
-            summary[acc_type]['count'] += 1
-        return summary
+    return stmt.group_by(JournalEntry.account_code)
 
-class FinancialStatement:
-    def __init__(self, period=None):
-        self.period = period or datetime.now().strftime('%B %Y')
-        self.income_statement = {}
-        self.balance_sheet = {}
-        
-    def calculate_income_statement(self, trial_balance):
-        """Calculate Income Statement according to accounting principles"""
-        # Pendapatan (Revenue)
-        revenue_accounts = trial_balance.get_accounts_by_type('Pendapatan')
-        total_revenue = sum(item['credit'] - item['debit'] for item in revenue_accounts)
+def balance_totals_from_rows(rows):
+    return {account_code: (debit, credit) for account_code, debit, credit in rows}
+
+def build_trial_balance(accounts, totals, include_adjusting=True):
+    """Bangun TrialBalance dari daftar akun dan total debit/kredit per akun"""
+    trial_balance_obj = TrialBalance(include_adjusting=include_adjusting)
+    for account in accounts:
+        debit, credit = totals.get(account.account_code, (0, 0))
+        trial_balance_obj.add_normal_balance(account, debit, credit)
+    return trial_balance_obj
+
+def build_financial_statements(trial_balance_obj, layout=None):
+    """Laba rugi + neraca dari TrialBalance, mengembalikan (FinancialStatement, income, balance_sheet)"""
+    financial_stmt = FinancialStatement(layout=layout)
+    income_stmt = financial_stmt.calculate_income_statement(trial_balance_obj)
+    balance_sheet = financial_stmt.calculate_balance_sheet(trial_balance_obj, income_stmt['net_income'])
+    return financial_stmt, income_stmt, balance_sheet
+
+def build_period_statements(user_id, period_key, trial_balance_obj=None):
+    """Laba rugi dari jurnal bertanggal di dalam periode, neraca kumulatif per akhir periode
+
+    Dipakai snapshot closing maupun tampilan periode berjalan, supaya angka satu bulan
+    tidak berubah ketika bulan berganti. trial_balance_obj: neraca saldo kumulatif s.d.
+    akhir periode jika sudah dihitung pemanggil.
+    """
+    period_start, period_end = period_bounds(period_key)
+    ledger = LedgerProcessor(user_id)
+    if trial_balance_obj is None:
+        trial_balance_obj = ledger.get_trial_balance(include_adjusting=True, end_date=period_end)
+    financial_stmt, _, balance_sheet = build_financial_statements(trial_balance_obj)
+    income_stmt = financial_stmt.calculate_income_statement(ledger.get_trial_balance(
+        include_adjusting=True, start_date=period_start, end_date=period_end))
+    return income_stmt, balance_sheet
+
+def build_report_payload(report, accounts, totals, layout=None):
+    """Payload JSON laporan; sumber tunggal untuk endpoint API sinkron maupun async"""
+    if report in ('trial_balance', 'adjusted_trial_balance'):
+        trial_balance_obj = build_trial_balance(accounts, totals, include_adjusting=(report == 'adjusted_trial_balance'))
+        return {
+            'success': True,
+            'period': trial_balance_obj.period,
+            'accounts': [
+                {'account': item['account'].to_dict(), 'debit': item['debit'], 'credit': item['credit']}
+                for item in trial_balance_obj.accounts_data
+            ],
+            'total_debit': trial_balance_obj.total_debit,
+            'total_credit': trial_balance_obj.total_credit,
+            'is_balanced': trial_balance_obj.is_balanced()
+        }
+
+    trial_balance_obj = build_trial_balance(accounts, totals, include_adjusting=True)
+    financial_stmt, income_stmt, balance_sheet = build_financial_statements(trial_balance_obj, layout)
+    return {
+        'success': True,
+        'period': financial_stmt.period,
+        'income_statement': income_stmt,
+        'balance_sheet': balance_sheet,
+        'net_income': income_stmt['net_income']
+    }
+
+DASHBOARD_SUMMARY_COLUMNS = (
+    ('account_code', db.String), ('debit', db.Float), ('credit', db.Float), ('id', db.Integer),
+    ('date', db.DateTime), ('created_at', db.DateTime), ('description', db.String), ('voided_at', db.DateTime),
+)
+
+def dashboard_summary_query(user_id, limit=5):
+    """Ringkasan dashboard dalam satu SELECT (UNION ALL), dipakai view Flask dan asgi.py
+
+    Kolom kind membedakan baris: 'balance' (saldo per akun, sama dengan balance_totals_query),
+    'counts' (debit = transaksi aktif, credit = baris jurnal) dan 'recent' (transaksi terbaru).
+    Kolom yang tidak dipakai diisi NULL ber-tipe agar UNION juga valid di PostgreSQL.
+    """
+    def columns(kind, **values):
+        return [literal(kind, db.String).label('kind')] + [
+            (values[name] if name in values else cast(null(), type_)).label(name)
+            for name, type_ in DASHBOARD_SUMMARY_COLUMNS
+        ]
+    
+    totals = balance_totals_query(user_id, include_adjusting=True).subquery()
+    account_code, debit, credit = totals.c
+    balances = select(*columns('balance', account_code=account_code, debit=debit, credit=credit))
+    
+    transactions = select(func.count(Transaction.id)).where(
+        Transaction.created_by == user_id,
+        Transaction.voided_at.is_(None),
+        Transaction.reverses_id.is_(None)
+    ).scalar_subquery()
+    journal_entries = select(func.count(JournalEntry.id)).where(JournalEntry.created_by == user_id).scalar_subquery()
+    counts = select(*columns('counts', debit=transactions, credit=journal_entries))
+    
+    recent = select(Transaction.id, Transaction.date, Transaction.created_at, Transaction.description,
+                    Transaction.amount, Transaction.voided_at)\
+        .where(Transaction.created_by == user_id, Transaction.reverses_id.is_(None))\
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit).subquery()
+    recent_rows = select(*columns('recent', debit=recent.c.amount, id=recent.c.id, date=recent.c.date,
+                                  created_at=recent.c.created_at, description=recent.c.description,
+                                  voided_at=recent.c.voided_at))
+    
+    return union_all(balances, counts, recent_rows)
+
+def build_dashboard_summary(accounts, rows, layout=None):
+    """Ringkasan dashboard (jumlah, transaksi terbaru, angka laporan) dari baris dashboard_summary_query"""
+    totals = {}
+    counts = (0, 0)
+    recent_transactions = []
+    for row in rows:
+        if row.kind == 'balance':
+            totals[row.account_code] = (row.debit, row.credit)
+        elif row.kind == 'counts':
+            counts = (int(row.debit), int(row.credit))
+        else:
+            recent_transactions.append(row)
+    # Urutan baris UNION ALL tidak dijamin; urutkan ulang seperti ORDER BY di subquery
+    recent_transactions.sort(key=lambda row: (row.created_at or datetime.min, row.id), reverse=True)
+    
+    summary = build_report_payload('financial_statements', accounts, totals, layout)
+    summary.update({
+        'total_accounts': len(accounts),
+        'total_transactions': counts[0],
+        'total_journal_entries': counts[1],
+        'recent_transactions': [{
+            'id': transaction.id,
+            'date': transaction.date.strftime('%Y-%m-%d'),
+            'description': transaction.description,
+            'amount': transaction.debit,
+            'voided': transaction.voided_at is not None
+        } for transaction in recent_transactions]
+    })
+    return summary
+
+def get_dashboard_summary(user_id):
+    """Satu round trip ke database ledger (ditambah catch-up jika LEDGER_CATCH_UP_ON_READ=1)"""
+    account_balance_consumer.catch_up_for_read(user_id)
+    stmt = dashboard_summary_query(user_id)
+    # UNION ALL dari entitas ORM tidak membawa 'clause' ke get_bind; berikan eksplisit
+    # agar RoutingSession tetap bisa memilih database tenant / replica
+    rows = db.session.execute(stmt, bind_arguments={'clause': stmt}).all()
+    return build_dashboard_summary(account_cache.active_accounts(), rows)
+
+def validate_journal_lines(lines, accounts=None):
+    """Validasi semua baris jurnal dalam satu pass
+
+    lines: iterable dict {account_code, debit, credit}. Total dihitung dalam sen (int)
+    supaya keseimbangan tidak terganggu pembulatan float. Mengembalikan
+    ([(account, debit, credit), ...], total) atau raise ValueError berisi pesan untuk user.
+    """
+    accounts = accounts if accounts is not None else account_cache.by_code()
+    normalized = []
+    debit_cents = 0
+    credit_cents = 0
+    debit_codes = set()
+    credit_codes = set()
+    
+    for index, line in enumerate(lines, start=1):
+        account_code = (line.get('account_code') or '').strip()
+        try:
+            debit = round(float(line.get('debit') or 0), 2)
+            credit = round(float(line.get('credit') or 0), 2)
+        except (TypeError, ValueError):
+            raise ValueError(f'Baris {index}: jumlah harus berupa angka!')
+        # inf/nan lolos dari float() dan nan lolos dari perbandingan '> 0'; cek dalam sen
+        # supaya nilai yang meluap saat dikali 100 juga ditolak sebelum round()
+        if not (math.isfinite(debit * 100) and math.isfinite(credit * 100)):
+            raise ValueError(f'Baris {index}: jumlah harus berupa angka!')
+        
+        account = accounts.get(account_code)
+        if not account or not account.is_active:
+            raise ValueError(f'Baris {index}: akun {account_code or "-"} tidak valid!')
+        if not ((debit > 0 and credit == 0) or (credit > 0 and debit == 0)):
+            raise ValueError(f'Baris {index}: isi salah satu dari debit atau kredit dengan nilai lebih dari 0!')
+        
+        if debit:
+            debit_cents += round(debit * 100)
+            debit_codes.add(account_code)
+        else:
+            credit_cents += round(credit * 100)
+            credit_codes.add(account_code)
+        normalized.append((account, debit, credit))
+    
+    if len(normalized) < 2:
+        raise ValueError('Jurnal minimal terdiri dari 2 baris!')
+    if debit_codes & credit_codes:
+        raise ValueError('Akun debit dan kredit tidak boleh sama!')
+    if debit_cents != credit_cents:
+        raise ValueError(f'Jurnal tidak seimbang: debit Rp {debit_cents / 100:,.2f}, kredit Rp {credit_cents / 100:,.2f}')
+    
+    return normalized, debit_cents / 100
+
+def journal_entry_rows(transaction, lines, user_id):
+    """Baris JournalEntry (dict untuk insert batch) dari hasil validate_journal_lines"""
+    return [{
+        'date': transaction.date,
+        'description': transaction.description,
+        'account_code': account.account_code,
+        'account_name': account.account_name,
+        'debit': debit,
+        'credit': credit,
+        'reference': f"TRX-{transaction.id}",
+        'transaction_id': transaction.id,
+        'created_by': user_id,
+        'entry_type': 'regular'
+    } for account, debit, credit in lines]
+
+def new_journal_transaction(user_id, date, description, lines, total):
+    """Transaction ringkasan untuk baris yang sudah divalidasi (akun debit/kredit pertama)"""
+    return Transaction(
+        date=date,
+        description=description,
+        account_debit=next(account.account_code for account, debit, _ in lines if debit),
+        account_credit=next(account.account_code for account, _, credit in lines if credit),
+        amount=total,
+        line_count=len(lines),
+        created_by=user_id
+    )
+
+def post_journal(user_id, date, description, lines, idempotency_key=None, idempotency_hash=None):
+    """Simpan jurnal (2 baris atau majemuk): satu Transaction + insert batch semua baris; caller yang commit"""
+    normalized, total = validate_journal_lines(lines)
+    transaction = new_journal_transaction(user_id, date, description, normalized, total)
+    transaction.idempotency_key = idempotency_key
+    transaction.idempotency_hash = idempotency_hash
+    db.session.add(transaction)
+    db.session.flush()
+    db.session.execute(insert(JournalEntry), journal_entry_rows(transaction, normalized, user_id))
+    return transaction
+
+def reversal_rows(lines, **values):
+    """Baris pembalik (debit <-> kredit) untuk baris jurnal yang dibatalkan; baris asal tidak diubah"""
+    return [dict({
+        'date': line.date,
+        'description': f"Pembatalan: {line.description}"[:500],
+        'account_code': line.account_code,
+        'account_name': line.account_name,
+        'debit': line.credit,
+        'credit': line.debit,
+        'reference': f"VOID-{line.reference}"[:100] if line.reference else None,
+        'transaction_id': line.transaction_id,
+        'adjusting_entry_id': line.adjusting_entry_id,
+        'reverses_entry_id': line.id,
+        'created_by': line.created_by,
+        'entry_type': line.entry_type
+    }, **values) for line in lines]
+
+def void_transaction(transaction):
+    """Batalkan transaksi dengan jurnal pembalik; journal_entries tetap append-only. Caller yang commit
+
+    voided_at diisi lewat UPDATE bersyarat sehingga dua pembatalan bersamaan tidak
+    menghasilkan dua jurnal pembalik.
+    """
+    if transaction.reverses_id is not None:
+        raise ValueError('Transaksi pembalik tidak dapat dibatalkan!')
+    
+    voided = db.session.execute(
+        update(Transaction)
+        .where(Transaction.id == transaction.id, Transaction.voided_at.is_(None))
+        .values(voided_at=datetime.utcnow())
+    ).rowcount
+    if not voided:
+        raise ValueError('Transaksi ini sudah dibatalkan!')
+    
+    lines = JournalEntry.query.filter(JournalEntry.transaction_id == transaction.id,
+                                      JournalEntry.reverses_entry_id.is_(None))\
+        .order_by(JournalEntry.id).all()
+    reversal = Transaction(
+        date=transaction.date,
+        description=f"Pembatalan: {transaction.description}"[:500],
+        account_debit=transaction.account_credit,
+        account_credit=transaction.account_debit,
+        amount=transaction.amount,
+        line_count=transaction.line_count,
+        reverses_id=transaction.id,
+        created_by=transaction.created_by
+    )
+    db.session.add(reversal)
+    db.session.flush()
+    db.session.execute(insert(JournalEntry), reversal_rows(lines, transaction_id=reversal.id))
+    return reversal
+
+def void_adjusting_entry(entry):
+    """Batalkan jurnal penyesuaian dengan baris pembalik (tetap entry_type 'adjusting'); caller yang commit"""
+    voided = db.session.execute(
+        update(AdjustingEntry)
+        .where(AdjustingEntry.id == entry.id, AdjustingEntry.voided_at.is_(None))
+        .values(voided_at=datetime.utcnow())
+    ).rowcount
+    if not voided:
+        raise ValueError('Jurnal penyesuaian ini sudah dibatalkan!')
+    
+    lines = JournalEntry.query.filter(JournalEntry.adjusting_entry_id == entry.id,
+                                      JournalEntry.reverses_entry_id.is_(None))\
+        .order_by(JournalEntry.id).all()
+    db.session.execute(insert(JournalEntry), reversal_rows(lines))
+
+def post_journal_once(user_id, idempotency_key, date, description, lines, idempotency_hash=None):
+    """post_journal yang aman diulang: (transaction, created)
+
+    Kunci yang sama untuk user yang sama mengembalikan transaksi yang sudah ada. Dua request
+    bersamaan dengan kunci sama diselesaikan oleh unique index (created_by, idempotency_key):
+    yang kalah di-rollback lalu membaca transaksi pemenang. Commit dilakukan di sini.
+    """
+    if idempotency_key:
+        existing = Transaction.query.filter_by(created_by=user_id, idempotency_key=idempotency_key).first()
+        if existing:
+            return existing, False
+    
+    try:
+        transaction = post_journal(user_id, date, description, lines, idempotency_key, idempotency_hash)
+        db.session.commit()
+        bump_ledger_version(user_id)
+        return transaction, True
+    except IntegrityError:
+        db.session.rollback()
+        if not idempotency_key:
+            raise
+        existing = Transaction.query.filter_by(created_by=user_id, idempotency_key=idempotency_key).first()
+        if existing is None:
+            raise
+        return existing, False
+
+# Laporan yang bisa dilayani sebagai JSON read-only (lihat juga asgi.py)
+REPORT_INCLUDES_ADJUSTING = {
+    'trial_balance': False,
+    'adjusted_trial_balance': True,
+    'financial_statements': True,
+}
+
+class TrialBalance:
+    def __init__(self, period=None, include_adjusting=True):
+        self.period = period or datetime.now().strftime('%B %Y')
+        self.accounts_data = []
+        self.total_debit = 0
+        self.total_credit = 0
+        self.include_adjusting = include_adjusting
+        self._tree = None
+        
+    def add_account_balance(self, account, debit, credit):
+        self.accounts_data.append({
+            'account': account,
+            'debit': debit,
+            'credit': credit
+        })
+        self.total_debit += debit
+        self.total_credit += credit
+        self._tree = None
+    
+    @property
+    def tree(self):
+        """AccountTree dengan total roll-up, dibangun sekali setelah semua saldo masuk"""
+        if self._tree is None:
+            self._tree = AccountTree(self.accounts_data)
+        return self._tree
+    
+    def add_normal_balance(self, account, total_debit, total_credit):
+        """Tempatkan saldo akun di sisi debit/kredit sesuai saldo normalnya"""
+        if account.normal_balance == 'Debit':
+            balance = total_debit - total_credit
+            if balance >= 0:
+                self.add_account_balance(account, abs(balance), 0)
+            else:
+                self.add_account_balance(account, 0, abs(balance))
+        else:
+            balance = total_credit - total_debit
+            if balance >= 0:
+                self.add_account_balance(account, 0, abs(balance))
+            else:
+                self.add_account_balance(account, abs(balance), 0)
+    
+    def is_balanced(self):
+        return abs(self.total_debit - self.total_credit) < 0.01
+    
+    def get_difference(self):
+        return abs(self.total_debit - self.total_credit)
+    
+
+class AccountTree:
+    """Hierarki tipe -> kategori -> akun (-> sub-akun lewat parent_code)
+
+    Total debit/kredit setiap node dihitung sekali secara bottom-up dari saldo
+    neraca saldo, jadi drill-down ke level mana pun cukup satu lookup dict.
+    Key node: 'type:<tipe>', 'category:<tipe>/<kategori>', 'account:<kode>'.
+    """
+    def __init__(self, accounts_data):
+        self.nodes = {}
+        self.roots = []
+        
+        for item in accounts_data:
+            account = item['account']
+            type_key = self._add_node(f'type:{account.account_type}', 'type', account.account_type, None)
+            category_key = self._add_node(f'category:{account.account_type}/{account.category}', 'category',
+                                          account.category, type_key)
+            node = self.nodes[self._add_node(f'account:{account.account_code}', 'account',
+                                             account.account_name, category_key)]
+            node.update(code=account.account_code, debit=item['debit'], credit=item['credit'], count=1)
+            node['parent_code'] = account.parent_code
+        
+        # Sambungkan sub-akun ke akun induknya (jika induknya ada di neraca saldo dan bertipe sama,
+        # agar saldo tidak masuk ke total tipe/kategori lain)
+        for node in list(self.nodes.values()):
+            parent_code = node.pop('parent_code', None)
+            parent_key = f'account:{parent_code}'
+            if parent_code and parent_key in self.nodes and self._root(parent_key) == self._root(node['key'])\
+                    and not self._is_descendant(parent_key, node['key']):
+                self.nodes[node['parent']]['children'].remove(node['key'])
+                node['parent'] = parent_key
+                self.nodes[parent_key]['children'].append(node['key'])
+        
+        # Roll-up bottom-up: node terdalam dulu, tiap node menambah total ke induknya
+        for node in sorted(self.nodes.values(), key=self._depth, reverse=True):
+            if node['parent']:
+                parent = self.nodes[node['parent']]
+                parent['debit'] += node['debit']
+                parent['credit'] += node['credit']
+                parent['count'] += node['count']
+    
+    def _add_node(self, key, level, name, parent):
+        if key not in self.nodes:
+            self.nodes[key] = {
+                'key': key, 'level': level, 'name': name, 'parent': parent,
+                'children': [], 'debit': 0, 'credit': 0, 'count': 0
+            }
+            if parent:
+                self.nodes[parent]['children'].append(key)
+            else:
+                self.roots.append(key)
+        return key
+    
+    def _is_descendant(self, key, ancestor_key):
+        while key:
+            if key == ancestor_key:
+                return True
+            key = self.nodes[key]['parent']
+        return False
+    
+    def _root(self, key):
+        while self.nodes[key]['parent']:
+            key = self.nodes[key]['parent']
+        return key
+    
+    def _depth(self, node):
+        depth = 0
+        while node['parent']:
+            node = self.nodes[node['parent']]
+            depth += 1
+        return depth
+    
+    def node(self, key):
+        return self.nodes.get(key)
+    
+    def children(self, key=None):
+        keys = self.nodes[key]['children'] if key else self.roots
+        return [self.nodes[child] for child in keys]
+    
+    def summary(self, level='type'):
+        """Total per node pada satu level, di-key dengan key node (nama kategori bisa sama antar tipe)"""
+        return {
+            node['key']: {'name': node['name'], 'debit': node['debit'], 'credit': node['credit'], 'count': node['count']}
+            for node in self.nodes.values() if node['level'] == level
+        }
+
+class FinancialStatement:
+    def __init__(self, period=None, layout=None):
+        self.period = period or datetime.now().strftime('%B %Y')
+        self.layout = layout or account_cache.layout()
+        self.income_statement = {}
+        self.balance_sheet = {}
         
-        # Harga Pokok Penjualan (HPP)
-        hpp_accounts = [item for item in trial_balance.accounts_data 
-                       if item['account'].account_code in ['5101', '5901']]
-        total_hpp = sum(item['debit'] - item['credit'] for item in hpp_accounts)
+    def calculate_income_statement(self, trial_balance):
+        """Calculate Income Statement according to accounting principles"""
+        sections, lines = self.layout.summarize(trial_balance, 'laba_rugi')
         
-        # Laba Kotor (Gross Profit)
+        # Pendapatan dikurangi Harga Pokok Penjualan (HPP) = Laba Kotor
+        total_revenue = sections.get('pendapatan', 0)
+        total_hpp = sections.get('hpp', 0)
         gross_profit = total_revenue - total_hpp
         
         # Beban Operasional
         operating_expenses_detailed = {
-            'beban_transportasi': 0,
-            'beban_tenaga_kerja': 0,
-            'beban_sewa': 0,
-            'beban_perbaikan': 0,
-            'beban_penyusutan': 0,
-            'beban_lain_lain': 0,
-            'total': 0
+            line: lines[line] for line in self.layout.section_lines('laba_rugi', 'beban_operasional')
         }
-        
-        expense_accounts = [item for item in trial_balance.accounts_data 
-                          if item['account'].account_type == 'Beban' 
-                          and item['account'].account_code not in ['5101', '5901']]
-        
-        for item in expense_accounts:
-            amount = item['debit'] - item['credit']
-            account_code = item['account'].account_code
-            
-            if account_code == '5201':
-                operating_expenses_detailed['beban_transportasi'] = amount
-            elif account_code == '5202':
-                operating_expenses_detailed['beban_tenaga_kerja'] = amount
-            elif account_code == '5203':
-                operating_expenses_detailed['beban_sewa'] = amount
-            elif account_code == '5204':
-                operating_expenses_detailed['beban_perbaikan'] = amount
-            elif account_code == '5301':
-                operating_expenses_detailed['beban_penyusutan'] = amount
-            else:
-                operating_expenses_detailed['beban_lain_lain'] += amount
-        
-        operating_expenses_detailed['total'] = sum([
-            operating_expenses_detailed['beban_transportasi'],
-            operating_expenses_detailed['beban_tenaga_kerja'],
-            operating_expenses_detailed['beban_sewa'],
-            operating_expenses_detailed['beban_perbaikan'],
-            operating_expenses_detailed['beban_penyusutan'],
-            operating_expenses_detailed['beban_lain_lain']
-        ])
+        operating_expenses_detailed['total'] = sections.get('beban_operasional', 0)
         
         net_income_before_tax = gross_profit - operating_expenses_detailed['total']
         
@@ -455,56 +2105,21 @@ class FinancialStatement:
     
     def calculate_balance_sheet(self, trial_balance, net_income):
         """Calculate Balance Sheet according to accounting principles"""
-        asset_accounts = trial_balance.get_accounts_by_type('Aset')
-        asset_contra_accounts = trial_balance.get_accounts_by_type('Aset Kontra')
+        sections, lines = self.layout.summarize(trial_balance, 'neraca')
         
-        total_assets = sum(item['debit'] - item['credit'] for item in asset_accounts)
-        
-        kas_bank = 0
-        persediaan = 0
-        peralatan = 0
-        akumulasi_penyusutan = 0
-        
-        for item in asset_accounts:
-            amount = item['debit'] - item['credit']
-            account_code = item['account'].account_code
-            
-            if account_code == '1101':
-                kas_bank = amount
-            elif account_code == '1201':
-                persediaan = amount
-            elif account_code == '1301':
-                peralatan = amount
-        
-        for item in asset_contra_accounts:
-            amount = item['credit'] - item['debit']
-            account_code = item['account'].account_code
-            
-            if account_code == '1311':
-                akumulasi_penyusutan = amount
-        
-        liability_accounts = trial_balance.get_accounts_by_type('Liabilitas')
-        total_liabilities = sum(item['credit'] - item['debit'] for item in liability_accounts)
-        
-        utang_usaha = 0
-        utang_lainnya = 0
-        
-        for item in liability_accounts:
-            amount = item['credit'] - item['debit']
-            if utang_usaha == 0:
-                utang_usaha = amount * 0.6
-                utang_lainnya = amount * 0.4
-        
-        equity_accounts = trial_balance.get_accounts_by_type('Ekuitas')
-        initial_equity = 0
-        prive = 0
+        total_assets = sections.get('aset', 0)
+        akumulasi_penyusutan = sections.get('aset_kontra', 0)
+        assets_detailed = {
+            line: lines[line]
+            for section in ('aset', 'aset_kontra')
+            for line in self.layout.section_lines('neraca', section)
+        }
         
-        for item in equity_accounts:
-            if item['account'].account_code == '3101':
-                initial_equity = item['credit'] - item['debit']
-            elif item['account'].account_code == '3102':
-                prive = item['debit'] - item['credit']
+        total_liabilities = sections.get('liabilitas', 0)
+        liabilities_detailed = {line: lines[line] for line in self.layout.section_lines('neraca', 'liabilitas')}
         
+        initial_equity = lines.get('modal_awal', 0)
+        prive = lines.get('prive', 0)
         ending_equity = initial_equity + net_income - prive
         
         self.balance_sheet = {
@@ -513,78 +2128,41 @@ class FinancialStatement:
             'equity': ending_equity,
             'initial_equity': initial_equity,
             'prive': prive,
-            'assets_detailed': {
-                'kas_bank': kas_bank,
-                'persediaan': persediaan,
-                'peralatan': peralatan,
-                'akumulasi_penyusutan': akumulasi_penyusutan
-            },
-            'liabilities_detailed': {
-                'utang_usaha': utang_usaha,
-                'utang_lainnya': utang_lainnya
-            }
+            'assets_detailed': assets_detailed,
+            'liabilities_detailed': liabilities_detailed
         }
         
         return self.balance_sheet
 
 class ClosingProcessor:
-    def __init__(self, user_id, period=None):
+    def __init__(self, user_id, period=None, period_key=None):
         self.user_id = user_id
-        self.period = period or datetime.now().strftime('%B %Y')
+        self.period_key = period_key or current_period_key()
+        self.period_start, self.period_end = period_bounds(self.period_key)
+        self.period = period or format_period(self.period_key)
+        # Periode yang sudah lewat ditutup per hari terakhirnya, periode berjalan per hari ini
+        self.closing_date = min(datetime.now(), self.period_end - timedelta(seconds=1))
         self.closing_entries = []
         self.net_income = 0
         self.reference_counter = 1
+        self.trial_balance = None
         
     def _generate_unique_reference(self, entry_type):
-        base_ref = f"CLS-{entry_type}-{datetime.now().strftime('%Y%m%d')}"
+        base_ref = f"CLS-{entry_type}-{self.closing_date.strftime('%Y%m%d')}-U{self.user_id}"
         unique_ref = f"{base_ref}-{self.reference_counter:03d}"
         self.reference_counter += 1
         return unique_ref
         
+    def get_adjusted_trial_balance(self):
+        # Saldo sampai akhir periode; transaksi bulan berikutnya tidak ikut ditutup
+        return LedgerProcessor(self.user_id).get_trial_balance(include_adjusting=True, end_date=self.period_end)
+    
     def get_adjusted_trial_balance_data(self):
-        ledger_processor = LedgerProcessor(self.user_id)
-        accounts = Account.query.filter_by(is_active=True).all()
-        
-        trial_balance_data = []
-        
-        for account in accounts:
-            balance = ledger_processor.get_account_balance(account.account_code, include_adjusting=True)
-            
-            if account.normal_balance == 'Debit':
-                if balance >= 0:
-                    trial_balance_data.append({
-                        'account': account,
-                        'debit': abs(balance),
-                        'credit': 0
-                    })
-                else:
-                    trial_balance_data.append({
-                        'account': account,
-                        'debit': 0,
-                        'credit': abs(balance)
-                    })
-            else:
-                if balance >= 0:
-                    trial_balance_data.append({
-                        'account': account,
-                        'debit': 0,
-                        'credit': abs(balance)
-                    })
-                else:
-                    trial_balance_data.append({
-                        'account': account,
-                        'debit': abs(balance),
-                        'credit': 0
-                    })
-        
-        return trial_balance_data
+        return self.get_adjusted_trial_balance().accounts_data
     
-    def get_income_statement_data(self):
-        trial_balance_data = self.get_adjusted_trial_balance_data()
-        
-        trial_balance_obj = TrialBalance(include_adjusting=True)
-        for item in trial_balance_data:
-            trial_balance_obj.add_account_balance(item['account'], item['debit'], item['credit'])
+    def get_income_statement_data(self, trial_balance_obj=None):
+        if trial_balance_obj is None:
+            trial_balance_obj = self.get_adjusted_trial_balance()
         
         financial_stmt = FinancialStatement()
         income_stmt = financial_stmt.calculate_income_statement(trial_balance_obj)
@@ -594,58 +2172,67 @@ class ClosingProcessor:
     def generate_closing_entries(self):
         self.closing_entries = []
         
-        trial_balance_data = self.get_adjusted_trial_balance_data()
-        self.net_income = self.get_income_statement_data()
+        trial_balance_obj = self.trial_balance = self.get_adjusted_trial_balance()
+        trial_balance_data = trial_balance_obj.accounts_data
+        self.net_income = self.get_income_statement_data(trial_balance_obj)
         
-        revenue_accounts = [item for item in trial_balance_data 
-                          if item['account'].account_type == 'Pendapatan' and item['credit'] > 0]
+        # Akun nominal dipilih dari layout laba rugi (StatementLayout), masing-masing tepat sekali
+        layout = account_cache.layout()
+        closing_groups = {'Pendapatan': [], 'Beban': [], 'HPP': []}
+        for item in trial_balance_data:
+            rule = layout.resolve('laba_rugi', item['account'])
+            if rule is None:
+                continue
+            section, line, debit_normal = rule
+            if debit_normal:
+                amount = item['debit'] - item['credit']
+                group = 'HPP' if section == 'hpp' else 'Beban'
+            else:
+                amount = item['credit'] - item['debit']
+                group = 'Pendapatan'
+            if amount > 0:
+                closing_groups[group].append((item['account'], amount))
         
-        for item in revenue_accounts:
+        for account, amount in closing_groups['Pendapatan']:
             entry = ClosingEntry(
-                date=datetime.now(),
+                date=self.closing_date,
                 reference=self._generate_unique_reference('REV'),
-                description=f"Penutupan akun pendapatan {item['account'].account_name}",
-                account_debit_code=item['account'].account_code,
-                account_debit_name=item['account'].account_name,
+                description=f"Penutupan akun pendapatan {account.account_name}",
+                account_debit_code=account.account_code,
+                account_debit_name=account.account_name,
                 account_credit_code='3901',
                 account_credit_name='Ikhtisar Laba Rugi',
-                amount=item['credit'],
+                amount=amount,
                 entry_type='Pendapatan',
                 created_by=self.user_id
             )
             self.closing_entries.append(entry)
         
-        expense_accounts = [item for item in trial_balance_data 
-                          if item['account'].account_type == 'Beban' and item['debit'] > 0]
-        
-        for item in expense_accounts:
+        for account, amount in closing_groups['Beban']:
             entry = ClosingEntry(
-                date=datetime.now(),
+                date=self.closing_date,
                 reference=self._generate_unique_reference('EXP'),
-                description=f"Penutupan akun beban {item['account'].account_name}",
+                description=f"Penutupan akun beban {account.account_name}",
                 account_debit_code='3901',
                 account_debit_name='Ikhtisar Laba Rugi',
-                account_credit_code=item['account'].account_code,
-                account_credit_name=item['account'].account_name,
-                amount=item['debit'],
+                account_credit_code=account.account_code,
+                account_credit_name=account.account_name,
+                amount=amount,
                 entry_type='Beban',
                 created_by=self.user_id
             )
             self.closing_entries.append(entry)
         
-        hpp_accounts = [item for item in trial_balance_data 
-                       if item['account'].account_code in ['5101', '5901'] and item['debit'] > 0]
-        
-        for item in hpp_accounts:
+        for account, amount in closing_groups['HPP']:
             entry = ClosingEntry(
-                date=datetime.now(),
+                date=self.closing_date,
                 reference=self._generate_unique_reference('HPP'),
-                description=f"Penutupan akun {item['account'].account_name}",
+                description=f"Penutupan akun {account.account_name}",
                 account_debit_code='3901',
                 account_debit_name='Ikhtisar Laba Rugi',
-                account_credit_code=item['account'].account_code,
-                account_credit_name=item['account'].account_name,
-                amount=item['debit'],
+                account_credit_code=account.account_code,
+                account_credit_name=account.account_name,
+                amount=amount,
                 entry_type='HPP',
                 created_by=self.user_id
             )
@@ -654,7 +2241,7 @@ class ClosingProcessor:
         if self.net_income != 0:
             if self.net_income > 0:
                 entry = ClosingEntry(
-                    date=datetime.now(),
+                    date=self.closing_date,
                     reference=self._generate_unique_reference('INCOME'),
                     description='Penutupan Ikhtisar Laba Rugi (Laba) ke Modal',
                     account_debit_code='3901',
@@ -667,7 +2254,7 @@ class ClosingProcessor:
                 )
             else:
                 entry = ClosingEntry(
-                    date=datetime.now(),
+                    date=self.closing_date,
                     reference=self._generate_unique_reference('LOSS'),
                     description='Penutupan Ikhtisar Laba Rugi (Rugi) ke Modal',
                     account_debit_code='3101',
@@ -685,7 +2272,7 @@ class ClosingProcessor:
         
         for item in prive_accounts:
             entry = ClosingEntry(
-                date=datetime.now(),
+                date=self.closing_date,
                 reference=self._generate_unique_reference('PRIVE'),
                 description='Penutupan akun prive ke modal',
                 account_debit_code='3101',
@@ -700,6 +2287,10 @@ class ClosingProcessor:
         
         return self.closing_entries
     
+    def get_period_statements(self):
+        """Laba rugi dari jurnal bertanggal di dalam periode, neraca per akhir periode"""
+        return build_period_statements(self.user_id, self.period_key, self.trial_balance)
+    
     def save_closing_entries(self):
         try:
             ClosingEntry.query.filter_by(created_by=self.user_id).delete()
@@ -707,7 +2298,14 @@ class ClosingProcessor:
             for entry in self.closing_entries:
                 db.session.add(entry)
             
+            # Materialisasi laporan keuangan periode yang ditutup
+            if self.trial_balance is not None:
+                income_stmt, balance_sheet = self.get_period_statements()
+                save_income_statement(self.user_id, self.period_key, income_stmt, balance_sheet)
+            
             db.session.commit()
+            # Snapshot periode yang ditutup ikut ditampilkan dari cache fragment
+            bump_ledger_version(self.user_id)
             return True, f"Berhasil menyimpan {len(self.closing_entries)} closing entries"
         except Exception as e:
             db.session.rollback()
@@ -736,8 +2334,1088 @@ class PostClosingTrialBalance:
     def get_difference(self):
         return abs(self.total_debit - self.total_credit)
     
-    def get_accounts_by_type(self, account_type):
-        return [item for item in self.real_accounts_data if item['account'].account_type == account_type]
+
+# ==================== METRICS (PROMETHEUS) ====================
+class LedgerCollector:
+    """Gauge jumlah jurnal, dihitung saat /metrics di-scrape (GROUP BY + satu COUNT per tenant)
+
+    Default hanya total semua user; label user_id (data per tenant) hanya jika per_user=True
+    (METRICS_PER_USER=1).
+    """
+    def __init__(self, app, per_user=False):
+        self.app = app
+        self.per_user = per_user
+    
+    def _gauge(self):
+        from prometheus_client.core import GaugeMetricFamily
+        if self.per_user:
+            return GaugeMetricFamily('tandur_journal_entries', 'Jumlah baris jurnal per user', labels=['user_id'])
+        return GaugeMetricFamily('tandur_journal_entries', 'Jumlah baris jurnal semua user')
+    
+    def describe(self):
+        # Dipanggil saat register; jangan query database di sini
+        yield self._gauge()
+    
+    def collect(self):
+        gauge = self._gauge()
+        with self.app.app_context():
+            counts = tenant_router.count_rows_by_user(JournalEntry)
+        if not self.per_user:
+            gauge.add_metric([], sum(counts.values()))
+            yield gauge
+            return
+        for user_id, count in counts.items():
+            gauge.add_metric([str(user_id)], count)
+        yield gauge
+
+class Metrics:
+    """Metrik Prometheus di /metrics
+
+    Dengan gunicorn multi-worker, set PROMETHEUS_MULTIPROC_DIR ke direktori bersama
+    (lihat gunicorn.conf.py) agar nilai dari semua worker diagregasi saat scrape.
+    """
+    latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self.per_user = False
+    
+    def init_app(self, app):
+        self.app = app
+        self.per_user = _env_flag('METRICS_PER_USER')
+        if not _env_flag('METRICS_ENABLED', True):
+            return False
+        try:
+            from prometheus_client import Counter, Histogram, REGISTRY
+        except ImportError:
+            print("prometheus_client tidak terpasang, /metrics dimatikan")
+            return False
+        
+        if self.enabled:
+            return True
+        
+        self.request_latency = Histogram(
+            'tandur_request_duration_seconds', 'Latensi request per route',
+            ['endpoint', 'method', 'status'], buckets=self.latency_buckets)
+        self.request_db_time = Histogram(
+            'tandur_request_db_seconds', 'Total waktu query DB per request',
+            ['endpoint'], buckets=self.latency_buckets)
+        self.cache_requests = Counter(
+            'tandur_cache_requests_total', 'Akses cache (hit/miss) per cache', ['cache', 'result'])
+        self.job_duration = Histogram(
+            'tandur_job_duration_seconds', 'Durasi job background (termasuk closing)',
+            ['job', 'status'], buckets=self.latency_buckets + (60, 120, 300))
+        self.lock_wait = Histogram(
+            'tandur_user_lock_wait_seconds', 'Waktu antre lock per user (closing, import, month-end)',
+            ['lock', 'result'], buckets=self.latency_buckets + (60,))
+        
+        if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            REGISTRY.register(LedgerCollector(app, self.per_user))
+        
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        self.enabled = True
+        return True
+    
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+    
+    def _finish_request(self, response):
+        started = g.get('_metrics_started')
+        if started is None:
+            return response
+        
+        endpoint = request.endpoint or 'unknown'
+        self.request_latency.labels(endpoint, request.method, str(response.status_code))\
+            .observe(time.perf_counter() - started)
+        
+        stats = g.get('_sql_stats')
+        if stats is not None:
+            self.request_db_time.labels(endpoint).observe(stats['db_time'])
+        return response
+    
+    def cache_result(self, cache, hit):
+        if self.enabled:
+            self.cache_requests.labels(cache, 'hit' if hit else 'miss').inc()
+    
+    def observe_job(self, job, status, seconds):
+        if self.enabled:
+            self.job_duration.labels(job, status).observe(seconds)
+    
+    def observe_lock_wait(self, lock, acquired, seconds):
+        if self.enabled:
+            self.lock_wait.labels(lock, 'acquired' if acquired else 'timeout').observe(seconds)
+    
+    def render(self):
+        from prometheus_client import CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+        
+        registry = REGISTRY
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            from prometheus_client import multiprocess
+            # Agregasi file metrik dari semua proses worker
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            registry.register(LedgerCollector(self.app, self.per_user))
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+metrics = Metrics()
+
+# ==================== INSTRUMENTASI SQL ====================
+class SQLInstrumentation:
+    """Hitung query, waktu DB, statement terlambat dan jumlah baris per request (opt-in)
+
+    Aktif jika SQL_INSTRUMENTATION=1. Hasil dikirim sebagai header Server-Timing
+    dan satu baris log JSON (logger 'app.sql'); route dengan query melebihi
+    SQL_QUERY_THRESHOLD ditandai 'flagged' dan di-log sebagai warning.
+    """
+    slowest_kept = 5
+    
+    def __init__(self):
+        self.enabled = False
+        self.collecting = False
+        self.threshold = 50
+        self.logger = logging.getLogger('app.sql')
+        self._listening = False
+    
+    def init_app(self, app, collect=False):
+        """collect=True: tetap kumpulkan statistik (mis. untuk /metrics) walau laporan dimatikan"""
+        self.enabled = _env_flag('SQL_INSTRUMENTATION')
+        self.collecting = self.enabled or collect
+        self.threshold = int(os.environ.get('SQL_QUERY_THRESHOLD', 50))
+        app.config['SQL_INSTRUMENTATION'] = self.enabled
+        if not self.collecting:
+            return
+        
+        if self.enabled:
+            self.logger.setLevel(logging.INFO)
+            if not self.logger.handlers and not logging.getLogger().handlers:
+                handler = logging.StreamHandler()
+                handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+                self.logger.addHandler(handler)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(db.Model, 'load', self._on_load, propagate=True)
+            self._listening = True
+    
+    def _stats(self):
+        if not has_request_context():
+            return None
+        return g.get('_sql_stats')
+    
+    def _start_request(self):
+        g._sql_stats = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'db_time': 0.0,
+            'rows': 0,
+            'slowest': []
+        }
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('_query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        
+        stats = self._stats()
+        if stats is None:
+            return
+        
+        stats['queries'] += 1
+        stats['db_time'] += elapsed
+        # rowcount hanya berarti untuk DML; baris SELECT dihitung lewat event load ORM
+        if cursor.rowcount and cursor.rowcount > 0 and not statement.lstrip().upper().startswith('SELECT'):
+            stats['rows'] += cursor.rowcount
+        
+        entry = (elapsed, stats['queries'], ' '.join(statement.split())[:300])
+        if len(stats['slowest']) < self.slowest_kept:
+            heapq.heappush(stats['slowest'], entry)
+        else:
+            heapq.heappushpop(stats['slowest'], entry)
+    
+    def _on_load(self, target, context):
+        stats = self._stats()
+        if stats is not None:
+            stats['rows'] += 1
+    
+    def _finish_request(self, response):
+        stats = self._stats()
+        if stats is None or not self.enabled:
+            return response
+        
+        total_ms = (time.perf_counter() - stats['started']) * 1000
+        db_ms = stats['db_time'] * 1000
+        flagged = stats['queries'] > self.threshold
+        
+        response.headers.add('Server-Timing', f'db;dur={db_ms:.2f};desc="{stats["queries"]} queries"')
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.2f}')
+        
+        record = {
+            'route': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats['queries'],
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'rows': stats['rows'],
+            'flagged': flagged,
+            'slowest': [
+                {'ms': round(elapsed * 1000, 2), 'sql': statement}
+                for elapsed, _, statement in sorted(stats['slowest'], reverse=True)
+            ]
+        }
+        self.logger.log(logging.WARNING if flagged else logging.INFO, json.dumps(record))
+        return response
+
+sql_instrumentation = SQLInstrumentation()
+
+# ==================== SAMPLING PROFILER ====================
+class RequestSampler(threading.Thread):
+    """Thread yang mengambil sampel stack thread request setiap `interval` detik"""
+    def __init__(self, profiler, thread_id, interval):
+        super().__init__(daemon=True, name='profiler-sampler')
+        self.profiler = profiler
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = {}
+        self.stopped = threading.Event()
+    
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            
+            stack = []
+            in_orm = False
+            while frame is not None:
+                code = frame.f_code
+                filename = code.co_filename
+                if 'sqlalchemy' in filename and f'{os.sep}orm{os.sep}' in filename:
+                    in_orm = True
+                stack.append(f"{code.co_name} ({os.path.basename(filename)})".replace(';', ':'))
+                frame = frame.f_back
+            stack.reverse()
+            
+            phase = self.profiler.current_phase(self.thread_id)
+            if phase == 'compute' and in_orm:
+                phase = 'orm'
+            key = (phase, tuple(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+    
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+class SamplingProfiler:
+    """Profiler sampling untuk request lambat
+
+    - Per request: admin (PROFILE_ADMINS) mengirim header `X-Profile: 1`.
+    - Otomatis: PROFILE_SLOW_MS > 0 menyampel semua request dan menyimpan yang lebih lambat.
+    Sampel dipisah per fase (query, orm, compute, render) dan disimpan dalam format
+    folded stack (flamegraph.pl / speedscope) di PROFILE_DIR.
+    """
+    def __init__(self):
+        self.phases = {}
+        self.slow_ms = 0
+        self.enabled = False
+    
+    def init_app(self, app):
+        self.slow_ms = float(os.environ.get('PROFILE_SLOW_MS', 0))
+        self.interval = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+        self.admins = {name.strip() for name in os.environ.get('PROFILE_ADMINS', 'admin').split(',') if name.strip()}
+        self.directory = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        self.keep = int(os.environ.get('PROFILE_KEEP', 50))
+        
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        
+        if not self.enabled:
+            before_render_template.connect(self._before_render, weak=False)
+            template_rendered.connect(self._after_render, weak=False)
+            event.listen(Engine, 'before_cursor_execute', self._before_query)
+            event.listen(Engine, 'after_cursor_execute', self._after_query)
+            self.enabled = True
+    
+    def is_admin(self):
+        return current_user.is_authenticated and current_user.username in self.admins
+    
+    # ---- pelacakan fase per thread ----
+    def current_phase(self, thread_id):
+        stack = self.phases.get(thread_id)
+        return stack[-1] if stack else 'compute'
+    
+    def _push(self, phase):
+        stack = self.phases.get(threading.get_ident())
+        if stack is not None:
+            stack.append(phase)
+    
+    def _pop(self):
+        stack = self.phases.get(threading.get_ident())
+        if stack and len(stack) > 1:
+            stack.pop()
+    
+    def _before_query(self, *args, **kwargs):
+        self._push('query')
+    
+    def _after_query(self, *args, **kwargs):
+        self._pop()
+    
+    def _before_render(self, sender, **kwargs):
+        self._push('render')
+    
+    def _after_render(self, sender, **kwargs):
+        self._pop()
+    
+    # ---- siklus request ----
+    def _start_request(self):
+        forced = request.headers.get('X-Profile') == '1' and self.is_admin()
+        if not forced and self.slow_ms <= 0:
+            return
+        
+        thread_id = threading.get_ident()
+        self.phases[thread_id] = ['compute']
+        sampler = RequestSampler(self, thread_id, self.interval)
+        sampler.start()
+        g._profile = {'sampler': sampler, 'forced': forced, 'started': time.perf_counter()}
+    
+    def _finish_request(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        
+        profile['sampler'].stop()
+        self.phases.pop(profile['sampler'].thread_id, None)
+        elapsed_ms = (time.perf_counter() - profile['started']) * 1000
+        
+        if profile['forced'] or elapsed_ms >= self.slow_ms:
+            name = self.save(profile['sampler'].samples, elapsed_ms, response.status_code)
+            if profile['forced']:
+                response.headers['X-Profile-Id'] = name
+        return response
+    
+    # ---- penyimpanan ----
+    def save(self, samples, elapsed_ms, status_code):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unknown'}-{int(elapsed_ms)}ms-{uuid.uuid4().hex[:6]}"
+        
+        phase_totals = {}
+        lines = []
+        for (phase, stack), count in sorted(samples.items(), key=lambda item: -item[1]):
+            phase_totals[phase] = phase_totals.get(phase, 0) + count
+            lines.append(f"{request.endpoint};phase:{phase};{';'.join(stack)} {count}")
+        
+        with open(os.path.join(self.directory, f'{name}.folded'), 'w') as fh:
+            fh.write('\n'.join(lines) + '\n')
+        
+        total = sum(phase_totals.values()) or 1
+        with open(os.path.join(self.directory, f'{name}.json'), 'w') as fh:
+            json.dump({
+                'name': name,
+                'endpoint': request.endpoint,
+                'path': request.full_path,
+                'status': status_code,
+                'elapsed_ms': round(elapsed_ms, 2),
+                'interval_ms': self.interval * 1000,
+                'samples': sum(phase_totals.values()),
+                'phases': {phase: {'samples': count, 'percent': round(count * 100 / total, 1)}
+                           for phase, count in phase_totals.items()}
+            }, fh)
+        
+        self._prune()
+        return name
+    
+    def _prune(self):
+        summaries = sorted(glob.glob(os.path.join(self.directory, '*.json')))
+        for path in summaries[:-self.keep] if self.keep > 0 else []:
+            for suffix in ('.json', '.folded'):
+                try:
+                    os.remove(path[:-len('.json')] + suffix)
+                except FileNotFoundError:
+                    pass
+    
+    def list_profiles(self):
+        profiles = []
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.json')), reverse=True):
+            with open(path) as fh:
+                profiles.append(json.load(fh))
+        return profiles
+    
+    def profile_path(self, name):
+        path = os.path.join(self.directory, f'{os.path.basename(name)}.folded')
+        return path if os.path.exists(path) else None
+
+profiler = SamplingProfiler()
+
+# ==================== BACKGROUND JOBS ====================
+class LocalJobBackend:
+    """Job dijalankan thread pool in-process, dipakai jika REDIS_URL tidak di-set
+
+    Status dan file hasil disimpan di tabel background_jobs (database utama), sehingga
+    /jobs/<id> bisa dijawab worker gunicorn mana pun, bukan hanya yang menjalankan job.
+    """
+    def __init__(self, app, max_workers=2, ttl=3600):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.ttl = ttl
+        self.table = BackgroundJob.__table__
+    
+    @property
+    def engine(self):
+        # Koneksi sendiri agar status job tidak ikut transaksi db.session milik request / job
+        with self.app.app_context():
+            return db.engine
+    
+    def save(self, job):
+        table = self.table
+        values = {'status': job['status'], 'data': json.dumps(job), 'finished_at': job.get('finished_at')}
+        with self.engine.begin() as connection:
+            updated = connection.execute(table.update().where(table.c.id == job['id']).values(**values)).rowcount
+            if not updated:
+                connection.execute(table.insert().values(id=job['id'], name=job['name'], user_id=job['user_id'],
+                                                         created_at=job['created_at'], **values))
+            if job.get('finished_at'):
+                connection.execute(table.delete().where(table.c.finished_at < time.time() - self.ttl))
+    
+    def load(self, job_id):
+        with self.engine.connect() as connection:
+            raw = connection.scalar(select(self.table.c.data).where(self.table.c.id == job_id))
+        return json.loads(raw) if raw else None
+    
+    def save_file(self, job_id, content):
+        with self.engine.begin() as connection:
+            connection.execute(self.table.update().where(self.table.c.id == job_id).values(file=content))
+    
+    def load_file(self, job_id):
+        with self.engine.connect() as connection:
+            return connection.scalar(select(self.table.c.file).where(self.table.c.id == job_id))
+    
+    def save_upload(self, job_id, content):
+        with self.engine.begin() as connection:
+            connection.execute(self.table.update().where(self.table.c.id == job_id).values(upload=content))
+    
+    def load_upload(self, job_id):
+        with self.engine.connect() as connection:
+            return connection.scalar(select(self.table.c.upload).where(self.table.c.id == job_id))
+    
+    def delete_upload(self, job_id):
+        self.save_upload(job_id, None)
+    
+    def active_job_id(self, name, user_id):
+        # Job aktif yang lebih tua dari TTL dianggap yatim (worker pemiliknya mati)
+        table = self.table
+        with self.engine.connect() as connection:
+            return connection.scalar(
+                select(table.c.id)
+                .where(table.c.name == name, table.c.user_id == user_id,
+                       table.c.status.in_(('queued', 'running')), table.c.created_at > time.time() - self.ttl)
+                .order_by(table.c.created_at.desc()).limit(1)
+            )
+    
+    def submit(self, job_id, runner):
+        self.executor.submit(runner, job_id)
+
+class RedisJobBackend:
+    """Antrian job di Redis; dijalankan oleh `flask jobs-worker` di proses terpisah"""
+    queue_key = 'tandur:jobs:queue'
+    
+    def __init__(self, url, ttl=3600):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+    
+    def _key(self, job_id, suffix='data'):
+        return f'tandur:jobs:{job_id}:{suffix}'
+    
+    def save(self, job):
+        active_key = f"tandur:jobs:active:{job['name']}:{job['user_id']}"
+        pipe = self.redis.pipeline()
+        pipe.set(self._key(job['id']), json.dumps(job), ex=self.ttl)
+        if job['status'] in ('queued', 'running'):
+            pipe.set(active_key, job['id'], ex=self.ttl)
+        else:
+            pipe.delete(active_key)
+        pipe.execute()
+    
+    def load(self, job_id):
+        raw = self.redis.get(self._key(job_id))
+        return json.loads(raw) if raw else None
+    
+    def save_file(self, job_id, content):
+        self.redis.set(self._key(job_id, 'file'), content, ex=self.ttl)
+    
+    def load_file(self, job_id):
+        return self.redis.get(self._key(job_id, 'file'))
+    
+    def save_upload(self, job_id, content):
+        self.redis.set(self._key(job_id, 'upload'), content, ex=self.ttl)
+    
+    def load_upload(self, job_id):
+        return self.redis.get(self._key(job_id, 'upload'))
+    
+    def delete_upload(self, job_id):
+        self.redis.delete(self._key(job_id, 'upload'))
+    
+    def active_job_id(self, name, user_id):
+        job_id = self.redis.get(f'tandur:jobs:active:{name}:{user_id}')
+        return job_id.decode() if job_id else None
+    
+    def submit(self, job_id, runner):
+        self.redis.rpush(self.queue_key, job_id)
+    
+    def work(self, runner, burst=False):
+        while True:
+            item = self.redis.blpop(self.queue_key, timeout=1 if burst else 5)
+            if item is None:
+                if burst:
+                    return
+                continue
+            runner(item[1].decode())
+
+class JobContext:
+    """Diberikan ke handler job untuk melaporkan progres"""
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.job = job
+    
+    @property
+    def user_id(self):
+        return self.job['user_id']
+    
+    def progress(self, percent, message=None):
+        self.job['progress'] = max(0, min(100, int(percent)))
+        if message:
+            self.job['message'] = message
+        self.queue.backend.save(self.job)
+    
+    def upload(self):
+        """Isi file yang diunggah saat enqueue (bytes), disimpan terpisah dari status job"""
+        return self.queue.backend.load_upload(self.job['id'])
+
+class JobFile:
+    """Hasil job berupa file (mis. export CSV)"""
+    def __init__(self, content, filename, mimetype, summary=None):
+        self.content = content
+        self.filename = filename
+        self.mimetype = mimetype
+        self.summary = summary or {}
+
+class JobQueue:
+    def __init__(self):
+        self.handlers = {}
+        self.backend = None
+        self.app = None
+    
+    def init_app(self, app):
+        self.app = app
+        ttl = int(os.environ.get('JOB_RESULT_TTL', 3600))
+        redis_url = os.environ.get('REDIS_URL')
+        if redis_url:
+            self.backend = RedisJobBackend(redis_url, ttl=ttl)
+        else:
+            self.backend = LocalJobBackend(app, max_workers=int(os.environ.get('JOB_WORKERS', 2)), ttl=ttl)
+    
+    def register(self, name):
+        def decorator(func):
+            self.handlers[name] = func
+            return func
+        return decorator
+    
+    def enqueue(self, name, user_id, unique=False, upload=None, **params):
+        """Masukkan job ke antrian; unique=True memakai ulang job aktif milik user yang sama
+
+        upload (bytes) disimpan sekali di luar dict job, supaya tidak ikut ditulis ulang di
+        setiap ctx.progress() dan di-parse di setiap polling /jobs/<id>.
+        """
+        if name not in self.handlers:
+            raise ValueError(f'Job {name} tidak dikenal')
+        
+        if unique:
+            active_job = self.active_job(name, user_id)
+            if active_job:
+                return active_job
+        
+        job = {
+            'id': uuid.uuid4().hex,
+            'name': name,
+            'user_id': user_id,
+            'params': params,
+            'status': 'queued',
+            'progress': 0,
+            'message': 'Menunggu antrian',
+            'result': None,
+            'filename': None,
+            'mimetype': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+        self.backend.save(job)
+        if upload is not None:
+            self.backend.save_upload(job['id'], upload)
+        self.backend.submit(job['id'], self.run)
+        return job
+    
+    def get(self, job_id):
+        return self.backend.load(job_id)
+    
+    def active_job(self, name, user_id):
+        """Job name milik user yang masih queued/running, atau None"""
+        active_id = self.backend.active_job_id(name, user_id)
+        job = self.backend.load(active_id) if active_id else None
+        return job if job and job['status'] in ('queued', 'running') else None
+    
+    def get_file(self, job_id):
+        return self.backend.load_file(job_id)
+    
+    def run(self, job_id):
+        job = self.backend.load(job_id)
+        if not job or job['status'] != 'queued':
+            return
+        
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        job['message'] = 'Sedang diproses'
+        self.backend.save(job)
+        
+        with self.app.app_context(), tenant_router.use(job['user_id']):
+            try:
+                result = self.handlers[job['name']](JobContext(self, job), **job['params'])
+                if isinstance(result, JobFile):
+                    self.backend.save_file(job_id, result.content)
+                    job['filename'] = result.filename
+                    job['mimetype'] = result.mimetype
+                    result = result.summary
+                job['result'] = result
+                job['status'] = 'finished'
+                job['progress'] = 100
+                job['message'] = 'Selesai'
+            except Exception as e:
+                db.session.rollback()
+                job['status'] = 'failed'
+                job['error'] = str(e)
+                job['message'] = 'Gagal'
+            finally:
+                job['finished_at'] = time.time()
+                self.backend.save(job)
+                self.backend.delete_upload(job_id)
+                metrics.observe_job(job['name'], job['status'], job['finished_at'] - job['started_at'])
+    
+    def to_public(self, job):
+        """Status job untuk dikirim ke client (tanpa parameter mentah)"""
+        public = {key: job[key] for key in ('id', 'name', 'status', 'progress', 'message', 'result', 'error',
+                                            'created_at', 'started_at', 'finished_at')}
+        public['status_url'] = url_for('job_status', job_id=job['id'])
+        if job['status'] == 'finished' and job['filename']:
+            public['download_url'] = url_for('job_result', job_id=job['id'])
+        return public
+
+job_queue = JobQueue()
+
+@job_queue.register('closing')
+def closing_job(ctx):
+    ctx.progress(5, 'Menunggu proses lain untuk user ini')
+    with user_locks.hold(ctx.user_id):
+        ctx.progress(10, 'Menghitung neraca saldo setelah penyesuaian')
+        closing_processor = ClosingProcessor(ctx.user_id)
+        closing_entries = closing_processor.generate_closing_entries()
+        
+        ctx.progress(60, 'Menyimpan closing entries')
+        success, message = closing_processor.save_closing_entries()
+    if not success:
+        raise RuntimeError(message)
+    
+    return {'message': message, 'entries_count': len(closing_entries)}
+
+@job_queue.register('export_general_journal')
+def export_general_journal_job(ctx):
+    total = JournalEntry.query.filter_by(created_by=ctx.user_id).count()
+    
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['tanggal', 'referensi', 'keterangan', 'kode_akun', 'nama_akun', 'debit', 'kredit', 'jenis'])
+    
+    stmt = select(JournalEntry).where(JournalEntry.created_by == ctx.user_id)\
+        .order_by(JournalEntry.date, JournalEntry.id)\
+        .execution_options(yield_per=1000)
+    
+    written = 0
+    for entry in db.session.scalars(stmt):
+        writer.writerow([entry.date.strftime('%Y-%m-%d'), entry.reference, entry.description,
+                         entry.account_code, entry.account_name, entry.debit, entry.credit, entry.entry_type])
+        written += 1
+        if written % 1000 == 0:
+            ctx.progress(written * 100 / max(total, 1), f'{written}/{total} baris')
+    
+    filename = f"jurnal_umum_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return JobFile(output.getvalue().encode('utf-8'), filename, 'text/csv', {'rows': written})
+
+@job_queue.register('import_transactions')
+def import_transactions_job(ctx, batch_size=500):
+    """Import transaksi dari CSV: date,description,account_debit,account_credit,amount"""
+    content = ctx.upload()
+    if content is None:
+        raise ValueError('File upload tidak ditemukan (kedaluwarsa?)')
+    rows = list(csv.DictReader(io.StringIO(content.decode('utf-8-sig'))))
+    accounts = account_cache.by_code()
+    
+    imported = 0
+    errors = []
+    batch = []
+    
+    def flush_batch():
+        db.session.add_all(transaction for transaction, _ in batch)
+        db.session.flush()
+        db.session.execute(insert(JournalEntry), [
+            row for transaction, lines in batch for row in journal_entry_rows(transaction, lines, ctx.user_id)
+        ])
+        db.session.commit()
+        bump_ledger_version(ctx.user_id)
+        batch.clear()
+    
+    # Satu import per user pada satu waktu, juga tidak bersamaan dengan closing
+    with user_locks.hold(ctx.user_id):
+        for line_number, row in enumerate(rows, start=2):
+            try:
+                amount = float(row.get('amount') or 0)
+                date = datetime.strptime((row.get('date') or '').strip(), '%Y-%m-%d')
+            except ValueError:
+                errors.append({'line': line_number, 'error': 'Tanggal atau jumlah tidak valid'})
+                continue
+            
+            description = (row.get('description') or '').strip()
+            
+            if not math.isfinite(amount) or amount <= 0 or not description:
+                errors.append({'line': line_number, 'error': 'Jumlah harus lebih dari 0 dan keterangan wajib diisi'})
+                continue
+            
+            try:
+                lines, total = validate_journal_lines([
+                    {'account_code': row.get('account_debit'), 'debit': amount},
+                    {'account_code': row.get('account_credit'), 'credit': amount}
+                ], accounts)
+            except ValueError:
+                errors.append({'line': line_number, 'error': 'Akun debit atau kredit tidak valid'})
+                continue
+            
+            batch.append((new_journal_transaction(ctx.user_id, date, description, lines, total), lines))
+            imported += 1
+            
+            if len(batch) >= batch_size:
+                flush_batch()
+                ctx.progress(imported * 100 / max(len(rows), 1), f'{imported}/{len(rows)} transaksi')
+        
+        if batch:
+            flush_batch()
+    
+    return {'imported': imported, 'errors': errors[:100], 'error_count': len(errors)}
+
+# ==================== ASET STATIS ====================
+class StaticAssets:
+    """Aset hasil build_assets.py (static/dist) dengan nama ber-hash dan cache immutable
+
+    Template memanggil asset_url('css/base.css'). Jika manifest punya entri, URL menunjuk file
+    ber-hash (di-cache setahun); jika belum di-build, file sumber di assets/ dilayani dengan
+    cache pendek agar perubahan tetap terlihat saat development.
+    """
+    immutable_max_age = 31536000
+    source_max_age = 300
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self):
+        self.manifest = {}
+        self.hashed_files = set()
+        self.manifest_mtime = None
+
+    def init_app(self, app):
+        self.dist_dir = os.path.join(app.root_path, 'static', 'dist')
+        self.source_dir = os.path.join(app.root_path, 'assets')
+        self.manifest_path = os.path.join(self.dist_dir, 'manifest.json')
+        # Saat development manifest dibaca ulang jika build_assets.py dijalankan lagi
+        self.reload = _env_flag('ASSETS_RELOAD', os.environ.get('FLASK_ENV') == 'development')
+        self.load_manifest()
+
+        app.add_url_rule('/assets/<path:filename>', 'asset', self.serve)
+        app.jinja_env.globals.update(asset_url=self.url, asset_built=self.built)
+
+    def load_manifest(self):
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            self.manifest, self.hashed_files, self.manifest_mtime = {}, set(), None
+            return
+        if mtime == self.manifest_mtime:
+            return
+        with open(self.manifest_path, encoding='utf-8') as fh:
+            self.manifest = json.load(fh)
+        self.hashed_files = set(self.manifest.values())
+        self.manifest_mtime = mtime
+
+    def built(self, name):
+        if self.reload:
+            self.load_manifest()
+        return name in self.manifest
+
+    def url(self, name):
+        if self.reload:
+            self.load_manifest()
+        return url_for('asset', filename=self.manifest.get(name, name))
+
+    def serve(self, filename):
+        hashed = filename in self.hashed_files
+        directory = self.dist_dir if hashed else self.source_dir
+        path = os.path.realpath(os.path.join(directory, filename))
+        if not path.startswith(os.path.realpath(directory) + os.sep) or not os.path.isfile(path):
+            abort(404)
+
+        encoding = None
+        if hashed:
+            accepted = request.accept_encodings
+            for name, suffix in self.encodings:
+                if accepted[name] and os.path.isfile(path + suffix):
+                    encoding, path = name, path + suffix
+                    break
+
+        max_age = self.immutable_max_age if hashed else self.source_max_age
+        response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], max_age=max_age)
+        if hashed:
+            response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+static_assets = StaticAssets()
+
+# ==================== KOMPRESI RESPONSE ====================
+class ResponseCompression:
+    """Kompresi gzip/brotli untuk response HTML/JSON/CSV sesuai Accept-Encoding
+
+    Response biasa dikompresi jika ukurannya >= COMPRESS_MIN_SIZE byte. Response streaming
+    (stream_page) dikompresi per chunk dengan flush, jadi browser tetap menerima potongan
+    awal halaman sebelum seluruh template selesai dirender.
+    """
+    mimetypes = ('text/html', 'application/json', 'text/csv')
+
+    def __init__(self):
+        self.enabled = False
+
+    def init_app(self, app):
+        self.min_size = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+        self.level = int(os.environ.get('COMPRESS_LEVEL', 6))
+        self.brotli_quality = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+        try:
+            import brotli
+            self.brotli = brotli
+        except ImportError:
+            self.brotli = None
+
+        if not _env_flag('COMPRESS_ENABLED', True):
+            return
+        app.after_request(self._finish_request)
+        self.enabled = True
+
+    def choose_encoding(self):
+        accepted = request.accept_encodings
+        if self.brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _finish_request(self, response):
+        if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.mimetypes):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self._compress(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _compress(self, data, encoding):
+        if encoding == 'br':
+            return self.brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.level)
+
+    def _compress_stream(self, chunks, encoding):
+        if encoding == 'br':
+            compressor = self.brotli.Compressor(quality=self.brotli_quality)
+            compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # wbits 31 = format gzip
+            compress, finish = compressor.compress, compressor.flush
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                data = compress(chunk) + flush()
+                if data:
+                    yield data
+            yield finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+response_compression = ResponseCompression()
+
+def stream_page(template_name, **context):
+    """Render template sebagai response streaming (chunk sekitar STREAM_CHUNK_SIZE byte)
+
+    Dipakai untuk halaman dengan tabel besar agar byte pertama terkirim sebelum seluruh
+    tabel dirender.
+    """
+    chunk_size = int(os.environ.get('STREAM_CHUNK_SIZE', 16384))
+    # Ambil flash message sekarang: cookie session sudah terkirim saat template dirender
+    get_flashed_messages(with_categories=True)
+    pieces = stream_template(template_name, **context)
+
+    def generate():
+        buffer, size = [], 0
+        for piece in pieces:
+            buffer.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer)
+
+    return app.response_class(generate(), mimetype='text/html')
+
+# ==================== CACHE FRAGMENT LAPORAN ====================
+class LazyValue:
+    """Data template yang baru dihitung saat pertama dipakai
+
+    Dipakai untuk data laporan yang hanya dibaca di dalam {% cache %}: saat fragment
+    cache hit, query dan perhitungan laporan tidak dijalankan sama sekali.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+    
+    def _resolve(self):
+        if self._factory is not None:
+            self._value = self._factory()
+            self._factory = None
+        return self._value
+    
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+    
+    def __getitem__(self, key):
+        return self._resolve()[key]
+    
+    def __iter__(self):
+        return iter(self._resolve())
+    
+    def __len__(self):
+        return len(self._resolve())
+    
+    def __bool__(self):
+        return bool(self._resolve())
+
+class FragmentCacheExtension(Extension):
+    """Tag {% cache 'nama', param... %}...{% endcache %} untuk bagian tabel laporan"""
+    tags = {'cache'}
+    
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(parts)]), [], [], body).set_lineno(lineno)
+    
+    def _render(self, parts, caller):
+        return fragment_cache.render(parts[0], parts[1:], caller)
+
+class FragmentCache:
+    """Cache HTML fragment laporan per user
+
+    Kunci = nama fragment + user + versi jurnal user (bump_ledger_version) + versi chart of
+    accounts + parameter laporan, jadi entri lama tidak pernah terbaca setelah ada perubahan
+    dan cukup dibuang oleh LRU (per proses) atau TTL (Redis, jika REDIS_URL di-set).
+    """
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.enabled = False
+    
+    def init_app(self, app):
+        self.enabled = _env_flag('FRAGMENT_CACHE_ENABLED', True)
+        self.max_entries = int(os.environ.get('FRAGMENT_CACHE_SIZE', 256))
+        self.ttl = int(os.environ.get('FRAGMENT_CACHE_TTL', 3600))
+        app.jinja_env.add_extension(FragmentCacheExtension)
+    
+    def key(self, name, params):
+        user_id = current_user.id if current_user.is_authenticated else 0
+        versions = g.get('_fragment_versions')
+        if versions is None:
+            versions = g._fragment_versions = (ledger_version(user_id), account_cache.current_version())
+        digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()[:16]
+        return f'tandur:fragment:{name}:{user_id}:{versions[0]}:{versions[1]}:{digest}'
+    
+    def get(self, key):
+        redis_client = get_redis()
+        if redis_client is not None:
+            value = redis_client.get(key)
+            return value.decode('utf-8') if value is not None else None
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        redis_client = get_redis()
+        if redis_client is not None:
+            redis_client.set(key, value, ex=self.ttl)
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def render(self, name, params, caller):
+        if not self.enabled:
+            return caller()
+        
+        key = self.key(name, params)
+        html = self.get(key)
+        metrics.cache_result(f'fragment_{name}', html is not None)
+        if html is None:
+            html = str(caller())
+            self.set(key, html)
+        return Markup(html)
+
+fragment_cache = FragmentCache()
 
 # Buat aplikasi Flask
 app = create_app()
@@ -766,13 +3444,13 @@ def debug_db():
         result = db.session.execute(text('SELECT version()')).fetchone()
         db_version = result[0] if result else 'No version'
         
-        # Hitung jumlah data di setiap tabel
+        # Hitung jumlah data di setiap tabel (tabel ledger termasuk database tenant)
         user_count = User.query.count()
         account_count = Account.query.count()
-        transaction_count = Transaction.query.count()
-        journal_count = JournalEntry.query.count()
-        adjusting_count = AdjustingEntry.query.count()
-        closing_count = ClosingEntry.query.count()
+        transaction_count = sum(tenant_router.count_rows_by_user(Transaction).values())
+        journal_count = sum(tenant_router.count_rows_by_user(JournalEntry).values())
+        adjusting_count = sum(tenant_router.count_rows_by_user(AdjustingEntry).values())
+        closing_count = sum(tenant_router.count_rows_by_user(ClosingEntry).values())
         
         # Ambil beberapa sample data
         users = User.query.limit(5).all()
@@ -857,43 +3535,84 @@ def register():
         flash('Registrasi berhasil! Silakan login.', 'success')
         return redirect(url_for('login'))
     
-    return render_template('register.html')
+    return render_template('register.html')
+
+@app.route('/change-password', methods=['GET', 'POST'])
+@login_required
+def change_password():
+    if request.method == 'POST':
+        current_password = request.form.get('current_password') or ''
+        new_password = request.form.get('new_password') or ''
+        confirm_password = request.form.get('confirm_password') or ''
+        
+        user = db.session.get(User, current_user.id)
+        errors = []
+        
+        if not user.check_password(current_password):
+            errors.append('Password saat ini salah!')
+        
+        if len(new_password) < 6:
+            errors.append('Password harus minimal 6 karakter!')
+        
+        if new_password != confirm_password:
+            errors.append('Konfirmasi password tidak cocok!')
+        
+        if errors:
+            return render_template('change_password.html', errors=errors)
+        
+        user.set_password(new_password)
+        db.session.commit()
+        user_cache.invalidate(user.id)
+        
+        flash('Password berhasil diubah!', 'success')
+        return redirect(url_for('dashboard'))
+    
+    return render_template('change_password.html')
 
 # API ROUTES FOR DASHBOARD
 @app.route('/api/dashboard/financial_data')
 @login_required
+@read_replica
 def dashboard_financial_data():
     try:
-        trial_balance_obj = TrialBalance(include_adjusting=True)
-        
-        ledger_processor = LedgerProcessor(current_user.id)
+        accounts = account_cache.active_accounts()
+        totals = LedgerProcessor(current_user.id).get_balance_totals(include_adjusting=True)
         
-        accounts = Account.query.filter_by(is_active=True).all()
-        
-        for account in accounts:
-            balance = ledger_processor.get_account_balance(account.account_code, include_adjusting=True)
-            
-            if account.normal_balance == 'Debit':
-                if balance >= 0:
-                    trial_balance_obj.add_account_balance(account, abs(balance), 0)
-                else:
-                    trial_balance_obj.add_account_balance(account, 0, abs(balance))
-            else:
-                if balance >= 0:
-                    trial_balance_obj.add_account_balance(account, 0, abs(balance))
-                else:
-                    trial_balance_obj.add_account_balance(account, abs(balance), 0)
+        return jsonify(build_report_payload('financial_statements', accounts, totals))
         
-        financial_stmt = FinancialStatement()
-        income_stmt = financial_stmt.calculate_income_statement(trial_balance_obj)
-        balance_sheet = financial_stmt.calculate_balance_sheet(trial_balance_obj, income_stmt['net_income'])
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/dashboard/summary')
+@login_required
+@read_replica
+def dashboard_summary():
+    try:
+        return jsonify(get_dashboard_summary(current_user.id))
         
+    except Exception as e:
         return jsonify({
-            'success': True,
-            'income_statement': income_stmt,
-            'balance_sheet': balance_sheet,
-            'net_income': income_stmt['net_income']
-        })
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/reports/<report>')
+@login_required
+@read_replica
+def report_api(report):
+    if report not in REPORT_INCLUDES_ADJUSTING:
+        return jsonify({'success': False, 'error': f'Laporan {report} tidak dikenal'}), 404
+    
+    try:
+        accounts = account_cache.active_accounts()
+        totals = LedgerProcessor(current_user.id).get_balance_totals(
+            include_adjusting=REPORT_INCLUDES_ADJUSTING[report]
+        )
+        
+        return jsonify(build_report_payload(report, accounts, totals))
         
     except Exception as e:
         return jsonify({
@@ -901,66 +3620,197 @@ def dashboard_financial_data():
             'error': str(e)
         }), 500
 
-@app.route('/dashboard')
+@app.route('/api/transactions', methods=['POST'])
 @login_required
-def dashboard():
-    total_accounts = Account.query.filter_by(is_active=True).count()
-    total_transactions = Transaction.query.filter_by(created_by=current_user.id).count()
-    total_journal_entries = JournalEntry.query.filter_by(created_by=current_user.id).count()
+def post_transaction_api():
+    """Posting jurnal via JSON, aman diulang dengan header Idempotency-Key
+
+    Body: {"date": "YYYY-MM-DD", "description": "...", "lines": [{"account_code", "debit", "credit"}, ...]}
+    atau bentuk sederhana {"date", "description", "account_debit", "account_credit", "amount"}.
+    Kunci yang sama dengan isi sama -> 200 + transaksi lama; dengan isi berbeda -> 422.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'success': False, 'error': 'Body harus berupa JSON object'}), 400
     
-    recent_transactions = Transaction.query.filter_by(created_by=current_user.id).order_by(Transaction.created_at.desc()).limit(5).all()
+    idempotency_key = (request.headers.get('Idempotency-Key') or '').strip() or None
+    if idempotency_key and len(idempotency_key) > 100:
+        return jsonify({'success': False, 'error': 'Idempotency-Key maksimal 100 karakter'}), 400
     
-    income_statement = None
-    balance_sheet = None
-    net_income = 0
+    description = payload.get('description') or ''
+    if not isinstance(description, str):
+        return jsonify({'success': False, 'error': 'Deskripsi harus berupa teks'}), 400
+    description = description.strip()
+    lines = payload.get('lines')
+    if lines is None:
+        lines = [
+            {'account_code': payload.get('account_debit'), 'debit': payload.get('amount')},
+            {'account_code': payload.get('account_credit'), 'credit': payload.get('amount')}
+        ]
     
     try:
-        trial_balance_obj = TrialBalance(include_adjusting=True)
-        ledger_processor = LedgerProcessor(current_user.id)
-        
-        accounts = Account.query.filter_by(is_active=True).all()
-        
-        for account in accounts:
-            balance = ledger_processor.get_account_balance(account.account_code, include_adjusting=True)
-            
-            if account.normal_balance == 'Debit':
-                if balance >= 0:
-                    trial_balance_obj.add_account_balance(account, abs(balance), 0)
-                else:
-                    trial_balance_obj.add_account_balance(account, 0, abs(balance))
-            else:
-                if balance >= 0:
-                    trial_balance_obj.add_account_balance(account, 0, abs(balance))
-                else:
-                    trial_balance_obj.add_account_balance(account, abs(balance), 0)
-        
-        financial_stmt = FinancialStatement()
-        income_statement = financial_stmt.calculate_income_statement(trial_balance_obj)
-        balance_sheet = financial_stmt.calculate_balance_sheet(trial_balance_obj, income_statement['net_income'])
-        net_income = income_statement['net_income']
-        
+        date = datetime.strptime(payload.get('date') or '', '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Format tanggal harus YYYY-MM-DD'}), 400
+    if not description:
+        return jsonify({'success': False, 'error': 'Deskripsi wajib diisi'}), 400
+    if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+        return jsonify({'success': False, 'error': 'lines harus berupa daftar object'}), 400
+    if not all(isinstance(line.get('account_code') or '', str) for line in lines):
+        return jsonify({'success': False, 'error': 'account_code harus berupa teks, misalnya "1101"'}), 400
+    
+    request_hash = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    try:
+        transaction, created = post_journal_once(current_user.id, idempotency_key, date, description,
+                                                 lines, request_hash)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 422
+    
+    if not created and transaction.idempotency_hash != request_hash:
+        return jsonify({'success': False, 'error': 'Idempotency-Key sudah dipakai untuk request lain'}), 422
+    
+    entries = JournalEntry.query.filter_by(transaction_id=transaction.id).order_by(JournalEntry.id).all()
+    response = jsonify({
+        'success': True,
+        'transaction': {
+            'id': transaction.id,
+            'date': transaction.date.strftime('%Y-%m-%d'),
+            'description': transaction.description,
+            'amount': transaction.amount,
+            'reference': f'TRX-{transaction.id}',
+            'idempotency_key': transaction.idempotency_key,
+            'lines': [
+                {'account_code': entry.account_code, 'account_name': entry.account_name,
+                 'debit': entry.debit, 'credit': entry.credit}
+                for entry in entries
+            ]
+        }
+    })
+    if not created:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response, 201 if created else 200
+
+@app.route('/api/search')
+@login_required
+def search_api():
+    """Cari jurnal: ?q=teks&date_from=YYYY-MM-DD&date_to=...&amount_min=&amount_max=&page=&per_page="""
+    try:
+        date_from, date_to = (
+            datetime.strptime(request.args[name], '%Y-%m-%d') if request.args.get(name) else None
+            for name in ('date_from', 'date_to')
+        )
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Format tanggal harus YYYY-MM-DD'}), 400
+    
+    result = search_journal_entries(
+        current_user.id,
+        query=request.args.get('q'),
+        date_from=date_from,
+        date_to=date_to,
+        amount_min=request.args.get('amount_min', type=float),
+        amount_max=request.args.get('amount_max', type=float),
+        page=max(request.args.get('page', 1, type=int), 1),
+        per_page=min(max(request.args.get('per_page', 50, type=int), 1), 200)
+    )
+    
+    return jsonify({
+        'success': True,
+        'page': result['page'],
+        'per_page': result['per_page'],
+        'has_next': result['has_next'],
+        'items': [{
+            'id': entry.id,
+            'date': entry.date.strftime('%Y-%m-%d'),
+            'description': entry.description,
+            'reference': entry.reference,
+            'account_code': entry.account_code,
+            'account_name': entry.account_name,
+            'debit': entry.debit,
+            'credit': entry.credit,
+            'entry_type': entry.entry_type,
+            'transaction_id': entry.transaction_id,
+            'adjusting_entry_id': entry.adjusting_entry_id
+        } for entry in result['items']]
+    })
+
+@app.route('/api/accounts/tree')
+@login_required
+def account_tree_api():
+    """Drill-down saldo: tanpa ?node= mengembalikan level tipe, selain itu node beserta anaknya"""
+    include_adjusting = request.args.get('report', 'adjusted_trial_balance') != 'trial_balance'
+    tree = LedgerProcessor(current_user.id).get_trial_balance(include_adjusting=include_adjusting).tree
+    
+    key = request.args.get('node')
+    if key and tree.node(key) is None:
+        return jsonify({'success': False, 'error': 'Node tidak ditemukan'}), 404
+    
+    return jsonify({
+        'success': True,
+        'node': tree.node(key) if key else None,
+        'children': tree.children(key)
+    })
+
+@app.route('/dashboard')
+@login_required
+@read_replica
+def dashboard():
+    # Data yang sama dengan /api/dashboard/summary; JS hanya me-refresh setelah interval polling
+    try:
+        summary = get_dashboard_summary(current_user.id)
     except Exception as e:
         print(f"Error calculating financial data: {e}")
+        summary = {'total_accounts': len(account_cache.active_accounts()), 'total_transactions': 0,
+                   'total_journal_entries': 0, 'recent_transactions': [],
+                   'income_statement': None, 'balance_sheet': None, 'net_income': 0}
     
     logo_image = url_for('static', filename='logo.png')
     
     return render_template('dashboard.html', 
-                         total_accounts=total_accounts,
-                         total_transactions=total_transactions,
-                         total_journal_entries=total_journal_entries,
-                         recent_transactions=recent_transactions,
-                         income_statement=income_statement,
-                         balance_sheet=balance_sheet,
-                         net_income=net_income,
+                         total_accounts=summary['total_accounts'],
+                         total_transactions=summary['total_transactions'],
+                         total_journal_entries=summary['total_journal_entries'],
+                         recent_transactions=summary['recent_transactions'],
+                         income_statement=summary['income_statement'],
+                         balance_sheet=summary['balance_sheet'],
+                         net_income=summary['net_income'],
                          logo_image=logo_image)
 
 # CHART OF ACCOUNTS ROUTES
 @app.route('/chart_of_accounts')
 @login_required
 def chart_of_accounts():
-    accounts = Account.query.filter_by(is_active=True).order_by(Account.account_code).all()
+    accounts = account_cache.active_accounts(order_by_code=True)
     return render_template('ChartOfAccounts.html', accounts=accounts)
 
+def validate_parent_code(account_code, account_type, parent_code, previous_code=None):
+    """Pesan error jika akun induk tidak valid (tidak ada / beda tipe / diri sendiri / membentuk siklus)"""
+    accounts = account_cache.by_code()
+    # Sub-akun yang sudah ada harus tetap setipe dengan induknya jika tipe akun ini diubah
+    if previous_code and any(account.parent_code == previous_code and account.account_type != account_type
+                             for account in accounts.values()):
+        return 'Tipe akun harus sama dengan tipe sub-akunnya!'
+    
+    if not parent_code:
+        return None
+    
+    if parent_code not in accounts:
+        return 'Akun induk tidak ditemukan!'
+    
+    if accounts[parent_code].account_type != account_type:
+        return 'Tipe akun induk harus sama dengan tipe akun!'
+    
+    own_codes = {account_code, previous_code}
+    seen = set()
+    code = parent_code
+    while code and code not in seen:
+        if code in own_codes:
+            return 'Akun induk tidak boleh akun itu sendiri atau turunannya!'
+        seen.add(code)
+        parent = accounts.get(code)
+        code = parent.parent_code if parent else None
+    return None
+
 @app.route('/add_account', methods=['POST'])
 @login_required
 def add_account():
@@ -970,6 +3820,7 @@ def add_account():
         account_type = request.form.get('account_type')
         category = request.form.get('category')
         normal_balance = request.form.get('normal_balance')
+        parent_code = request.form.get('parent_code') or None
         description = request.form.get('description')
         
         if not all([account_code, account_name, account_type, category, normal_balance]):
@@ -978,17 +3829,23 @@ def add_account():
         if Account.query.filter_by(account_code=account_code).first():
             return jsonify({'success': False, 'message': 'Kode akun sudah ada!'})
         
+        parent_error = validate_parent_code(account_code, account_type, parent_code)
+        if parent_error:
+            return jsonify({'success': False, 'message': parent_error})
+        
         new_account = Account(
             account_code=account_code,
             account_name=account_name,
             account_type=account_type,
             category=category,
             normal_balance=normal_balance,
+            parent_code=parent_code,
             description=description
         )
         
         db.session.add(new_account)
         db.session.commit()
+        account_cache.invalidate()
         
         return jsonify({'success': True, 'message': 'Akun berhasil ditambahkan!'})
         
@@ -1008,6 +3865,7 @@ def edit_account():
         account_type = request.form.get('account_type')
         category = request.form.get('category')
         normal_balance = request.form.get('normal_balance')
+        parent_code = request.form.get('parent_code') or None
         description = request.form.get('description')
         
         if not all([account_code, account_name, account_type, category, normal_balance]):
@@ -1017,7 +3875,16 @@ def edit_account():
         if existing_account and existing_account.id != account.id:
             return jsonify({'success': False, 'message': 'Kode akun sudah digunakan oleh akun lain!'})
         
+        parent_error = validate_parent_code(account_code, account_type, parent_code, previous_code=account.account_code)
+        if parent_error:
+            return jsonify({'success': False, 'message': parent_error})
+        
+        # Anak dari akun ini ikut pindah jika kode akunnya diubah
+        if account_code != account.account_code:
+            Account.query.filter_by(parent_code=account.account_code).update({'parent_code': account_code})
+        
         account.account_code = account_code
+        account.parent_code = parent_code
         account.account_name = account_name
         account.account_type = account_type
         account.category = category
@@ -1025,6 +3892,7 @@ def edit_account():
         account.description = description
         
         db.session.commit()
+        account_cache.invalidate()
         
         return jsonify({'success': True, 'message': 'Akun berhasil diperbarui!'})
         
@@ -1045,6 +3913,7 @@ def toggle_account(account_id):
         account = Account.query.get_or_404(account_id)
         account.is_active = not account.is_active
         db.session.commit()
+        account_cache.invalidate()
         
         action = "diaktifkan" if account.is_active else "dinonaktifkan"
         return jsonify({
@@ -1095,6 +3964,7 @@ def initialize_default_accounts():
             db.session.add(account)
         
         db.session.commit()
+        account_cache.invalidate()
         return jsonify({'success': True, 'message': 'Akun default berhasil diinisialisasi!'})
         
     except Exception as e:
@@ -1108,88 +3978,73 @@ def transactions():
     if request.method == 'POST':
         date = request.form.get('date')
         description = request.form.get('description')
-        account_debit = request.form.get('account_debit')
-        account_credit = request.form.get('account_credit')
-        amount = request.form.get('amount')
+        line_accounts = request.form.getlist('line_account')
         
         try:
-            amount = float(amount)
-            if amount <= 0:
-                flash('Jumlah harus lebih dari 0!', 'error')
-                return redirect(url_for('transactions'))
+            date = datetime.strptime(date or '', '%Y-%m-%d')
         except ValueError:
-            flash('Jumlah harus berupa angka!', 'error')
+            flash('Tanggal tidak valid!', 'error')
             return redirect(url_for('transactions'))
         
-        if account_debit == account_credit:
-            flash('Akun debit dan kredit tidak boleh sama!', 'error')
-            return redirect(url_for('transactions'))
-        
-        debit_account = Account.query.filter_by(account_code=account_debit).first()
-        credit_account = Account.query.filter_by(account_code=account_credit).first()
+        if line_accounts:
+            # Jurnal majemuk: baris line_account/line_debit/line_credit dari form
+            lines = [
+                {'account_code': account_code, 'debit': debit, 'credit': credit}
+                for account_code, debit, credit in zip(line_accounts,
+                                                       request.form.getlist('line_debit'),
+                                                       request.form.getlist('line_credit'))
+                if account_code
+            ]
+        else:
+            account_debit = request.form.get('account_debit')
+            account_credit = request.form.get('account_credit')
+            amount = request.form.get('amount')
+            
+            try:
+                amount = float(amount)
+                if amount <= 0:
+                    flash('Jumlah harus lebih dari 0!', 'error')
+                    return redirect(url_for('transactions'))
+            except ValueError:
+                flash('Jumlah harus berupa angka!', 'error')
+                return redirect(url_for('transactions'))
+            
+            if account_debit == account_credit:
+                flash('Akun debit dan kredit tidak boleh sama!', 'error')
+                return redirect(url_for('transactions'))
+            
+            lines = [
+                {'account_code': account_debit, 'debit': amount},
+                {'account_code': account_credit, 'credit': amount}
+            ]
         
-        if not debit_account or not credit_account:
-            flash('Akun debit atau kredit tidak valid!', 'error')
+        try:
+            _, created = post_journal_once(current_user.id, request.form.get('idempotency_key') or None,
+                                           date, description, lines)
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'error')
             return redirect(url_for('transactions'))
         
-        new_transaction = Transaction(
-            date=datetime.strptime(date, '%Y-%m-%d'),
-            description=description,
-            account_debit=account_debit,
-            account_credit=account_credit,
-            amount=amount,
-            created_by=current_user.id
-        )
-        
-        db.session.add(new_transaction)
-        db.session.commit()
-        
-        debit_entry = JournalEntry(
-            date=new_transaction.date,
-            description=description,
-            account_code=account_debit,
-            account_name=debit_account.account_name,
-            debit=amount,
-            credit=0,
-            reference=f"TRX-{new_transaction.id}",
-            transaction_id=new_transaction.id,
-            created_by=current_user.id,
-            entry_type='regular',
-            ledger_processed=True,
-            ledger_date=datetime.now()
-        )
-        
-        credit_entry = JournalEntry(
-            date=new_transaction.date,
-            description=description,
-            account_code=account_credit,
-            account_name=credit_account.account_name,
-            debit=0,
-            credit=amount,
-            reference=f"TRX-{new_transaction.id}",
-            transaction_id=new_transaction.id,
-            created_by=current_user.id,
-            entry_type='regular',
-            ledger_processed=True,
-            ledger_date=datetime.now()
-        )
-        
-        db.session.add(debit_entry)
-        db.session.add(credit_entry)
-        db.session.commit()
-        
-        flash('Transaksi berhasil ditambahkan dan diproses ke ledger!', 'success')
+        if created:
+            flash('Transaksi berhasil ditambahkan dan diproses ke ledger!', 'success')
+        else:
+            flash('Transaksi ini sudah tersimpan sebelumnya (form terkirim dua kali).', 'info')
         return redirect(url_for('transactions'))
     
-    accounts = Account.query.filter_by(is_active=True).order_by(Account.account_code).all()
-    transactions_list = Transaction.query.filter_by(created_by=current_user.id).order_by(Transaction.date.desc()).all()
+    accounts = account_cache.active_accounts(order_by_code=True)
+    # Transaksi pembalik hanya tampil di jurnal; transaksi yang dibatalkan ditandai di tabel
+    transactions_list = Transaction.query.filter_by(created_by=current_user.id)\
+        .filter(Transaction.reverses_id.is_(None))\
+        .order_by(Transaction.date.desc()).all()
     
-    total_amount = sum(transaction.amount for transaction in transactions_list)
+    total_amount = sum(transaction.amount for transaction in transactions_list if not transaction.voided_at)
     
-    return render_template('transactions.html',
+    return stream_page('transactions.html',
                          accounts=accounts,
                          transactions=transactions_list,
                          total_amount=total_amount,
+                         idempotency_key=uuid.uuid4().hex,
                          today=datetime.now().strftime('%Y-%m-%d'))
 
 @app.route('/transactions/delete/<int:id>', methods=['POST'])
@@ -1201,74 +4056,62 @@ def delete_transaction(id):
         flash('Anda tidak memiliki izin untuk menghapus transaksi ini!', 'error')
         return redirect(url_for('transactions'))
     
-    JournalEntry.query.filter_by(transaction_id=id).delete()
+    # Tidak ada baris jurnal yang dihapus: transaksi dibatalkan dengan jurnal pembalik
+    try:
+        void_transaction(transaction)
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+        return redirect(url_for('transactions'))
     
-    db.session.delete(transaction)
     db.session.commit()
+    bump_ledger_version(current_user.id)
     
-    flash('Transaksi berhasil dihapus!', 'success')
+    flash('Transaksi dibatalkan dengan jurnal pembalik.', 'success')
     return redirect(url_for('transactions'))
 
 # JOURNAL ROUTES
 @app.route('/general_journal')
 @login_required
 def general_journal():
-    transactions_list = Transaction.query.filter_by(created_by=current_user.id)\
-        .order_by(Transaction.date, Transaction.id).all()
+    # Semua baris jurnal transaksi dalam satu query, dikelompokkan per transaksi (2 baris atau majemuk)
+    entries = db.session.execute(
+        select(JournalEntry, Transaction.date, Transaction.description)
+        .join(Transaction, JournalEntry.transaction_id == Transaction.id)
+        .where(Transaction.created_by == current_user.id)
+        .order_by(Transaction.date, Transaction.id, JournalEntry.debit.desc(), JournalEntry.id)
+    ).all()
     
     transactions = []
     total_debit = 0
     total_credit = 0
     
     account_balances = {}
+    current = None
     
-    for transaction in transactions_list:
-        journal_entries = JournalEntry.query.filter_by(transaction_id=transaction.id)\
-            .order_by(JournalEntry.debit.desc()).all()
+    for entry, date, description in entries:
+        if current is None or current['id'] != entry.transaction_id:
+            current = {'id': entry.transaction_id, 'date': date, 'description': description, 'lines': []}
+            transactions.append(current)
+        
+        account_balances[entry.account_code] = account_balances.get(entry.account_code, 0) + entry.debit - entry.credit
+        total_debit += entry.debit
+        total_credit += entry.credit
+        
+        current['lines'].append({
+            'account_name': entry.account_name,
+            'account_code': entry.account_code,
+            'debit': entry.debit,
+            'credit': entry.credit,
+            'balance': account_balances[entry.account_code]
+        })
     
-        if len(journal_entries) == 2:
-            debit_entry = None
-            credit_entry = None
-            
-            for entry in journal_entries:
-                if entry.debit > 0:
-                    debit_entry = entry
-                    total_debit += entry.debit
-                else:
-                    credit_entry = entry
-                    total_credit += entry.credit
-            
-            if debit_entry and credit_entry:
-                debit_account_code = debit_entry.account_code
-                if debit_account_code not in account_balances:
-                    account_balances[debit_account_code] = 0
-                account_balances[debit_account_code] += debit_entry.debit
-                
-                credit_account_code = credit_entry.account_code
-                if credit_account_code not in account_balances:
-                    account_balances[credit_account_code] = 0
-                account_balances[credit_account_code] -= credit_entry.credit
-                
-                transactions.append({
-                    'date': transaction.date,
-                    'debit_entry': {
-                        'account_name': debit_entry.account_name,
-                        'account_code': debit_entry.account_code,
-                        'debit': debit_entry.debit,
-                        'balance': account_balances[debit_account_code]
-                    },
-                    'credit_entry': {
-                        'account_name': credit_entry.account_name,
-                        'account_code': credit_entry.account_code,
-                        'credit': credit_entry.credit,
-                        'balance': account_balances[credit_account_code]
-                    }
-                })
-    
-    all_journal_entries = JournalEntry.query.filter_by(created_by=current_user.id).all()
-    
-    return render_template('general_journal.html',
-                         journal_entries=all_journal_entries,
+    journal_entry_count = db.session.scalar(
+        select(func.count(JournalEntry.id)).where(JournalEntry.created_by == current_user.id)
+    )
+    
+    return stream_page('general_journal.html',
+                         journal_entry_count=journal_entry_count,
                          transactions=transactions,
                          total_debit=total_debit,
                          total_credit=total_credit)
@@ -1283,17 +4126,18 @@ def general_ledger():
     
     ledger_processor = LedgerProcessor(current_user.id)
     
-    accounts = Account.query.filter_by(is_active=True).order_by(Account.account_code).all()
+    accounts = account_cache.active_accounts(order_by_code=True)
     
     if account_id:
-        selected_account = Account.query.get(account_id)
+        selected_account = account_cache.get_by_id(account_id)
         if selected_account:
-            ledger_data = ledger_processor.get_ledger_entries(
+            # Dibaca hanya jika fragment buku besar tidak ada di cache
+            ledger_data = LazyValue(lambda: ledger_processor.get_ledger_entries(
                 account_code=selected_account.account_code,
                 include_adjusting=True
-            )
+            ))
     
-    return render_template('general_ledger.html',
+    return stream_page('general_ledger.html',
                          accounts=accounts,
                          selected_account=selected_account,
                          ledger_data=ledger_data)
@@ -1301,26 +4145,11 @@ def general_ledger():
 # TRIAL BALANCE ROUTES
 @app.route('/trial_balance')
 @login_required
+@read_replica
 def trial_balance():
-    trial_balance_obj = TrialBalance(include_adjusting=False)
-    
-    ledger_processor = LedgerProcessor(current_user.id)
-    
-    accounts = Account.query.filter_by(is_active=True).all()
-    
-    for account in accounts:
-        balance = ledger_processor.get_account_balance(account.account_code, include_adjusting=False)
-        
-        if account.normal_balance == 'Debit':
-            if balance >= 0:
-                trial_balance_obj.add_account_balance(account, abs(balance), 0)
-            else:
-                trial_balance_obj.add_account_balance(account, 0, abs(balance))
-        else:
-            if balance >= 0:
-                trial_balance_obj.add_account_balance(account, 0, abs(balance))
-            else:
-                trial_balance_obj.add_account_balance(account, abs(balance), 0)
+    # Dihitung hanya jika fragment tabel tidak ada di cache
+    user_id = current_user.id
+    trial_balance_obj = LazyValue(lambda: LedgerProcessor(user_id).get_trial_balance(include_adjusting=False))
     
     current_date = datetime.now()
     period = current_date.strftime('%B %Y')
@@ -1334,26 +4163,11 @@ def trial_balance():
 # ADJUSTED TRIAL BALANCE ROUTES
 @app.route('/adjusted_trial_balance')
 @login_required
+@read_replica
 def adjusted_trial_balance():
-    trial_balance_obj = TrialBalance(include_adjusting=True)
-    
-    ledger_processor = LedgerProcessor(current_user.id)
-    
-    accounts = Account.query.filter_by(is_active=True).all()
-    
-    for account in accounts:
-        balance = ledger_processor.get_account_balance(account.account_code, include_adjusting=True)
-        
-        if account.normal_balance == 'Debit':
-            if balance >= 0:
-                trial_balance_obj.add_account_balance(account, abs(balance), 0)
-            else:
-                trial_balance_obj.add_account_balance(account, 0, abs(balance))
-        else:
-            if balance >= 0:
-                trial_balance_obj.add_account_balance(account, 0, abs(balance))
-            else:
-                trial_balance_obj.add_account_balance(account, abs(balance), 0)
+    # Dihitung hanya jika fragment tabel tidak ada di cache
+    user_id = current_user.id
+    trial_balance_obj = LazyValue(lambda: LedgerProcessor(user_id).get_trial_balance(include_adjusting=True))
     
     current_date = datetime.now()
     period = current_date.strftime('%B %Y')
@@ -1371,10 +4185,10 @@ def adjusting_entries():
     adjusting_entries = AdjustingEntry.query.filter_by(created_by=current_user.id)\
         .order_by(AdjustingEntry.date.desc()).all()
     
-    total_debit = sum(entry.amount for entry in adjusting_entries)
+    total_debit = sum(entry.amount for entry in adjusting_entries if not entry.voided_at)
     total_credit = total_debit
     
-    accounts = Account.query.filter_by(is_active=True).order_by(Account.account_code).all()
+    accounts = account_cache.active_accounts(order_by_code=True)
     
     return render_template('adjusting_entries.html',
                          adjusting_entries=adjusting_entries,
@@ -1397,10 +4211,11 @@ def add_adjusting_entry():
             flash('Akun debit dan kredit tidak boleh sama!', 'error')
             return redirect(url_for('adjusting_entries'))
         
-        reference = f"ADJ-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        # Suffix acak: dua penyesuaian di detik yang sama tidak lagi bentrok di unique reference
+        reference = f"ADJ-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6].upper()}"
         
-        debit_account = Account.query.filter_by(account_code=account_debit_code).first()
-        credit_account = Account.query.filter_by(account_code=account_credit_code).first()
+        debit_account = account_cache.get(account_debit_code)
+        credit_account = account_cache.get(account_credit_code)
         
         if not debit_account or not credit_account:
             flash('Kode akun tidak valid', 'error')
@@ -1435,9 +4250,7 @@ def add_adjusting_entry():
             reference=reference,
             adjusting_entry_id=new_entry.id,
             created_by=current_user.id,
-            entry_type='adjusting',
-            ledger_processed=True,
-            ledger_date=datetime.now()
+            entry_type='adjusting'
         )
         
         credit_journal = JournalEntry(
@@ -1450,15 +4263,14 @@ def add_adjusting_entry():
             reference=reference,
             adjusting_entry_id=new_entry.id,
             created_by=current_user.id,
-            entry_type='adjusting',
-            ledger_processed=True,
-            ledger_date=datetime.now()
+            entry_type='adjusting'
         )
         
         db.session.add(debit_journal)
         db.session.add(credit_journal)
         
         db.session.commit()
+        bump_ledger_version(current_user.id)
         flash('Jurnal penyesuaian berhasil ditambahkan!', 'success')
         return redirect(url_for('adjusting_entries'))
         
@@ -1477,64 +4289,66 @@ def delete_adjusting_entry(id):
         return redirect(url_for('adjusting_entries'))
     
     try:
-        JournalEntry.query.filter_by(adjusting_entry_id=id).delete()
-        db.session.delete(entry)
+        void_adjusting_entry(entry)
         db.session.commit()
-        flash('Jurnal penyesuaian berhasil dihapus dari semua sistem!', 'success')
+        bump_ledger_version(current_user.id)
+        flash('Jurnal penyesuaian dibatalkan dengan jurnal pembalik.', 'success')
     except Exception as e:
         db.session.rollback()
-        flash('Gagal menghapus jurnal penyesuaian: ' + str(e), 'error')
+        flash('Gagal membatalkan jurnal penyesuaian: ' + str(e), 'error')
     
     return redirect(url_for('adjusting_entries'))
 
 # FINANCIAL STATEMENTS ROUTES
 @app.route('/financial_statements')
 @login_required
+@read_replica
 def financial_statements():
-    trial_balance_obj = TrialBalance(include_adjusting=True)
-    
-    ledger_processor = LedgerProcessor(current_user.id)
+    current_period = current_period_key()
+    selected_period = request.args.get('period') or current_period
+    available_periods = [row.period for row in IncomeStatement.query
+                         .with_entities(IncomeStatement.period)
+                         .filter_by(created_by=current_user.id)
+                         .order_by(IncomeStatement.period.desc())]
     
-    accounts = Account.query.filter_by(is_active=True).all()
-    
-    for account in accounts:
-        balance = ledger_processor.get_account_balance(account.account_code, include_adjusting=True)
+    # Periode yang sudah ditutup dibaca dari snapshot; hanya periode berjalan yang dihitung ulang
+    if selected_period != current_period:
+        snapshot = IncomeStatement.query.filter_by(created_by=current_user.id, period=selected_period).first()
+        metrics.cache_result('income_statement_snapshot', bool(snapshot and snapshot.details))
+        if snapshot and snapshot.details:
+            return render_template('financial_statements.html',
+                                 income_statement=snapshot.details['income_statement'],
+                                 balance_sheet=snapshot.details['balance_sheet'],
+                                 period=format_period(selected_period),
+                                 selected_period=selected_period,
+                                 available_periods=available_periods,
+                                 snapshot=snapshot,
+                                 current_date=datetime.now())
         
-        if account.normal_balance == 'Debit':
-            if balance >= 0:
-                trial_balance_obj.add_account_balance(account, abs(balance), 0)
-            else:
-                trial_balance_obj.add_account_balance(account, 0, abs(balance))
-        else:
-            if balance >= 0:
-                trial_balance_obj.add_account_balance(account, 0, abs(balance))
-            else:
-                trial_balance_obj.add_account_balance(account, abs(balance), 0)
+        flash(f'Belum ada laporan tersimpan untuk periode {selected_period}, menampilkan periode berjalan.', 'warning')
+        selected_period = current_period
     
-    financial_stmt = FinancialStatement()
-    income_stmt = financial_stmt.calculate_income_statement(trial_balance_obj)
-    balance_sheet = financial_stmt.calculate_balance_sheet(trial_balance_obj, income_stmt['net_income'])
+    # Laporan dihitung hanya jika fragment laporan tidak ada di cache. Dibatasi ke bulan
+    # berjalan dengan cara yang sama seperti snapshot closing (build_period_statements).
+    user_id = current_user.id
+    statements = LazyValue(lambda: build_period_statements(user_id, current_period))
     
     return render_template('financial_statements.html',
-                         income_statement=income_stmt,
-                         balance_sheet=balance_sheet,
-                         period=financial_stmt.period,
+                         income_statement=LazyValue(lambda: statements[0]),
+                         balance_sheet=LazyValue(lambda: statements[1]),
+                         period=format_period(current_period),
+                         selected_period=selected_period,
+                         available_periods=available_periods,
+                         snapshot=None,
                          current_date=datetime.now())
 
 # CLOSING ENTRIES ROUTES
 @app.route('/closing_entries')
 @login_required
 def closing_entries():
-    try:
-        closing_processor = ClosingProcessor(current_user.id)
-        closing_entries = closing_processor.generate_closing_entries()
-        success, message = closing_processor.save_closing_entries()
-        
-        if not success:
-            flash(f'Peringatan: {message}', 'warning')
-            
-    except Exception as e:
-        flash(f'Error dalam generating closing entries: {str(e)}', 'error')
+    # GET hanya membaca; closing dijalankan lewat tombol (POST /generate-closing-entries).
+    # Job yang masih berjalan ditampilkan agar progresnya tetap bisa diikuti.
+    closing_job = job_queue.active_job('closing', current_user.id)
     
     existing_entries = ClosingEntry.query.filter_by(created_by=current_user.id)\
         .order_by(ClosingEntry.date.desc()).all()
@@ -1542,7 +4356,10 @@ def closing_entries():
     total_debit = sum(entry.amount for entry in existing_entries)
     total_credit = total_debit
     
-    nominal_accounts = Account.query.filter(Account.account_type.in_(['Pendapatan', 'Beban'])).all()
+    # Akun nominal = akun yang dipetakan ke laba rugi, sama dengan yang ditutup ClosingProcessor
+    layout = account_cache.layout()
+    nominal_accounts = [account for account in account_cache.by_code().values()
+                        if layout.resolve('laba_rugi', account) is not None]
     closed_nominal_count = 0
     
     for account in nominal_accounts:
@@ -1560,27 +4377,20 @@ def closing_entries():
                          total_credit=total_credit,
                          nominal_accounts_closed=nominal_accounts_closed,
                          closure_percentage=closure_percentage,
+                         closing_job=job_queue.to_public(closing_job) if closing_job else None,
                          current_date=datetime.now())
 
 @app.route('/generate-closing-entries', methods=['POST'])
 @login_required
 def generate_closing_entries():
     try:
-        closing_processor = ClosingProcessor(current_user.id)
-        closing_entries = closing_processor.generate_closing_entries()
-        success, message = closing_processor.save_closing_entries()
+        job = job_queue.enqueue('closing', current_user.id, unique=True)
         
-        if success:
-            return jsonify({
-                'success': True,
-                'message': message,
-                'entries_count': len(closing_entries)
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': message
-            }), 500
+        return jsonify({
+            'success': True,
+            'message': 'Closing entries sedang diproses di background',
+            'job': job_queue.to_public(job)
+        }), 202
             
     except Exception as e:
         return jsonify({
@@ -1591,77 +4401,39 @@ def generate_closing_entries():
 # POST-CLOSING TRIAL BALANCE ROUTES
 @app.route('/post_closing_trial_balance')
 @login_required
+@read_replica
 def post_closing_trial_balance():
     ledger_processor = LedgerProcessor(current_user.id)
+    totals = ledger_processor.get_balance_totals(include_adjusting=True)
+    
+    all_accounts = account_cache.active_accounts(order_by_code=True)
+    trial_balance_obj = build_trial_balance(all_accounts, totals, include_adjusting=True)
     
-    accounts_needed = ['1101', '1201', '1301', '1311']
+    financial_stmt, income_stmt, balance_sheet = build_financial_statements(trial_balance_obj)
     
+    # Akun riil (neraca, selain ekuitas) menurut layout laporan; modal akhir ditambahkan terpisah
+    layout = financial_stmt.layout
     trial_balance_data = []
     total_debit = 0
     total_credit = 0
+    modal_account = None
+    for item in trial_balance_obj.accounts_data:
+        rule = layout.resolve('neraca', item['account'])
+        if rule is None:
+            continue
+        if rule[1] == 'modal_awal':
+            modal_account = modal_account or item['account']
+        elif rule[0] != 'ekuitas':
+            label = 'Persediaan (Akhir)' if rule[1] == 'persediaan' else None
+            trial_balance_data.append(dict(item, label=label))
+            total_debit += item['debit']
+            total_credit += item['credit']
     
-    for account_code in accounts_needed:
-        account = Account.query.filter_by(account_code=account_code).first()
-        if account:
-            balance = ledger_processor.get_account_balance(account_code, include_adjusting=True)
-            
-            if account.normal_balance == 'Debit':
-                if balance >= 0:
-                    trial_balance_data.append({
-                        'account': account,
-                        'debit': abs(balance),
-                        'credit': 0
-                    })
-                    total_debit += abs(balance)
-                else:
-                    trial_balance_data.append({
-                        'account': account,
-                        'debit': 0,
-                        'credit': abs(balance)
-                    })
-                    total_credit += abs(balance)
-            else:
-                if balance >= 0:
-                    trial_balance_data.append({
-                        'account': account,
-                        'debit': 0,
-                        'credit': abs(balance)
-                    })
-                    total_credit += abs(balance)
-                else:
-                    trial_balance_data.append({
-                        'account': account,
-                        'debit': abs(balance),
-                        'credit': 0
-                    })
-                    total_debit += abs(balance)
-    
-    trial_balance_obj = TrialBalance(include_adjusting=True)
-    
-    all_accounts = Account.query.filter_by(is_active=True).all()
-    for account in all_accounts:
-        balance = ledger_processor.get_account_balance(account.account_code, include_adjusting=True)
-        
-        if account.normal_balance == 'Debit':
-            if balance >= 0:
-                trial_balance_obj.add_account_balance(account, abs(balance), 0)
-            else:
-                trial_balance_obj.add_account_balance(account, 0, abs(balance))
-        else:
-            if balance >= 0:
-                trial_balance_obj.add_account_balance(account, 0, abs(balance))
-            else:
-                trial_balance_obj.add_account_balance(account, abs(balance), 0)
-    
-    financial_stmt = FinancialStatement()
-    income_stmt = financial_stmt.calculate_income_statement(trial_balance_obj)
-    balance_sheet = financial_stmt.calculate_balance_sheet(trial_balance_obj, income_stmt['net_income'])
-    
-    modal_account = Account.query.filter_by(account_code='3101').first()
     if modal_account:
         modal_akhir = balance_sheet['equity']
         trial_balance_data.append({
             'account': modal_account,
+            'label': 'Modal (Akhir)',
             'debit': 0,
             'credit': modal_akhir
         })
@@ -1678,13 +4450,263 @@ def post_closing_trial_balance():
                          period=period,
                          printed_date=printed_date)
 
+# BACKGROUND JOB ROUTES
+@app.route('/jobs/closing', methods=['POST'])
+@login_required
+def enqueue_closing_job():
+    job = job_queue.enqueue('closing', current_user.id, unique=True)
+    return jsonify({'success': True, 'job': job_queue.to_public(job)}), 202
+
+@app.route('/jobs/export/general_journal', methods=['POST'])
+@login_required
+def enqueue_export_general_journal():
+    job = job_queue.enqueue('export_general_journal', current_user.id)
+    return jsonify({'success': True, 'job': job_queue.to_public(job)}), 202
+
+@app.route('/jobs/import/transactions', methods=['POST'])
+@login_required
+def enqueue_import_transactions():
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'success': False, 'message': 'File CSV harus diunggah!'}), 400
+    
+    content = upload.read()
+    try:
+        content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return jsonify({'success': False, 'message': 'File harus berformat CSV UTF-8!'}), 400
+    
+    job = job_queue.enqueue('import_transactions', current_user.id, upload=content)
+    return jsonify({'success': True, 'job': job_queue.to_public(job)}), 202
+
+@app.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if not job or job['user_id'] != current_user.id:
+        return jsonify({'success': False, 'message': 'Job tidak ditemukan'}), 404
+    
+    return jsonify({'success': True, 'job': job_queue.to_public(job)})
+
+@app.route('/jobs/<job_id>/result')
+@login_required
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if not job or job['user_id'] != current_user.id:
+        return jsonify({'success': False, 'message': 'Job tidak ditemukan'}), 404
+    
+    if job['status'] != 'finished':
+        return jsonify({'success': False, 'job': job_queue.to_public(job)}), 409
+    
+    if not job['filename']:
+        return jsonify({'success': True, 'result': job['result']})
+    
+    content = job_queue.get_file(job_id)
+    if content is None:
+        return jsonify({'success': False, 'message': 'Hasil job sudah kedaluwarsa'}), 410
+    
+    # Response biasa (bukan file passthrough) agar CSV ikut dikompresi
+    response = app.response_class(content, mimetype=job['mimetype'])
+    response.headers.set('Content-Disposition', 'attachment', filename=job['filename'])
+    return response
+
+@app.cli.command('jobs-worker')
+@click.option('--burst', is_flag=True, help='Berhenti setelah antrian kosong')
+def jobs_worker(burst):
+    """Jalankan worker job background (butuh REDIS_URL)"""
+    if not isinstance(job_queue.backend, RedisJobBackend):
+        raise click.ClickException('REDIS_URL belum di-set; job berjalan in-process di web worker')
+    
+    print('Job worker berjalan...')
+    job_queue.backend.work(job_queue.run, burst=burst)
+
+@app.cli.command('ledger-catch-up')
+@click.option('--user', 'user_id', type=int, default=None, help='Hanya user ini (default: semua user)')
+@click.option('--loop', 'interval', type=float, default=None, help='Ulangi setiap N detik')
+def ledger_catch_up(user_id, interval):
+    """Majukan cursor ledger consumer (saldo akun, dst.) untuk baris jurnal baru"""
+    while True:
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = tenant_router.ledger_user_ids()
+            db.session.remove()
+        
+        for consumer in ledger_consumers:
+            processed = sum(consumer.catch_up(uid) for uid in user_ids)
+            if processed or interval is None:
+                print(f"{consumer.name}: {processed} baris jurnal diproses ({len(user_ids)} user)")
+        
+        if interval is None:
+            return
+        time.sleep(interval)
+
+@app.cli.command('tenant-migrate')
+@click.argument('user_id', type=int)
+@click.argument('database_url')
+@click.option('--batch-size', type=int, default=5000, show_default=True)
+def tenant_migrate(user_id, database_url, batch_size):
+    """Salin ledger satu user dari database utama ke database tenant
+
+    Jalankan saat user tidak sedang memposting. Setelah selesai tambahkan user ke
+    TENANT_DATABASES, restart aplikasi, lalu hapus salinan lama dengan `flask tenant-purge`.
+    """
+    if db.session.get(User, user_id) is None:
+        raise click.ClickException(f'User {user_id} tidak ditemukan')
+    if tenant_router.bind_key(user_id):
+        raise click.ClickException(f'User {user_id} sudah memakai database tenant')
+    
+    target = create_engine(database_url, **build_engine_options(database_url))
+    try:
+        prepare_tenant_database(target)
+        started = time.perf_counter()
+        copied = copy_tenant_rows(user_id, db.engine, target, batch_size=batch_size)
+        if count_tenant_rows(user_id, target) != count_tenant_rows(user_id, db.engine):
+            raise click.ClickException('Jumlah baris di database tenant tidak sama dengan sumber')
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        target.dispose()
+    
+    for table_name, count in copied.items():
+        print(f"  {table_name}: {count} baris")
+    print(f"Selesai dalam {time.perf_counter() - started:.2f}s. Tambahkan ke TENANT_DATABASES:")
+    print(f"  {json.dumps({str(user_id): database_url})}")
+
+@app.cli.command('tenant-purge')
+@click.argument('user_id', type=int)
+def tenant_purge(user_id):
+    """Hapus ledger user yang sudah dipindah dari database utama"""
+    bind_key = tenant_router.bind_key(user_id)
+    if not bind_key:
+        raise click.ClickException(f'User {user_id} belum ada di TENANT_DATABASES')
+    
+    shared_counts = count_tenant_rows(user_id, db.engine)
+    tenant_counts = count_tenant_rows(user_id, db.engines[bind_key])
+    missing = [name for name, count in shared_counts.items() if count > tenant_counts[name]]
+    if missing:
+        raise click.ClickException(
+            f"Database utama punya baris yang belum ada di database tenant ({', '.join(missing)}); "
+            f"ulangi migrasi sebelum menghapus"
+        )
+    
+    with db.engine.begin() as connection:
+        for table in reversed(tenant_tables()):
+            deleted = connection.execute(
+                table.delete().where(table.c[TENANT_TABLES[table.name]] == user_id)
+            ).rowcount
+            print(f"  {table.name}: {deleted} baris dihapus")
+
+def _month_end_worker_init():
+    """Setiap proses worker memakai pool koneksi sendiri (koneksi hasil fork tidak dipakai bersama)"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def run_month_end_for_user(user_id, period):
+    """Closing + laporan keuangan satu user, hasilnya disimpan ke IncomeStatement"""
+    started = time.perf_counter()
+    with app.app_context(), tenant_router.use(user_id):
+        try:
+            with user_locks.hold(user_id):
+                closing_processor = ClosingProcessor(user_id, period_key=period)
+                closing_processor.generate_closing_entries()
+                success, message = closing_processor.save_closing_entries()
+        except UserLockTimeout as e:
+            success, message = False, str(e)
+        if not success:
+            return {'user_id': user_id, 'success': False, 'message': message}
+        
+        return {
+            'user_id': user_id,
+            'success': True,
+            'message': message,
+            'net_income': closing_processor.net_income,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+@app.cli.command('month-end')
+@click.option('--period', default=None, help='Periode YYYY-MM (default: bulan berjalan)')
+@click.option('--workers', type=int, default=None, help='Jumlah proses (default: jumlah core CPU)')
+def month_end(period, workers):
+    """Closing + laporan keuangan semua user secara paralel (ProcessPoolExecutor)"""
+    period = period or current_period_key()
+    try:
+        period_bounds(period)
+    except ValueError:
+        raise click.BadParameter('format periode harus YYYY-MM', param_hint='--period')
+    if period > current_period_key():
+        raise click.BadParameter('periode belum dimulai', param_hint='--period')
+    workers = workers or os.cpu_count() or 1
+    
+    user_ids = tenant_router.ledger_user_ids()
+    # Lepas koneksi sebelum fork agar tidak terbawa ke proses worker
+    db.session.remove()
+    for engine in db.engines.values():
+        engine.dispose()
+    
+    print(f"Month-end {period}: {len(user_ids)} user, {workers} worker")
+    started = time.perf_counter()
+    
+    if workers == 1:
+        results = [run_month_end_for_user(user_id, period) for user_id in user_ids]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_month_end_worker_init) as executor:
+            results = list(executor.map(run_month_end_for_user, user_ids, [period] * len(user_ids)))
+    
+    failed = 0
+    for result in results:
+        if result['success']:
+            print(f"  user {result['user_id']}: laba bersih {result['net_income']:,.2f} ({result['seconds']}s)")
+        else:
+            failed += 1
+            print(f"  user {result['user_id']}: GAGAL - {result['message']}")
+    
+    print(f"Selesai dalam {time.perf_counter() - started:.2f}s, {failed} gagal")
+
 @app.route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
     flash('Anda telah logout.', 'info')
     return redirect(url_for('index'))
 
+# PROFILER ROUTES
+@app.route('/profiles')
+@login_required
+def list_profiles():
+    if not profiler.is_admin():
+        abort(403)
+    
+    profiles = profiler.list_profiles()
+    for profile in profiles:
+        profile['download_url'] = url_for('download_profile', name=profile['name'])
+    return jsonify({'success': True, 'profiles': profiles})
+
+@app.route('/profiles/<name>')
+@login_required
+def download_profile(name):
+    if not profiler.is_admin():
+        abort(403)
+    
+    path = profiler.profile_path(name)
+    if not path:
+        abort(404)
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=f'{name}.folded')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.enabled:
+        return 'Metrics tidak aktif', 404
+    
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return 'Unauthorized', 401
+    
+    body, content_type = metrics.render()
+    return body, 200, {'Content-Type': content_type}
+
 @app.route('/test-db')
 def test_db():
     try:
@@ -0,0 +1,177 @@
+"""Jalur baca async (ASGI) untuk endpoint laporan read-only.
+
+Endpoint JSON laporan dilayani langsung oleh engine async SQLAlchemy 2.0
+(aiosqlite / asyncpg) sehingga satu worker bisa melayani banyak polling
+dashboard sekaligus. Semua path lain diteruskan ke aplikasi Flask biasa.
+
+Menjalankan:
+    uvicorn asgi:application --host 0.0.0.0 --port $PORT --workers 2
+
+Perhitungan saldo dan laporan memakai fungsi yang sama dengan view Flask
+(balance_totals_query, build_report_payload -> TrialBalance/FinancialStatement).
+"""
+import json
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import (
+    app as flask_app, db, Account, StatementMapping, StatementLayout, User, REPLICA_BIND, REPORT_INCLUDES_ADJUSTING,
+    apply_sqlite_pragmas, balance_totals_from_rows, balance_totals_query,
+    build_dashboard_summary, build_engine_options, build_report_payload, dashboard_summary_query,
+    replica_router, tenant_router
+)
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_url(bind_key=None):
+    """URL async dari ASYNC_DATABASE_URL atau diturunkan dari engine Flask (bind tenant jika diberikan)"""
+    if bind_key is None and os.environ.get('ASYNC_DATABASE_URL'):
+        return os.environ['ASYNC_DATABASE_URL']
+
+    # Pakai URL engine yang sudah di-resolve Flask-SQLAlchemy (path SQLite relatif -> instance/)
+    with flask_app.app_context():
+        url = db.engines[bind_key].url
+
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f'Database {backend} tidak punya driver async yang didukung')
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+class AsyncReportApp:
+    """Aplikasi ASGI: endpoint laporan async + fallback ke Flask (WSGI)"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.fallback = WsgiToAsgi(wsgi_app)
+        self.engines = {}
+        self.session_factories = {}
+        self.routes = {
+            '/api/dashboard/financial_data': 'financial_statements',
+            '/api/dashboard/summary': 'dashboard_summary',
+        }
+        for report in REPORT_INCLUDES_ADJUSTING:
+            self.routes[f'/api/reports/{report}'] = report
+
+    def _session_factory(self, bind_key=None):
+        """Session async untuk database utama (None) atau database tenant (bind_key)"""
+        if bind_key in self.session_factories:
+            return self.session_factories[bind_key]
+
+        url = async_database_url(bind_key)
+        engine = create_async_engine(url, **build_engine_options(url))
+        if make_url(url).get_backend_name() == 'sqlite':
+            event.listen(engine.sync_engine, 'connect',
+                         lambda dbapi_connection, record: apply_sqlite_pragmas(dbapi_connection))
+        self.engines[bind_key] = engine
+        self.session_factories[bind_key] = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        return self.session_factories[bind_key]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') and scope['path'] in self.routes:
+            await self._report(scope, send, self.routes[scope['path']])
+            return
+
+        await self.fallback(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._session_factory()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in self.engines.values():
+                    await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _session_from_scope(self, scope):
+        """Baca isi cookie session Flask yang ditandatangani (dict kosong jika tidak valid)"""
+        cookie_name = flask_app.config.get('SESSION_COOKIE_NAME', 'session')
+        cookies = {}
+        for name, value in scope.get('headers', []):
+            if name == b'cookie':
+                for part in value.decode('latin-1').split(';'):
+                    key, _, morsel = part.strip().partition('=')
+                    cookies[key] = morsel
+
+        if cookie_name not in cookies:
+            return {}
+
+        serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        try:
+            return serializer.loads(cookies[cookie_name], max_age=max_age)
+        except Exception:
+            return {}
+
+    async def _report(self, scope, send, report):
+        session_data = self._session_from_scope(scope)
+        user_id = int(session_data['_user_id']) if session_data.get('_user_id') else None
+        if user_id is None:
+            await self._send_json(send, 401, {'success': False, 'error': 'Silakan login untuk mengakses halaman ini.'})
+            return
+
+        # Replica kecuali user baru saja menulis (read-your-writes, lihat ReplicaRouter)
+        use_replica = replica_router.enabled and not replica_router.wrote_recently(session_data)
+        session_factory = self._session_factory(REPLICA_BIND if use_replica else None)
+        tenant_bind = tenant_router.bind_key(user_id)
+        try:
+            async with session_factory() as session:
+                if await session.scalar(select(User.id).where(User.id == user_id)) is None:
+                    await self._send_json(send, 401, {'success': False, 'error': 'User tidak ditemukan'})
+                    return
+
+                accounts = (await session.scalars(select(Account).where(Account.is_active == True))).all()
+                mappings = (await session.scalars(select(StatementMapping).order_by(StatementMapping.id))).all()
+                if tenant_bind is None:
+                    ledger = await self._ledger(session, user_id, report)
+                else:
+                    # Ledger user ini ada di database tenant (TENANT_DATABASES)
+                    async with self._session_factory(tenant_bind)() as tenant_session:
+                        ledger = await self._ledger(tenant_session, user_id, report)
+                if report == 'dashboard_summary':
+                    payload = build_dashboard_summary(accounts, ledger, StatementLayout(mappings))
+                else:
+                    payload = build_report_payload(report, accounts, ledger, StatementLayout(mappings))
+        except Exception as e:
+            await self._send_json(send, 500, {'success': False, 'error': str(e)})
+            return
+
+        await self._send_json(send, 200, payload)
+
+    async def _ledger(self, session, user_id, report):
+        """Satu query ke database ledger: saldo per akun, atau baris ringkasan dashboard"""
+        if report == 'dashboard_summary':
+            return (await session.execute(dashboard_summary_query(user_id))).all()
+
+        stmt = balance_totals_query(user_id, REPORT_INCLUDES_ADJUSTING[report])
+        return balance_totals_from_rows(await session.execute(stmt))
+
+    async def _send_json(self, send, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('latin-1')),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+application = AsyncReportApp(flask_app)
@@ -0,0 +1,41 @@
+// Modal functions
+function openModal() {
+    document.getElementById('entryModal').classList.remove('hidden');
+}
+
+function closeModal() {
+    document.getElementById('entryModal').classList.add('hidden');
+    // Reset form ketika modal ditutup
+    document.getElementById('adjustingForm').reset();
+}
+
+// Form validation
+document.getElementById('adjustingForm').addEventListener('submit', function(e) {
+    const debitAccount = document.querySelector('select[name="account_debit_code"]').value;
+    const creditAccount = document.querySelector('select[name="account_credit_code"]').value;
+    
+    if (debitAccount === creditAccount) {
+        e.preventDefault();
+        alert('Error: Akun debit dan kredit tidak boleh sama!');
+        return false;
+    }
+});
+
+// Confirm delete function
+function confirmDelete() {
+    return confirm('Batalkan jurnal penyesuaian ini? Jurnal pembalik akan dibuat.');
+}
+
+// Close modal when clicking outside
+document.getElementById('entryModal').addEventListener('click', function(e) {
+    if (e.target.id === 'entryModal') {
+        closeModal();
+    }
+});
+
+// Close modal with Escape key
+document.addEventListener('keydown', function(e) {
+    if (e.key === 'Escape') {
+        closeModal();
+    }
+});
@@ -0,0 +1,22 @@
+// Auto-hide flash messages after 5 seconds
+setTimeout(() => {
+    const flashMessages = document.querySelectorAll('.flash-success, .flash-error, .flash-info');
+    flashMessages.forEach(message => {
+        message.style.transition = 'opacity 0.5s ease';
+        message.style.opacity = '0';
+        setTimeout(() => message.remove(), 500);
+    });
+}, 5000);
+
+// Set active menu item based on current URL
+document.addEventListener('DOMContentLoaded', function() {
+    const currentPath = window.location.pathname;
+    const menuItems = document.querySelectorAll('.menu-item');
+    
+    menuItems.forEach(item => {
+        if (item.getAttribute('href') === currentPath) {
+            item.classList.add('active');
+        }
+    });
+});
+
@@ -0,0 +1,89 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const jobStatus = document.getElementById('closingJobStatus');
+    const generateBtn = document.getElementById('generateClosingBtn');
+    if (!jobStatus) return;
+
+    function stopWithError(message) {
+        jobStatus.classList.add('hidden');
+        if (generateBtn) generateBtn.disabled = false;
+        showAlert('error', message);
+    }
+
+    async function pollClosingJob() {
+        try {
+            const response = await fetch(jobStatus.dataset.statusUrl);
+            const data = await response.json();
+            const job = data.job;
+            if (!job) {
+                // Job tidak ditemukan (kedaluwarsa/terhapus): hentikan polling dan beri tahu user
+                stopWithError('Status job closing tidak ditemukan. Silakan generate ulang.');
+                return;
+            }
+
+            document.getElementById('closingJobProgress').textContent = job.progress;
+            if (job.status === 'finished') {
+                window.location.href = jobStatus.dataset.reloadUrl;
+                return;
+            }
+            if (job.status === 'failed') {
+                stopWithError('Gagal generate closing entries: ' + job.error);
+                return;
+            }
+        } catch (error) {
+            console.error('Error polling closing job:', error);
+        }
+        setTimeout(pollClosingJob, 2000);
+    }
+
+    if (generateBtn) {
+        generateBtn.addEventListener('click', async function() {
+            generateBtn.disabled = true;
+            try {
+                const response = await fetch(generateBtn.dataset.generateUrl, { method: 'POST' });
+                const data = await response.json();
+                if (!data.success) {
+                    stopWithError(data.message);
+                    return;
+                }
+                jobStatus.dataset.statusUrl = data.job.status_url;
+                document.getElementById('closingJobProgress').textContent = data.job.progress;
+                jobStatus.classList.remove('hidden');
+                setTimeout(pollClosingJob, 1000);
+            } catch (error) {
+                stopWithError('Gagal generate closing entries: ' + error);
+            }
+        });
+    }
+
+    if (jobStatus.dataset.statusUrl) {
+        if (generateBtn) generateBtn.disabled = true;
+        setTimeout(pollClosingJob, 1000);
+    }
+});
+
+function showAlert(type, message) {
+    const alertDiv = document.getElementById('alertMessage');
+    const bgColor = type === 'success' ? 'bg-green-50 border-green-200' : 'bg-red-50 border-red-200';
+    const textColor = type === 'success' ? 'text-green-800' : 'text-red-800';
+    const icon = type === 'success' ? 'fa-check-circle' : 'fa-exclamation-circle';
+    const iconColor = type === 'success' ? 'text-green-500' : 'text-red-500';
+    
+    alertDiv.innerHTML = `
+        <div class="${bgColor} border rounded-lg p-4 ${textColor}">
+            <div class="flex items-center gap-3">
+                <i class="fas ${icon} ${iconColor}"></i>
+                <div class="flex-1">${message}</div>
+                <button onclick="this.parentElement.parentElement.classList.add('hidden')" 
+                        class="text-${type === 'success' ? 'green' : 'red'}-400 hover:text-${type === 'success' ? 'green' : 'red'}-600">
+                    <i class="fas fa-times"></i>
+                </button>
+            </div>
+        </div>
+    `;
+    alertDiv.classList.remove('hidden');
+    
+    // Auto hide after 5 seconds
+    setTimeout(() => {
+        alertDiv.classList.add('hidden');
+    }, 5000);
+}
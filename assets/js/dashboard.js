@@ -0,0 +1,173 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const refreshIncomeBtn = document.getElementById('refresh-income-statement');
+    const refreshBalanceBtn = document.getElementById('refresh-balance-sheet');
+    const refreshEquityBtn = document.getElementById('refresh-equity-statement');
+
+    // Fungsi untuk memformat angka ke format Rupiah
+    function formatRupiah(amount) {
+        return 'Rp ' + new Intl.NumberFormat('id-ID', {
+            minimumFractionDigits: 2,
+            maximumFractionDigits: 2
+        }).format(amount);
+    }
+
+    // Fungsi untuk mengambil data financial statements terbaru
+    async function refreshFinancialData() {
+        try {
+            const response = await fetch('/api/dashboard/summary');
+            const data = await response.json();
+            
+            if (data.success) {
+                // Update jumlah akun/transaksi/jurnal dari ringkasan yang sama
+                document.getElementById('total-accounts').textContent = data.total_accounts;
+                document.getElementById('total-transactions').textContent = data.total_transactions;
+                document.getElementById('total-journal-entries').textContent = data.total_journal_entries;
+
+                // Update Laba/Rugi - DIPERKECIL
+                const netIncomeElement = document.getElementById('net-income');
+                netIncomeElement.textContent = formatRupiah(data.net_income);
+                
+                // Update Income Statement
+                const incomeStatement = data.income_statement;
+                const incomeContent = document.getElementById('income-statement-content');
+                
+                incomeContent.innerHTML = `
+                    <div class="space-y-4">
+                        <div class="flex justify-between items-center py-2">
+                            <span class="text-white text-base">Pendapatan</span>
+                            <span class="font-medium text-white text-sm">
+                                ${formatRupiah(incomeStatement.revenue || 0)}
+                            </span>
+                        </div>
+                        <div class="flex justify-between items-center py-2">
+                            <span class="text-white text-base">Harga Pokok Penjualan</span>
+                            <span class="font-medium text-white text-sm">
+                                ${formatRupiah(incomeStatement.hpp || 0)}
+                            </span>
+                        </div>
+                        <div class="border-t border-white/30 pt-3 flex justify-between items-center py-2">
+                            <span class="text-white font-bold text-base">Laba Kotor</span>
+                            <span class="font-bold text-white text-base">
+                                ${formatRupiah(incomeStatement.gross_profit || 0)}
+                            </span>
+                        </div>
+                        <div class="flex justify-between items-center py-2">
+                            <span class="text-white text-base">Beban Operasional</span>
+                            <span class="font-medium text-white text-sm">
+                                ${formatRupiah(incomeStatement.operating_expenses || 0)}
+                            </span>
+                        </div>
+                        <div class="border-t border-white/30 pt-3 flex justify-between items-center py-2">
+                            <span class="text-white font-bold text-base">Laba Bersih</span>
+                            <span class="font-bold text-white text-base">
+                                ${formatRupiah(incomeStatement.net_income || 0)}
+                            </span>
+                        </div>
+                    </div>
+                `;
+                
+                // Update Balance Sheet
+                const balanceSheet = data.balance_sheet;
+                const balanceContent = document.getElementById('balance-sheet-content');
+                
+                balanceContent.innerHTML = `
+                    <div class="space-y-4">
+                        <div class="mb-4">
+                            <h3 class="text-md font-semibold text-white mb-3">Aset</h3>
+                            <div class="flex justify-between items-center py-2">
+                                <span class="text-white text-base">Total Aset</span>
+                                <span class="font-medium text-white text-sm">
+                                    ${formatRupiah(balanceSheet.assets || 0)}
+                                </span>
+                            </div>
+                        </div>
+                        <div class="mb-4">
+                            <h3 class="text-md font-semibold text-white mb-3">Kewajiban</h3>
+                            <div class="flex justify-between items-center py-2">
+                                <span class="text-white text-base">Total Kewajiban</span>
+                                <span class="font-medium text-white text-sm">
+                                    ${formatRupiah(balanceSheet.liabilities || 0)}
+                                </span>
+                            </div>
+                        </div>
+                        <div class="mb-4">
+                            <div class="border-t border-white/30 pt-3 mb-3"></div>
+                            <h3 class="text-md font-semibold text-white mb-3">Ekuitas</h3>
+                            <div class="flex justify-between items-center py-2">
+                                <span class="text-white text-base">Total Ekuitas</span>
+                                <span class="font-bold text-white text-base">
+                                    ${formatRupiah(balanceSheet.equity || 0)}
+                                </span>
+                            </div>
+                        </div>
+                    </div>
+                `;
+
+                // Update Equity Statement
+                const equityContent = document.getElementById('equity-statement-content');
+                
+                equityContent.innerHTML = `
+                    <div class="space-y-4">
+                        <div class="flex justify-between items-center py-2">
+                            <span class="text-white text-base">Modal Awal</span>
+                            <span class="font-medium text-white text-sm">
+                                ${formatRupiah(balanceSheet.initial_equity || 0)}
+                            </span>
+                        </div>
+                        <div class="flex justify-between items-center py-2">
+                            <span class="text-white text-base">Laba Bersih</span>
+                            <span class="font-medium text-white text-sm">
+                                ${formatRupiah(incomeStatement.net_income || 0)}
+                            </span>
+                        </div>
+                        <div class="flex justify-between items-center py-2">
+                            <span class="text-white text-base">Prive</span>
+                            <span class="font-medium text-white text-sm">
+                                ${formatRupiah(balanceSheet.prive || 0)}
+                            </span>
+                        </div>
+                        <div class="border-t border-white/30 pt-3 flex justify-between items-center py-2">
+                            <span class="text-white font-bold text-base">Modal Akhir</span>
+                            <span class="font-bold text-white text-base">
+                                ${formatRupiah(balanceSheet.equity || 0)}
+                            </span>
+                        </div>
+                    </div>
+                `;
+                
+                // Show success message
+                showNotification('Data financial statements berhasil diperbarui!', 'success');
+            } else {
+                showNotification('Gagal memuat data financial statements: ' + data.error, 'error');
+            }
+        } catch (error) {
+            console.error('Error refreshing financial data:', error);
+            showNotification('Terjadi kesalahan saat memuat data', 'error');
+        }
+    }
+
+    // Fungsi untuk menampilkan notifikasi
+    function showNotification(message, type) {
+        // Buat elemen notifikasi
+        const notification = document.createElement('div');
+        notification.className = `fixed top-4 right-4 p-4 rounded-lg shadow-lg z-50 ${
+            type === 'success' ? 'bg-green-500 text-white' : 'bg-red-500 text-white'
+        }`;
+        notification.textContent = message;
+        
+        document.body.appendChild(notification);
+        
+        // Hapus notifikasi setelah 3 detik
+        setTimeout(() => {
+            notification.remove();
+        }, 3000);
+    }
+
+    // Event listener untuk tombol refresh
+    refreshIncomeBtn.addEventListener('click', refreshFinancialData);
+    refreshBalanceBtn.addEventListener('click', refreshFinancialData);
+    refreshEquityBtn.addEventListener('click', refreshFinancialData);
+
+    // Auto-refresh financial data setiap 30 detik
+    setInterval(refreshFinancialData, 30000);
+});
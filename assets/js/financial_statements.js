@@ -0,0 +1,23 @@
+function showTab(tabName) {
+    // Hide all tab contents
+    document.querySelectorAll('.tab-content').forEach(tab => {
+        tab.classList.add('hidden');
+    });
+    
+    // Show selected tab content
+    document.getElementById(tabName).classList.remove('hidden');
+    
+    // Update active tab button
+    document.querySelectorAll('nav button').forEach(button => {
+        button.classList.remove('border-purple-500', 'text-purple-600', 'bg-purple-50');
+        button.classList.add('border-transparent', 'text-gray-500');
+    });
+    
+    event.target.classList.add('border-purple-500', 'text-purple-600', 'bg-purple-50');
+    event.target.classList.remove('border-transparent', 'text-gray-500');
+}
+
+// Show income statement by default
+document.addEventListener('DOMContentLoaded', function() {
+    showTab('incomeStatement');
+});
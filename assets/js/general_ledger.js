@@ -0,0 +1,27 @@
+// Auto-refresh ketika memilih akun
+document.addEventListener('DOMContentLoaded', function() {
+    const accountSelect = document.querySelector('select[name="account_id"]');
+    
+    accountSelect.addEventListener('change', function() {
+        if (this.value) {
+            // Bisa tambahkan loading indicator di sini jika perlu
+            this.form.submit();
+        }
+    });
+});
+
+// Format angka dengan separator ribuan
+function formatNumber(number) {
+    return new Intl.NumberFormat('id-ID').format(number);
+}
+
+// Update semua angka yang perlu diformat
+document.addEventListener('DOMContentLoaded', function() {
+    const numberElements = document.querySelectorAll('[data-format-number]');
+    numberElements.forEach(element => {
+        const number = parseFloat(element.textContent.replace(/[^\d.-]/g, ''));
+        if (!isNaN(number)) {
+            element.textContent = formatNumber(number);
+        }
+    });
+});
@@ -0,0 +1,76 @@
+function validateForm() {
+    let isValid = true;
+    
+    // Reset error messages
+    document.getElementById('username-error').classList.add('hidden');
+    document.getElementById('password-error').classList.add('hidden');
+    document.getElementById('email-error').classList.add('hidden');
+    
+    // Get values
+    const username = document.getElementById('username').value.trim();
+    const password = document.getElementById('password').value;
+    const email = document.getElementById('email').value.trim();
+    
+    // Validate username (minimal 6 huruf, hanya huruf)
+    const usernameRegex = /^[A-Za-z]{6,}$/;
+    if (!usernameRegex.test(username)) {
+        document.getElementById('username-error').textContent = 'Username harus minimal 6 karakter dan hanya terdiri dari huruf';
+        document.getElementById('username-error').classList.remove('hidden');
+        isValid = false;
+    }
+    
+    // Validate email
+    const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+    if (!emailRegex.test(email)) {
+        document.getElementById('email-error').textContent = 'Format email tidak valid';
+        document.getElementById('email-error').classList.remove('hidden');
+        isValid = false;
+    }
+    
+    // Validate password (minimal 6 karakter, kombinasi huruf dan angka)
+    const passwordRegex = /^(?=.*[A-Za-z])(?=.*\d).{6,}$/;
+    if (!passwordRegex.test(password)) {
+        document.getElementById('password-error').textContent = 'Password harus minimal 6 karakter dengan kombinasi huruf dan angka';
+        document.getElementById('password-error').classList.remove('hidden');
+        isValid = false;
+    }
+    
+    return isValid;
+}
+
+// Real-time validation
+document.getElementById('username').addEventListener('input', function() {
+    const username = this.value.trim();
+    const usernameRegex = /^[A-Za-z]{6,}$/;
+    
+    if (username.length > 0 && !usernameRegex.test(username)) {
+        document.getElementById('username-error').textContent = 'Username harus minimal 6 karakter dan hanya terdiri dari huruf';
+        document.getElementById('username-error').classList.remove('hidden');
+    } else {
+        document.getElementById('username-error').classList.add('hidden');
+    }
+});
+
+document.getElementById('password').addEventListener('input', function() {
+    const password = this.value;
+    const passwordRegex = /^(?=.*[A-Za-z])(?=.*\d).{6,}$/;
+    
+    if (password.length > 0 && !passwordRegex.test(password)) {
+        document.getElementById('password-error').textContent = 'Password harus minimal 6 karakter dengan kombinasi huruf dan angka';
+        document.getElementById('password-error').classList.remove('hidden');
+    } else {
+        document.getElementById('password-error').classList.add('hidden');
+    }
+});
+
+document.getElementById('email').addEventListener('input', function() {
+    const email = this.value.trim();
+    const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+    
+    if (email.length > 0 && !emailRegex.test(email)) {
+        document.getElementById('email-error').textContent = 'Format email tidak valid';
+        document.getElementById('email-error').classList.remove('hidden');
+    } else {
+        document.getElementById('email-error').classList.add('hidden');
+    }
+});
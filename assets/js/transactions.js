@@ -0,0 +1,83 @@
+// Auto-format amount input
+document.querySelector('input[name="amount"]').addEventListener('input', function(e) {
+    // Remove non-numeric characters except decimal point
+    let value = e.target.value.replace(/[^\d.]/g, '');
+    
+    // Ensure only one decimal point
+    const decimalCount = value.split('.').length - 1;
+    if (decimalCount > 1) {
+        value = value.substring(0, value.lastIndexOf('.'));
+    }
+    
+    e.target.value = value;
+});
+
+// Jurnal majemuk: baris dinamis + total debit/kredit
+const journalLines = document.getElementById('journalLines');
+
+function updateJournalTotals() {
+    let debit = 0;
+    let credit = 0;
+    journalLines.querySelectorAll('tr').forEach(row => {
+        debit += parseFloat(row.querySelector('[name="line_debit"]').value) || 0;
+        credit += parseFloat(row.querySelector('[name="line_credit"]').value) || 0;
+    });
+    document.getElementById('linesDebitTotal').textContent = 'Rp ' + debit.toLocaleString('en-US', {minimumFractionDigits: 2});
+    document.getElementById('linesCreditTotal').textContent = 'Rp ' + credit.toLocaleString('en-US', {minimumFractionDigits: 2});
+    return [Math.round(debit * 100), Math.round(credit * 100)];
+}
+
+function addJournalLine() {
+    journalLines.appendChild(document.getElementById('journalLineTemplate').content.cloneNode(true));
+}
+
+document.getElementById('addJournalLine').addEventListener('click', addJournalLine);
+journalLines.addEventListener('input', updateJournalTotals);
+journalLines.addEventListener('click', function(e) {
+    const button = e.target.closest('[data-remove-line]');
+    if (button && journalLines.querySelectorAll('tr').length > 2) {
+        button.closest('tr').remove();
+        updateJournalTotals();
+    }
+});
+addJournalLine();
+addJournalLine();
+
+document.getElementById('compoundForm').addEventListener('submit', function(e) {
+    const [debit, credit] = updateJournalTotals();
+    if (debit === 0 || debit !== credit) {
+        e.preventDefault();
+        alert('Error: Total debit dan kredit harus sama dan lebih dari 0!');
+    }
+});
+
+// Prevent form submission if debit and credit accounts are the same
+document.querySelector('form').addEventListener('submit', function(e) {
+    const debitAccount = document.querySelector('select[name="account_debit"]').value;
+    const creditAccount = document.querySelector('select[name="account_credit"]').value;
+    
+    if (debitAccount === creditAccount) {
+        e.preventDefault();
+        alert('Error: Akun debit dan kredit tidak boleh sama!');
+        return false;
+    }
+    
+    const amount = document.querySelector('input[name="amount"]').value;
+    if (parseFloat(amount) <= 0) {
+        e.preventDefault();
+        alert('Error: Jumlah harus lebih dari 0!');
+        return false;
+    }
+});
+
+// Add some interactivity to the table
+document.addEventListener('DOMContentLoaded', function() {
+    const rows = document.querySelectorAll('tbody:not(#journalLines) tr');
+    rows.forEach(row => {
+        row.addEventListener('click', function(e) {
+            if (!e.target.closest('td:last-child')) {
+                this.classList.toggle('bg-purple-50');
+            }
+        });
+    });
+});
@@ -0,0 +1,17 @@
+// Add some interactivity
+document.addEventListener('DOMContentLoaded', function() {
+    // Add row hover effects
+    const rows = document.querySelectorAll('tbody tr');
+    rows.forEach(row => {
+        row.addEventListener('mouseenter', function() {
+            if (!this.classList.contains('table-header-row')) {
+                this.style.backgroundColor = '#f8f9fa';
+            }
+        });
+        row.addEventListener('mouseleave', function() {
+            if (!this.classList.contains('table-header-row')) {
+                this.style.backgroundColor = '';
+            }
+        });
+    });
+});
@@ -0,0 +1,149 @@
+"""Benchmark pool koneksi ala pgbench.
+
+Menjalankan transaksi pendek (UPDATE saldo, SELECT saldo, INSERT histori) dari
+banyak thread sekaligus terhadap DATABASE_URL, sekali untuk setiap setting pool,
+lalu mencetak throughput (transaksi/detik), latensi dan jumlah error.
+
+Contoh:
+    python benchmarks/pool_benchmark.py --url postgresql://localhost/tandur_bench \\
+        --threads 32 --duration 10 --settings 5:0 5:10 10:20 20:20
+    python benchmarks/pool_benchmark.py --threads 8 --settings 5:10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_ACCOUNTS = 1000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=os.environ.get('DATABASE_URL'),
+                        help='URL database (default: DATABASE_URL atau SQLite sementara)')
+    parser.add_argument('--threads', type=int, default=16, help='jumlah klien bersamaan')
+    parser.add_argument('--duration', type=float, default=5.0, help='lama tiap putaran (detik)')
+    parser.add_argument('--settings', nargs='+', default=['5:0', '5:10', '10:20'],
+                        help='daftar pool_size:max_overflow yang diuji')
+    parser.add_argument('--no-pre-ping', action='store_true', help='matikan pool_pre_ping')
+    parser.add_argument('--json', help='simpan hasil ke file JSON')
+    return parser.parse_args()
+
+
+def prepare(engine):
+    from sqlalchemy import text
+
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS bench_history'))
+        conn.execute(text('DROP TABLE IF EXISTS bench_accounts'))
+        conn.execute(text('CREATE TABLE bench_accounts (aid INTEGER PRIMARY KEY, abalance INTEGER NOT NULL)'))
+        conn.execute(text('CREATE TABLE bench_history (aid INTEGER NOT NULL, delta INTEGER NOT NULL, mtime VARCHAR(40))'))
+        conn.execute(text('INSERT INTO bench_accounts (aid, abalance) VALUES (:aid, 0)'),
+                     [{'aid': aid} for aid in range(1, BENCH_ACCOUNTS + 1)])
+
+
+def run_setting(url, threads, duration, pool_size, max_overflow, pre_ping):
+    from sqlalchemy import create_engine, text
+    from app import build_engine_options
+
+    environ = dict(os.environ,
+                   DB_POOL_SIZE=str(pool_size),
+                   DB_MAX_OVERFLOW=str(max_overflow),
+                   DB_POOL_PRE_PING='0' if pre_ping is False else '1')
+    options = build_engine_options(url, environ)
+    if url.startswith('sqlite'):
+        # build_engine_options tidak mengatur pool / pre-ping untuk SQLite; set manual agar bisa dibandingkan
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=pre_ping)
+
+    engine = create_engine(url, **options)
+    prepare(engine)
+
+    stop_at = time.perf_counter() + duration
+    lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def client():
+        local_latencies = []
+        local_errors = 0
+        rng = random.Random()
+        while time.perf_counter() < stop_at:
+            aid = rng.randint(1, BENCH_ACCOUNTS)
+            delta = rng.randint(-5000, 5000)
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text('UPDATE bench_accounts SET abalance = abalance + :delta WHERE aid = :aid'),
+                                 {'delta': delta, 'aid': aid})
+                    conn.execute(text('SELECT abalance FROM bench_accounts WHERE aid = :aid'), {'aid': aid}).scalar()
+                    conn.execute(text('INSERT INTO bench_history (aid, delta, mtime) VALUES (:aid, :delta, :mtime)'),
+                                 {'aid': aid, 'delta': delta, 'mtime': str(time.time())})
+                local_latencies.append(time.perf_counter() - started)
+            except Exception:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    engine.dispose()
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pre_ping': pre_ping,
+        'transactions': len(latencies),
+        'errors': sum(errors),
+        'tps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(0.50), 2),
+        'p95_ms': round(percentile(0.95), 2),
+        'p99_ms': round(percentile(0.99), 2),
+    }
+
+
+def main():
+    args = parse_args()
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pool_bench.db')}"
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    # app.py membaca DATABASE_URL saat di-import
+    os.environ['DATABASE_URL'] = url
+
+    results = []
+    print(f"URL: {url} | threads={args.threads} | durasi={args.duration}s")
+    print(f"{'pool':>6} {'overflow':>8} {'tps':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'error':>6}")
+    for setting in args.settings:
+        pool_size, max_overflow = (int(part) for part in setting.split(':'))
+        result = run_setting(url, args.threads, args.duration, pool_size, max_overflow, not args.no_pre_ping)
+        results.append(result)
+        print(f"{pool_size:>6} {max_overflow:>8} {result['tps']:>10} {result['p50_ms']:>8} "
+              f"{result['p95_ms']:>8} {result['p99_ms']:>8} {result['errors']:>6}")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'url': url, 'threads': args.threads, 'duration': args.duration, 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
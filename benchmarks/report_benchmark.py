@@ -0,0 +1,212 @@
+"""Benchmark semua route laporan lewat Flask test client.
+
+Mengisi database dengan ledger sintetis (benchmarks/synthetic_ledger.py), lalu
+menjalankan setiap route laporan beberapa kali dan mencatat persentil latensi,
+jumlah query SQL dan memori puncak. Hasil disimpan sebagai JSON sehingga bisa
+dibandingkan dengan hasil sebelumnya (--compare).
+
+Contoh:
+    python benchmarks/report_benchmark.py --transactions 5000 --years 2 --output bench.json
+    python benchmarks/report_benchmark.py --transactions 5000 --years 2 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = [
+    ('trial_balance', '/trial_balance'),
+    ('adjusted_trial_balance', '/adjusted_trial_balance'),
+    ('general_ledger', '/general_ledger?account_id={kas_id}'),
+    ('general_journal', '/general_journal'),
+    ('financial_statements', '/financial_statements'),
+    # Halaman saja (GET tidak menjalankan closing); closing diukur lewat target "closing_processor"
+    ('closing_entries', '/closing_entries'),
+    ('post_closing_trial_balance', '/post_closing_trial_balance'),
+    ('dashboard_financial_data', '/api/dashboard/financial_data'),
+    ('search_text', '/api/search?q=sewa'),
+    ('search_reference', '/api/search?q=TRX-1'),
+    ('search_amount_date', '/api/search?amount_min=100000&amount_max=500000&date_from={date_from}'),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=None, help='URL database (default: SQLite sementara)')
+    parser.add_argument('--users', type=int, default=2)
+    parser.add_argument('--transactions', type=int, default=2000, help='transaksi per user')
+    parser.add_argument('--adjusting', type=int, default=50, help='jurnal penyesuaian per user')
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--iterations', type=int, default=10, help='jumlah request per route')
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--routes', nargs='*', help='hanya jalankan route tertentu (nama)')
+    parser.add_argument('--output', help='simpan hasil ke file JSON')
+    parser.add_argument('--compare', help='bandingkan dengan hasil JSON sebelumnya')
+    parser.add_argument('--fragment-cache', action='store_true',
+                        help='aktifkan cache fragment (mengukur cache hit, bukan biaya laporan)')
+    return parser.parse_args()
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    index = min(len(ordered) - 1, max(0, int(round(p * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies, queries, peak_bytes):
+    return {
+        'iterations': len(latencies),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak_bytes / 1024, 1),
+    }
+
+
+def measure(fn, iterations, warmup, counter):
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    queries = []
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for _ in range(iterations):
+        counter.count = 0
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+        queries.append(counter.count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(latencies, queries, peak)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)['routes']
+
+    print(f"\nPerbandingan dengan {baseline_path}:")
+    print(f"{'route':<30} {'p50 lama':>10} {'p50 baru':>10} {'delta':>8} {'query':>12}")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        delta = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+        print(f"{name:<30} {old['p50_ms']:>10} {result['p50_ms']:>10} {delta:>+7.1f}% "
+              f"{old['queries']:>5} -> {result['queries']:<5}")
+
+
+def main():
+    args = parse_args()
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'report_bench.db')}"
+    os.environ['DATABASE_URL'] = url
+    # Jangan ada job background yang berjalan bersamaan dengan pengukuran
+    os.environ.pop('REDIS_URL', None)
+    # Default tanpa cache fragment: setelah iterasi pertama semua request jadi cache hit
+    os.environ['FRAGMENT_CACHE_ENABLED'] = '1' if args.fragment_cache else '0'
+
+    from app import app, db, Account, ClosingProcessor, User
+    from synthetic_ledger import BENCH_PASSWORD, seed_ledger
+
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        print(f"Seeding {args.users} user x {args.transactions} transaksi ({args.years} tahun)...")
+        seed_started = time.perf_counter()
+        usernames = seed_ledger(args.users, args.transactions, args.adjusting, args.years)
+        seed_seconds = time.perf_counter() - seed_started
+        user = User.query.filter_by(username=usernames[0]).first()
+        user_id = user.id
+        kas = Account.query.filter_by(account_code='1101').first()
+        kas_id = kas.id if kas else 1
+        date_from = (time.strftime('%Y') + '-01-01')
+        counter = QueryCounter(db.engine)
+
+    client = app.test_client()
+    response = client.post('/login', data={'username': usernames[0], 'password': BENCH_PASSWORD})
+    if response.status_code != 302:
+        raise SystemExit('Login user benchmark gagal')
+
+    results = {}
+    print(f"\n{'route':<30} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'query':>7} {'mem KB':>10}")
+    for name, path in ROUTES:
+        if args.routes and name not in args.routes:
+            continue
+        path = path.format(kas_id=kas_id, date_from=date_from)
+
+        def request_route():
+            resp = client.get(path)
+            if resp.status_code != 200:
+                raise RuntimeError(f'{path} -> HTTP {resp.status_code}')
+            resp.get_data()
+
+        results[name] = measure(request_route, args.iterations, args.warmup, counter)
+        results[name]['path'] = path
+        row = results[name]
+        print(f"{name:<30} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} "
+              f"{row['queries']:>7} {row['peak_memory_kb']:>10}")
+
+    if not args.routes or 'closing_processor' in args.routes:
+        def run_closing():
+            with app.app_context():
+                processor = ClosingProcessor(user_id)
+                processor.generate_closing_entries()
+                processor.save_closing_entries()
+
+        results['closing_processor'] = measure(run_closing, args.iterations, args.warmup, counter)
+        row = results['closing_processor']
+        print(f"{'closing_processor':<30} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} "
+              f"{row['queries']:>7} {row['peak_memory_kb']:>10}")
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'database': url.split('://', 1)[0],
+        'volume': {
+            'users': args.users,
+            'transactions_per_user': args.transactions,
+            'adjusting_per_user': args.adjusting,
+            'years': args.years,
+            'seed_seconds': round(seed_seconds, 2),
+        },
+        'iterations': args.iterations,
+        'fragment_cache': args.fragment_cache,
+        'routes': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nHasil disimpan ke {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Generator ledger sintetis untuk benchmark.
+
+Mengisi database (SQLite/Postgres sesuai DATABASE_URL) dengan user, transaksi
+dan jurnal penyesuaian tersebar selama N tahun memakai model di app.py.
+
+Contoh:
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/synthetic_ledger.py \\
+        --users 5 --transactions 20000 --adjusting 200 --years 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_PASSWORD = 'benchmark'
+
+# (akun debit, akun kredit, rentang jumlah, keterangan)
+TRANSACTION_PATTERNS = [
+    ('1101', '4101', (50000, 2000000), 'Penjualan bawang'),
+    ('1101', '4102', (10000, 200000), 'Penjualan lain-lain'),
+    ('1201', '1101', (50000, 1500000), 'Pembelian persediaan'),
+    ('5101', '1101', (50000, 800000), 'Pembelian'),
+    ('5901', '1201', (20000, 900000), 'Harga pokok penjualan'),
+    ('5201', '1101', (10000, 150000), 'Beban transportasi'),
+    ('5202', '1101', (50000, 500000), 'Beban tenaga kerja'),
+    ('5203', '1101', (100000, 1000000), 'Beban sewa'),
+    ('5204', '1101', (10000, 300000), 'Beban perbaikan'),
+    ('3102', '1101', (10000, 300000), 'Prive pemilik'),
+    ('1301', '1101', (500000, 5000000), 'Pembelian peralatan'),
+]
+
+ADJUSTING_PATTERNS = [
+    ('5301', '1311', (50000, 250000), 'Penyusutan peralatan'),
+    ('5901', '1201', (10000, 200000), 'Penyesuaian persediaan'),
+]
+
+
+def _pick(rng, patterns, start, days):
+    debit, credit, (low, high), description = rng.choice(patterns)
+    date = start + timedelta(days=rng.randrange(days), seconds=rng.randrange(86400))
+    return debit, credit, round(rng.uniform(low, high), -2), description, date
+
+
+def seed_ledger(users=3, transactions=1000, adjusting=50, years=1, seed=42, batch_size=2000, verbose=True):
+    """Isi database dengan ledger sintetis; kembalikan daftar username yang dibuat.
+
+    Harus dipanggil di dalam app context.
+    """
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from app import db, User, Account, Transaction, JournalEntry, AdjustingEntry, create_default_accounts_if_needed
+
+    rng = random.Random(seed)
+    create_default_accounts_if_needed()
+    account_names = {account.account_code: account.account_name for account in Account.query.all()}
+
+    days = max(1, int(365 * years))
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    run_id = f"{int(time.time())}{rng.randrange(1000):03d}"
+
+    usernames = []
+    for user_index in range(users):
+        started = time.perf_counter()
+        username = f'bench_{run_id}_{user_index}'
+        user = User(username=username, email=f'{username}@bench.local', password_hash=password_hash)
+        db.session.add(user)
+        db.session.flush()
+
+        remaining = transactions
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            remaining -= size
+            generated = [_pick(rng, TRANSACTION_PATTERNS, start, days) for _ in range(size)]
+            transaction_ids = db.session.scalars(
+                insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+                [{
+                    'date': date,
+                    'description': description,
+                    'account_debit': debit,
+                    'account_credit': credit,
+                    'amount': amount,
+                    'created_by': user.id,
+                    'created_at': date
+                } for debit, credit, amount, description, date in generated]
+            ).all()
+
+            journal_rows = []
+            for transaction_id, (debit, credit, amount, description, date) in zip(transaction_ids, generated):
+                for code, debit_amount, credit_amount in ((debit, amount, 0), (credit, 0, amount)):
+                    journal_rows.append({
+                        'date': date,
+                        'description': description,
+                        'account_code': code,
+                        'account_name': account_names.get(code, code),
+                        'debit': debit_amount,
+                        'credit': credit_amount,
+                        'reference': f'TRX-{transaction_id}',
+                        'transaction_id': transaction_id,
+                        'created_by': user.id,
+                        'entry_type': 'regular'
+                    })
+            db.session.execute(insert(JournalEntry), journal_rows)
+
+        generated = [_pick(rng, ADJUSTING_PATTERNS, start, days) for _ in range(adjusting)]
+        adjusting_ids = []
+        if generated:
+            adjusting_ids = db.session.scalars(
+                insert(AdjustingEntry).returning(AdjustingEntry.id, sort_by_parameter_order=True),
+                [{
+                    'date': date,
+                    'reference': f'ADJ-BENCH-{run_id}-{user.id}-{index}',
+                    'description': description,
+                    'account_debit_code': debit,
+                    'account_debit_name': account_names.get(debit, debit),
+                    'account_credit_code': credit,
+                    'account_credit_name': account_names.get(credit, credit),
+                    'amount': amount,
+                    'created_by': user.id
+                } for index, (debit, credit, amount, description, date) in enumerate(generated)]
+            ).all()
+
+        journal_rows = []
+        for adjusting_id, (index, (debit, credit, amount, description, date)) in zip(adjusting_ids, enumerate(generated)):
+            for code, debit_amount, credit_amount in ((debit, amount, 0), (credit, 0, amount)):
+                journal_rows.append({
+                    'date': date,
+                    'description': description,
+                    'account_code': code,
+                    'account_name': account_names.get(code, code),
+                    'debit': debit_amount,
+                    'credit': credit_amount,
+                    'reference': f'ADJ-BENCH-{run_id}-{user.id}-{index}',
+                    'adjusting_entry_id': adjusting_id,
+                    'created_by': user.id,
+                    'entry_type': 'adjusting'
+                })
+        if journal_rows:
+            db.session.execute(insert(JournalEntry), journal_rows)
+
+        db.session.commit()
+        usernames.append(username)
+        if verbose:
+            print(f"  {username}: {transactions} transaksi, {adjusting} penyesuaian "
+                  f"({time.perf_counter() - started:.2f}s)")
+
+    return usernames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--transactions', type=int, default=1000, help='transaksi per user')
+    parser.add_argument('--adjusting', type=int, default=50, help='jurnal penyesuaian per user')
+    parser.add_argument('--years', type=float, default=1, help='rentang tanggal transaksi (tahun)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        usernames = seed_ledger(args.users, args.transactions, args.adjusting, args.years, args.seed)
+    print(f"User benchmark (password '{BENCH_PASSWORD}'): {', '.join(usernames)}")
+
+
+if __name__ == '__main__':
+    main()
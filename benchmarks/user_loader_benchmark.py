@@ -0,0 +1,136 @@
+"""Benchmark query tabel users di bawah beban polling dashboard.
+
+Mensimulasikan beberapa user dengan beberapa tab terbuka yang masing-masing memanggil
+/api/dashboard/financial_data setiap --interval detik (seperti auto-refresh dashboard)
+selama --minutes menit. Jam UserCache dimajukan secara simulasi, jadi satu menit polling
+tidak perlu ditunggu sungguhan. Dijalankan dua kali: tanpa cache (USER_CACHE_TTL=0) dan
+dengan --ttl, lalu mencetak query users per menit dan selisihnya.
+
+Contoh:
+    python benchmarks/user_loader_benchmark.py --users 20 --tabs 3 --minutes 10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+POLL_PATH = '/api/dashboard/financial_data'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--tabs', type=int, default=2, help='tab dashboard terbuka per user')
+    parser.add_argument('--interval', type=float, default=30, help='jeda polling per tab (detik)')
+    parser.add_argument('--minutes', type=float, default=5, help='lama simulasi (menit)')
+    parser.add_argument('--ttl', type=float, default=60, help='USER_CACHE_TTL yang diuji (detik)')
+    parser.add_argument('--json', help='simpan hasil ke file JSON')
+    return parser.parse_args()
+
+
+class UsersQueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.total = 0
+        self.users = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+        if 'FROM users' in statement:
+            self.users += 1
+
+
+def schedule(clients, interval, duration, seed=42):
+    """Urutan (detik, client) polling semua tab, tiap tab mulai di offset acak"""
+    rng = random.Random(seed)
+    events = []
+    for client in clients:
+        at = rng.uniform(0, interval)
+        while at < duration:
+            events.append((at, client))
+            at += interval
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def run(app, user_cache, counter, events, ttl):
+    clock = {'now': 0.0}
+    user_cache.ttl = ttl
+    user_cache.clock = lambda: clock['now']
+    user_cache.entries.clear()
+
+    counter.total = counter.users = 0
+    started = time.perf_counter()
+    for at, client in events:
+        clock['now'] = at
+        response = client.get(POLL_PATH)
+        if response.status_code != 200:
+            raise RuntimeError(f'{POLL_PATH} -> HTTP {response.status_code}')
+    return {
+        'requests': len(events),
+        'users_queries': counter.users,
+        'total_queries': counter.total,
+        'wall_seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'user_loader_bench.db')}"
+    os.environ.pop('REDIS_URL', None)
+
+    from app import app, db, User, user_cache
+
+    app.config['TESTING'] = True
+    password = 'benchmark'
+    with app.app_context():
+        for index in range(args.users):
+            user = User(username=f'poll{index}', email=f'poll{index}@bench.local')
+            user.set_password(password)
+            db.session.add(user)
+        db.session.commit()
+        counter = UsersQueryCounter(db.engine)
+
+    clients = []
+    for index in range(args.users):
+        for _ in range(args.tabs):
+            client = app.test_client()
+            if client.post('/login', data={'username': f'poll{index}', 'password': password}).status_code != 302:
+                raise SystemExit('Login user benchmark gagal')
+            clients.append(client)
+
+    duration = args.minutes * 60
+    events = schedule(clients, args.interval, duration)
+    results = {
+        'no_cache': run(app, user_cache, counter, events, 0),
+        f'ttl_{args.ttl:g}s': run(app, user_cache, counter, events, args.ttl),
+    }
+
+    print(f"{args.users} user x {args.tabs} tab, polling tiap {args.interval:g} detik, {args.minutes:g} menit simulasi")
+    print(f"{'mode':<12} {'req/menit':>10} {'query users/menit':>18} {'query total/menit':>18}")
+    for name, row in results.items():
+        row['requests_per_minute'] = round(row['requests'] / args.minutes, 1)
+        row['users_queries_per_minute'] = round(row['users_queries'] / args.minutes, 1)
+        row['total_queries_per_minute'] = round(row['total_queries'] / args.minutes, 1)
+        print(f"{name:<12} {row['requests_per_minute']:>10} {row['users_queries_per_minute']:>18} "
+              f"{row['total_queries_per_minute']:>18}")
+
+    baseline, cached = results['no_cache'], results[f'ttl_{args.ttl:g}s']
+    saved = baseline['users_queries_per_minute'] - cached['users_queries_per_minute']
+    print(f"Query users yang dihemat: {saved:g}/menit")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'args': vars(args), 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Build aset statis: CSS Tailwind yang sudah di-purge, JS/CSS halaman, nama file ber-hash.
+
+Langkah:
+    1. (sekali, --extract) pindahkan blok <style>/<script> inline tanpa sintaks Jinja dari
+       templates/*.html ke assets/css/<template>.css dan assets/js/<template>.js.
+    2. Tailwind CLI (`tailwindcss` di PATH, TAILWIND_BIN, atau `npx tailwindcss`) membangun
+       assets/tailwind.css menjadi CSS minified yang hanya berisi kelas yang dipakai template.
+    3. Font Awesome disalin dari node_modules/@fortawesome/fontawesome-free bila terpasang.
+    4. Semua file ditulis ke static/dist/<nama>.<hash>.<ext> beserta varian .gz (dan .br bila
+       modul brotli terpasang), lalu static/dist/manifest.json memetakan nama logis -> file.
+
+Tanpa Tailwind CLI / Font Awesome lokal, template memakai CDN seperti sebelumnya.
+
+Contoh:
+    npm install --no-save tailwindcss@3 @fortawesome/fontawesome-free@6
+    python build_assets.py
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(ROOT, 'templates')
+SOURCE_DIR = os.path.join(ROOT, 'assets')
+DIST_DIR = os.path.join(ROOT, 'static', 'dist')
+FONTAWESOME_DIR = os.path.join(ROOT, 'node_modules', '@fortawesome', 'fontawesome-free')
+
+INLINE_BLOCK = re.compile(r'(?P<indent>[ \t]*)<(?P<tag>style|script)>(?P<body>.*?)</(?P=tag)>[ \t]*', re.S)
+CSS_URL = re.compile(r'url\((["\']?)\.\./webfonts/([^)"\'?#]+)([^)"\']*)\1\)')
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.ttf')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--extract', action='store_true',
+                        help='pindahkan <style>/<script> inline (tanpa Jinja) dari template ke assets/')
+    parser.add_argument('--no-tailwind', action='store_true', help='lewati build Tailwind')
+    return parser.parse_args()
+
+
+def extract_inline_blocks():
+    """Pindahkan blok inline statis ke assets/ dan ganti dengan tag yang memakai asset_url()"""
+    for filename in sorted(os.listdir(TEMPLATES_DIR)):
+        if not filename.endswith('.html'):
+            continue
+        path = os.path.join(TEMPLATES_DIR, filename)
+        with open(path, encoding='utf-8') as fh:
+            source = fh.read()
+
+        name = filename[:-len('.html')]
+        collected = {'style': [], 'script': []}
+        emitted = set()
+
+        def replace(match):
+            body = match.group('body')
+            if '{{' in body or '{%' in body:
+                return match.group(0)
+
+            tag = match.group('tag')
+            collected[tag].append(body.strip('\n'))
+            if tag in emitted:
+                return ''
+            emitted.add(tag)
+            indent = match.group('indent')
+            if tag == 'style':
+                return f'{indent}<link rel="stylesheet" href="{{{{ asset_url(\'css/{name}.css\') }}}}">'
+            return f'{indent}<script src="{{{{ asset_url(\'js/{name}.js\') }}}}"></script>'
+
+        updated = INLINE_BLOCK.sub(replace, source)
+        if updated == source:
+            continue
+
+        for tag, extension, folder in (('style', 'css', 'css'), ('script', 'js', 'js')):
+            if collected[tag]:
+                os.makedirs(os.path.join(SOURCE_DIR, folder), exist_ok=True)
+                with open(os.path.join(SOURCE_DIR, folder, f'{name}.{extension}'), 'w', encoding='utf-8') as fh:
+                    fh.write(dedent('\n\n'.join(collected[tag])) + '\n')
+
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(updated)
+        print(f"  {filename}: {len(collected['style'])} style, {len(collected['script'])} script dipindahkan")
+
+
+def dedent(text):
+    lines = text.splitlines()
+    indents = [len(line) - len(line.lstrip()) for line in lines if line.strip()]
+    width = min(indents) if indents else 0
+    return '\n'.join(line[width:] for line in lines)
+
+
+def minify_css(css):
+    """Minifikasi sederhana: buang komentar dan spasi, isi string (data URI, content) tidak disentuh"""
+    parts = re.split(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', css)
+    for i in range(0, len(parts), 2):
+        chunk = re.sub(r'/\*.*?\*/', '', parts[i], flags=re.S)
+        chunk = re.sub(r'\s+', ' ', chunk)
+        chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+        parts[i] = re.sub(r'\s*:\s*(?=[^{}]*[;}])', ':', chunk).replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def tailwind_command():
+    if os.environ.get('TAILWIND_BIN'):
+        return [os.environ['TAILWIND_BIN']]
+    local = os.path.join(ROOT, 'node_modules', '.bin', 'tailwindcss')
+    if os.path.exists(local):
+        return [local]
+    if shutil.which('tailwindcss'):
+        return ['tailwindcss']
+    if shutil.which('npx'):
+        return ['npx', '--no-install', 'tailwindcss']
+    return None
+
+
+def build_tailwind():
+    """CSS Tailwind minified (hanya kelas yang dipakai), atau None jika CLI tidak tersedia"""
+    command = tailwind_command()
+    if command is None:
+        return None
+
+    output = os.path.join(tempfile.mkdtemp(), 'tailwind.css')
+    try:
+        subprocess.run(command + [
+            '-c', os.path.join(ROOT, 'tailwind.config.js'),
+            '-i', os.path.join(SOURCE_DIR, 'tailwind.css'),
+            '-o', output, '--minify'
+        ], cwd=ROOT, check=True, capture_output=True, timeout=300)
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        print(f"  Tailwind tidak dibangun ({e}); template memakai CDN")
+        return None
+
+    with open(output, 'rb') as fh:
+        return fh.read()
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_asset(manifest, logical_name, data):
+    """Tulis file ber-hash + varian terkompresi, catat di manifest"""
+    base, extension = os.path.splitext(logical_name)
+    hashed_name = f'{base}.{content_hash(data)}{extension}'
+    target = os.path.join(DIST_DIR, hashed_name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    with open(target, 'wb') as fh:
+        fh.write(data)
+
+    if extension in COMPRESSIBLE:
+        with open(target + '.gz', 'wb') as fh:
+            fh.write(gzip.compress(data, compresslevel=9, mtime=0))
+        try:
+            import brotli
+            with open(target + '.br', 'wb') as fh:
+                fh.write(brotli.compress(data, quality=11))
+        except ImportError:
+            pass
+
+    manifest[logical_name] = hashed_name
+    return hashed_name
+
+
+def build_fontawesome(manifest):
+    css_path = os.path.join(FONTAWESOME_DIR, 'css', 'all.min.css')
+    if not os.path.exists(css_path):
+        print("  Font Awesome lokal tidak ditemukan; template memakai CDN")
+        return
+
+    fonts = {}
+    webfonts_dir = os.path.join(FONTAWESOME_DIR, 'webfonts')
+    for filename in sorted(os.listdir(webfonts_dir)):
+        with open(os.path.join(webfonts_dir, filename), 'rb') as fh:
+            hashed = write_asset(manifest, f'fontawesome/webfonts/{filename}', fh.read())
+        fonts[filename] = os.path.basename(hashed)
+
+    with open(css_path, encoding='utf-8') as fh:
+        css = fh.read()
+    css = CSS_URL.sub(lambda m: f'url(webfonts/{fonts.get(m.group(2), m.group(2))}{m.group(3)})', css)
+    write_asset(manifest, 'fontawesome/all.min.css', css.encode('utf-8'))
+
+
+def main():
+    args = parse_args()
+
+    if args.extract:
+        print("Memindahkan blok inline dari template...")
+        extract_inline_blocks()
+
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+    manifest = {}
+
+    print("Membangun CSS/JS halaman...")
+    for folder in ('css', 'js'):
+        source_folder = os.path.join(SOURCE_DIR, folder)
+        if not os.path.isdir(source_folder):
+            continue
+        for filename in sorted(os.listdir(source_folder)):
+            with open(os.path.join(source_folder, filename), encoding='utf-8') as fh:
+                content = fh.read()
+            if folder == 'css':
+                content = minify_css(content)
+            write_asset(manifest, f'{folder}/{filename}', content.encode('utf-8'))
+
+    if not args.no_tailwind:
+        print("Membangun Tailwind...")
+        tailwind = build_tailwind()
+        if tailwind is not None:
+            write_asset(manifest, 'tailwind.css', tailwind)
+
+    print("Menyalin Font Awesome...")
+    build_fontawesome(manifest)
+
+    with open(os.path.join(DIST_DIR, 'manifest.json'), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+
+    total = sum(os.path.getsize(os.path.join(DIST_DIR, name)) for name in manifest.values())
+    print(f"{len(manifest)} aset ({total / 1024:.1f} KB) -> {os.path.relpath(DIST_DIR, ROOT)}/manifest.json")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,22 @@
+"""Konfigurasi gunicorn (dibaca otomatis dari direktori kerja).
+
+Jika PROMETHEUS_MULTIPROC_DIR di-set, metrik tiap worker ditulis ke direktori
+tersebut dan digabung saat /metrics di-scrape.
+"""
+import glob
+import os
+
+
+def on_starting(server):
+    # Bersihkan file metrik dari proses gunicorn sebelumnya
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,6 @@
+/** Dipakai build_assets.py: hanya kelas yang muncul di template & JS halaman yang dibangun. */
+module.exports = {
+  content: ['./templates/**/*.html', './assets/js/**/*.js', './app.py'],
+  theme: { extend: {} },
+  plugins: [],
+};